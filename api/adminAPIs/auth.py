@@ -3,18 +3,19 @@ from datetime import datetime, timedelta
 from django.conf import settings
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from django.contrib.auth.hashers import check_password, make_password
 from ..database import execute_query
+from ..auth import get_cached_principal
+from .. import credentials
 
 
 def hash_password(password):
-    """Hash password using Django make_password"""
-    return make_password(password)
+    """Hash password using Django make_password (PBKDF2_ITERATIONS)"""
+    return credentials.hash_password(password, scheme='django')
 
 
 def verify_password(password, hashed):
     """Verify password using Django check_password"""
-    return check_password(password, hashed)
+    return credentials.verify_password(password, hashed)
 
 
 def create_access_token(user_id, email):
@@ -68,11 +69,11 @@ class JWTAuthentication(BaseAuthentication):
             user_id = int(payload.get('user_id'))
 
             # auth_user хүснэгтээс админ хэрэглэгчийг авах
-            user = execute_query(
+            user = get_cached_principal('admin', user_id, payload.get('iat'), lambda: execute_query(
                 "SELECT * FROM auth_user WHERE id = %s AND is_active = TRUE",
                 (user_id,),
                 fetch_one=True
-            )
+            ))
 
             if not user:
                 raise AuthenticationFailed('User not found')
@@ -8,7 +8,7 @@ from .views import (
     AdminRestaurantListView, 
     AdminPendingRestaurantListView, CouponListView, CouponDetailView, CouponCreateView,
     CouponUpdateView, CouponDeleteView, AdminStatisticsView, AdminPendingWorkersView,
-    AdminApproveWorkerView, AdminRejectWorkerView
+    AdminApproveWorkerView, AdminRejectWorkerView, AdminDatabasePoolView
 )
 
 urlpatterns = [
@@ -29,6 +29,7 @@ urlpatterns = [
     path('admin/coupons/<int:coupon_id>/update/', CouponUpdateView.as_view(), name='coupon-update'),
     path('admin/coupons/<int:coupon_id>/none_active/', CouponDeleteView.as_view(), name='coupon-delete'),
     path('admin/statistics/', AdminStatisticsView.as_view(), name='admin-statistics'),
+    path('admin/db/pool/', AdminDatabasePoolView.as_view(), name='admin-db-pool'),
 
     path("admin/driver/pending/", AdminPendingWorkersView.as_view()),
     path("admin/driver/approve/", AdminApproveWorkerView.as_view()),
@@ -4,8 +4,17 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import status
 from datetime import datetime, timedelta
 
-from ..database import execute_insert, execute_query, execute_update
+from django.conf import settings
+from django.core.cache import cache
+
+from ..database import execute_insert, execute_query, execute_update, execute_parallel, add_server_timing, get_pool_stats
+from ..dateranges import local_today, day_start
 from .auth import JWTAuthentication, verify_password, create_access_token
+from ..auth import invalidate_principal
+from ..hashing import check_login_attempts, record_login_failure, clear_login_failures
+from ..credentials import rehash_if_needed
+from ..restaurantAPIs.catalogue import bump_catalogue_version
+from ..restaurantAPIs.menu import record_menu_change
 from .permissions import IsAdminUserCustom
 
 
@@ -61,6 +70,7 @@ class AdminUserUpdateView(APIView):
 
         if rowcount == 0:
             return Response({'error': 'User not found'}, status=404)
+        invalidate_principal(user_id, namespace='admin')
         return Response({'message': 'User updated successfully'}, status=200)
 
 
@@ -77,6 +87,7 @@ class AdminUserDeleteView(APIView):
 
         if rowcount == 0:
             return Response({'error': 'User not found'}, status=404)
+        invalidate_principal(user_id, namespace='admin')
         return Response({'message': 'User deactivated'}, status=200)
 
 
@@ -89,6 +100,7 @@ class AdminSignInView(APIView):
 
         if not email or not password:
             return Response({'error': 'Email болон password заавал'}, status=400)
+        check_login_attempts(request, 'admin', email)
 
         user = execute_query(
             'SELECT id, email, password, is_active, username FROM auth_user WHERE email = %s',
@@ -97,10 +109,17 @@ class AdminSignInView(APIView):
         )
 
         if not user:
+            record_login_failure(request, 'admin', email)
             return Response({'error': 'Хэрэглэгч олдсонгүй'}, status=401)
 
         if not verify_password(password, user['password']):
+            record_login_failure(request, 'admin', email)
             return Response({'error': 'Нууц үг буруу'}, status=401)
+        clear_login_failures(request, 'admin', email)
+        rehash_if_needed(password, user['password'], 'django', lambda new_hash: execute_update(
+            "UPDATE auth_user SET password = %s WHERE id = %s",
+            (new_hash, user['id'])
+        ))
 
         if not user['is_active']:
             return Response({'error': 'Хэрэглэгч идэвхгүй байна'}, status=403)
@@ -133,6 +152,9 @@ class AdminApproveRestaurantView(APIView):
         )
         if rowcount == 0:
             return Response({"error": "Ресторан олдсонгүй"}, status=404)
+        invalidate_principal(resID, namespace='restaurant')
+        bump_catalogue_version()
+        record_menu_change(resID, 'restaurant', resID)
         return Response({"message": "Ресторан зөвшөөрсөн"}, status=200)
 
 
@@ -207,6 +229,7 @@ class AdminApproveWorkerView(APIView):
 
         if not updated:
             return Response({"error": "Worker олдсонгүй"}, status=404)
+        invalidate_principal(worker_id, namespace='worker')
 
         return Response(
             {"message": "Зөвшөөрлөө", "worker": updated},
@@ -230,6 +253,7 @@ class AdminRejectWorkerView(APIView):
 
         if not deleted:
             return Response({"error": "Worker олдсонгүй"}, status=404)
+        invalidate_principal(worker_id, namespace='worker')
 
         return Response({"message": "Татгалзлаа"}, status=200)
 
@@ -330,40 +354,71 @@ class CouponDeleteView(APIView):
 # STATISTICS
 # ----------------------------
 
+# (нэр, өдрийн тоо) — AdminStatisticsView-ийн цонхнууд
+STATS_WINDOWS = (('week', 7), ('month', 30), ('half_year', 182), ('year', 365))
+ADMIN_STATS_CACHE_KEY = 'admin_statistics'
+# Борлуулалтад тооцох дууссан/төлөгдсөн төлөвүүд (драйверын төлөв жижиг үсгээр ирдэг)
+SALES_STATUSES = ('DONE', 'COMPLETED', 'DELIVERED', 'PAID')
+
+
 class AdminStatisticsView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated, IsAdminUserCustom]
 
     def get(self, request):
-        # Note: currently your queries ignore date range (week/month/year). Kept as-is.
-        stats = {}
-
-        stats['restaurants'] = {
-            'week': execute_query('SELECT COUNT(*) AS count FROM "tbl_restaurant"', fetch_one=True)['count'],
-            'month': execute_query('SELECT COUNT(*) AS count FROM "tbl_restaurant"', fetch_one=True)['count'],
-            'half_year': execute_query('SELECT COUNT(*) AS count FROM "tbl_restaurant"', fetch_one=True)['count'],
-            'year': execute_query('SELECT COUNT(*) AS count FROM "tbl_restaurant"', fetch_one=True)['count'],
+        cached = cache.get(ADMIN_STATS_CACHE_KEY)
+        if cached is not None:
+            return Response(cached, status=200)
+
+        # Өнөөдрийг оруулсан сүүлийн N өдөр (Asia/Ulaanbaatar), нэг query-д бүх цонх
+        today = local_today()
+        starts = {name: day_start(today - timedelta(days=days - 1)) for name, days in STATS_WINDOWS}
+        start_days = {name: start.date() for name, start in starts.items()}
+
+        def counts(table):
+            columns = ', '.join(
+                f'COUNT(*) FILTER (WHERE "created_at" >= %({name})s) AS {name}' for name, _ in STATS_WINDOWS
+            )
+            return (
+                f'SELECT {columns} FROM {table} WHERE "created_at" >= %(oldest)s',
+                {**starts, 'oldest': min(starts.values())},
+                True
+            )
+
+        # Борлуулалт: өдрийн rollup-аас (tbl_sales_daily), зөвхөн SALES_STATUSES төлөвтэй захиалга
+        sales_columns = ', '.join(
+            f'COALESCE(SUM("revenue") FILTER (WHERE "day" >= %({name})s), 0) AS {name}' for name, _ in STATS_WINDOWS
+        )
+        timings = {}
+        results = execute_parallel({
+            'restaurants': counts('"tbl_restaurant"'),
+            'drivers': counts('"tbl_worker"'),
+            'customers': counts('"users"'),
+            'sales': (
+                f'SELECT {sales_columns} FROM tbl_sales_daily '
+                f'WHERE "day" >= %(oldest)s AND UPPER("status") IN %(statuses)s',
+                {**start_days, 'oldest': min(start_days.values()), 'statuses': SALES_STATUSES},
+                True
+            ),
+        }, timings)
+
+        stats = {
+            entity: {name: (row or {}).get(name) or 0 for name, _ in STATS_WINDOWS}
+            for entity, row in results.items()
         }
+        stats['sales'] = {name: float(value) for name, value in stats['sales'].items()}
 
-        stats['drivers'] = {
-            'week': execute_query('SELECT COUNT(*) AS count FROM "tbl_worker"', fetch_one=True)['count'],
-            'month': execute_query('SELECT COUNT(*) AS count FROM "tbl_worker"', fetch_one=True)['count'],
-            'half_year': execute_query('SELECT COUNT(*) AS count FROM "tbl_worker"', fetch_one=True)['count'],
-            'year': execute_query('SELECT COUNT(*) AS count FROM "tbl_worker"', fetch_one=True)['count'],
-        }
+        cache.set(ADMIN_STATS_CACHE_KEY, stats, getattr(settings, 'ADMIN_STATS_CACHE_TTL', 30))
+        return add_server_timing(Response(stats, status=200), timings)
 
-        stats['customers'] = {
-            'week': execute_query('SELECT COUNT(*) AS count FROM "users"', fetch_one=True)['count'],
-            'month': execute_query('SELECT COUNT(*) AS count FROM "users"', fetch_one=True)['count'],
-            'half_year': execute_query('SELECT COUNT(*) AS count FROM "users"', fetch_one=True)['count'],
-            'year': execute_query('SELECT COUNT(*) AS count FROM "users"', fetch_one=True)['count'],
-        }
 
-        stats['sales'] = {
-            'week': execute_query('SELECT COALESCE(SUM("price"),0) AS total FROM "tbl_orderfood"', fetch_one=True)['total'],
-            'month': execute_query('SELECT COALESCE(SUM("price"),0) AS total FROM "tbl_orderfood"', fetch_one=True)['total'],
-            'half_year': execute_query('SELECT COALESCE(SUM("price"),0) AS total FROM "tbl_orderfood"', fetch_one=True)['total'],
-            'year': execute_query('SELECT COALESCE(SUM("price"),0) AS total FROM "tbl_orderfood"', fetch_one=True)['total'],
-        }
+# ----------------------------
+# DATABASE POOL
+# ----------------------------
 
-        return Response(stats, status=200)
+class AdminDatabasePoolView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUserCustom]
+
+    def get(self, request):
+        return Response(get_pool_stats(), status=200)
@@ -1,19 +1,52 @@
 import jwt
-import bcrypt
 import uuid
 from datetime import datetime, timedelta
 from django.conf import settings
 from rest_framework.authentication import BaseAuthentication
+from rest_framework.permissions import BasePermission
 from rest_framework.exceptions import AuthenticationFailed
 from .database import execute_query
+from .caching import TTLCache
+from . import credentials
+
+# Баталгаажсан principal-ийг (namespace, subject, iat)-аар кэшлэнэ
+_principal_cache = TTLCache(
+    maxsize=getattr(settings, 'AUTH_PRINCIPAL_CACHE_SIZE', 2048),
+    ttl=getattr(settings, 'AUTH_PRINCIPAL_CACHE_TTL', 60),
+)
+
+
+def get_cached_principal(namespace, subject, iat, loader):
+    """
+    Return the principal row for a token, loading it with loader() on a miss.
+    Олдоогүй (None) үр дүнг кэшлэхгүй.
+    """
+    key = (namespace, str(subject), iat)
+    principal = _principal_cache.get(key)
+    if principal is None:
+        principal = loader()
+        if principal is None:
+            return None
+        _principal_cache.set(key, principal)
+    # View-үүд AuthUser-г өөрчилж болох тул хуулбар буцаана
+    return dict(principal)
+
+
+def invalidate_principal(subject, namespace=None):
+    """Drop cached principals after a profile update, deactivation or approval"""
+    subject = str(subject)
+    return _principal_cache.delete_where(
+        lambda key: key[1] == subject and (namespace is None or key[0] == namespace)
+    )
+
 
 def hash_password(password):
-    """Hash password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    """Hash password using bcrypt (BCRYPT_ROUNDS)"""
+    return credentials.hash_password(password, scheme='bcrypt')
 
 def verify_password(password, hashed):
     """Verify password against hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    return credentials.verify_password(password, hashed)
 
 def create_access_token(user_id, email):
     """Create JWT access token"""
@@ -25,6 +58,17 @@ def create_access_token(user_id, email):
     }
     return jwt.encode(payload, settings.JWT_SECRET, algorithm='HS256')
 
+def create_restaurant_token(res_id, email):
+    """Create JWT access token for a restaurant (RestaurantSigninView)"""
+    payload = {
+        'res_id': int(res_id),
+        'email': email,
+        'type': 'restaurant',
+        'exp': datetime.utcnow() + timedelta(seconds=settings.JWT_ACCESS_TOKEN_LIFETIME),
+        'iat': datetime.utcnow()
+    }
+    return jwt.encode(payload, settings.JWT_SECRET, algorithm='HS256')
+
 def decode_access_token(token):
     """Decode and verify JWT token"""
     try:
@@ -72,18 +116,18 @@ class JWTAuthentication(BaseAuthentication):
 
             if is_uuid:
                 # Get user from database
-                user = execute_query(
+                user = get_cached_principal('user', user_id, payload.get('iat'), lambda: execute_query(
                     "SELECT * FROM users WHERE id = %s AND is_active = TRUE",
                     (user_id,),
                     fetch_one=True
-                )
+                ))
             else:
                 # Get worker from database
-                user = execute_query(
+                user = get_cached_principal('worker', user_id, payload.get('iat'), lambda: execute_query(
                     'SELECT * FROM "tbl_worker" WHERE "workerID" = %s',
                     (user_id,),
                     fetch_one=True
-                )
+                ))
                 if user:
                     user['id'] = user['workerID']
             
@@ -97,3 +141,53 @@ class JWTAuthentication(BaseAuthentication):
     
     def authenticate_header(self, request):
         return 'Bearer'
+
+
+class RestaurantJWTAuthentication(BaseAuthentication):
+    """
+    JWT from create_restaurant_token.
+    EventSource header илгээж чаддаггүй тул ?access_token= параметрийг ч хүлээн авна.
+    """
+
+    def authenticate(self, request):
+        token = None
+        auth_header = request.headers.get('Authorization')
+        if auth_header:
+            prefix, _, value = auth_header.partition(' ')
+            if prefix.lower() == 'bearer':
+                token = value.strip()
+        if not token:
+            token = request.query_params.get('access_token')
+        if not token:
+            return None
+
+        payload = decode_access_token(token)
+        res_id = payload.get('res_id')
+        if payload.get('type') != 'restaurant' or res_id is None:
+            raise AuthenticationFailed('Invalid token')
+
+        restaurant = get_cached_principal('restaurant', res_id, payload.get('iat'), lambda: execute_query(
+            'SELECT "resID", "resName", "email" FROM tbl_restaurant WHERE "resID" = %s AND "status" = %s',
+            (res_id, 'active'),
+            fetch_one=True
+        ))
+        if not restaurant:
+            raise AuthenticationFailed('Restaurant not found or inactive')
+
+        restaurant['id'] = restaurant['resID']
+        restaurant['user_type'] = 'restaurant'
+        return (AuthUser(restaurant), token)
+
+    def authenticate_header(self, request):
+        return 'Bearer'
+
+
+class IsRestaurantOwner(BasePermission):
+    """request.user нь URL-ын resID-тай ресторан байх ёстой"""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return (
+            user is not None and getattr(user, 'user_type', None) == 'restaurant'
+            and str(user.get('resID')) == str(view.kwargs.get('resID'))
+        )
@@ -0,0 +1,319 @@
+import time
+import heapq
+import bisect
+import threading
+from django.conf import settings
+
+from .database import execute_query
+from .search import normalize_query
+from .restaurantAPIs.catalogue import get_catalogue_version, get_menu_version
+
+# ----------------------------
+# Prefix autocomplete
+# ----------------------------
+# resName/foodName-ийн normalize хийсэн үг бүр (болон бүтэн нэр)-ийг эрэмбэлсэн
+# массивт хадгалж bisect-ээр prefix хайна. Богино prefix (AUTOCOMPLETE_PREFIX_LEN
+# хүртэл) бүрийн top-k-г урьдчилан тооцсон тул асуулт бүр dict/bisect төдий.
+# Хоолны индексийг tbl_menu_change feed-ээр хэсэгчлэн шинэчилнэ, рестораны (жижиг)
+# индексийг catalogue version солигдоход нэрээр нь дахин угсарна. Жин нь
+# tbl_orderfood (хоол) / tbl_order (ресторан)-оос авсан захиалгын тоо бөгөөд
+# AUTOCOMPLETE_REFRESH тутамд тусад нь шинэчлэгдэнэ.
+
+
+def _index_keys(name):
+    name = normalize_query(name)
+    return {key for key in set(name.split()) | {name} if key}
+
+
+class AutocompleteIndex:
+    """
+    Sorted (key, id) arrays plus precomputed top-k per short prefix.
+    Өөрчлөлтийг copy() дээр хийж дараа нь солино (уншигч хагас шинэчлэлт харахгүй).
+    """
+
+    def __init__(self, items, top_k=10, prefix_len=3):
+        self.top_k = top_k
+        self.prefix_len = prefix_len
+        self.items = {}      # id -> item
+        self.keys = []       # эрэмбэлсэн key
+        self.refs = []       # keys-тэй зэрэгцээ item id (ижил key дотор өсөх)
+        self._buckets = {}   # prefix -> {id}
+        self._short = {}     # prefix -> [id] top-k
+
+        entries = []
+        for item in items:
+            self.items[item["id"]] = item
+            entries.extend((key, item["id"]) for key in _index_keys(item["name"]))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.refs = [item_id for _, item_id in entries]
+
+        for key, item_id in entries:
+            for prefix in self._prefixes(key):
+                self._buckets.setdefault(prefix, set()).add(item_id)
+        self._rank_all()
+
+    def copy(self):
+        clone = AutocompleteIndex.__new__(AutocompleteIndex)
+        clone.top_k = self.top_k
+        clone.prefix_len = self.prefix_len
+        clone.items = dict(self.items)
+        clone.keys = list(self.keys)
+        clone.refs = list(self.refs)
+        clone._buckets = {prefix: set(ids) for prefix, ids in self._buckets.items()}
+        clone._short = dict(self._short)
+        return clone
+
+    def _prefixes(self, key):
+        return [key[:n] for n in range(1, min(len(key), self.prefix_len) + 1)]
+
+    def _rank(self, item_id):
+        item = self.items[item_id]
+        return (item["weight"], -len(item["name"]))
+
+    def _best(self, refs, k):
+        return heapq.nlargest(k, refs, key=self._rank)
+
+    def _rank_all(self):
+        self._short = {prefix: self._best(ids, self.top_k) for prefix, ids in self._buckets.items()}
+
+    def _span(self, key):
+        return bisect.bisect_left(self.keys, key), bisect.bisect_right(self.keys, key)
+
+    def remove(self, item_id):
+        """Drop an item; returns the prefixes whose top-k must be recomputed"""
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return set()
+        touched = set()
+        for key in _index_keys(item["name"]):
+            lo, hi = self._span(key)
+            for i in range(lo, hi):
+                if self.refs[i] == item_id:
+                    del self.keys[i]
+                    del self.refs[i]
+                    break
+            for prefix in self._prefixes(key):
+                bucket = self._buckets.get(prefix)
+                if bucket is not None:
+                    bucket.discard(item_id)
+                    if not bucket:
+                        del self._buckets[prefix]
+                touched.add(prefix)
+        return touched
+
+    def add(self, item):
+        """Insert (or replace) an item; returns the prefixes to recompute"""
+        touched = self.remove(item["id"])
+        self.items[item["id"]] = item
+        for key in _index_keys(item["name"]):
+            lo, hi = self._span(key)
+            i = lo + bisect.bisect_left(self.refs[lo:hi], item["id"])
+            self.keys.insert(i, key)
+            self.refs.insert(i, item["id"])
+            for prefix in self._prefixes(key):
+                self._buckets.setdefault(prefix, set()).add(item["id"])
+                touched.add(prefix)
+        return touched
+
+    def apply(self, upserts=(), deletes=()):
+        """Apply changed/removed items and re-rank only the affected prefixes"""
+        touched = set()
+        for item_id in deletes:
+            touched |= self.remove(item_id)
+        for item in upserts:
+            touched |= self.add(item)
+        for prefix in touched:
+            if prefix in self._buckets:
+                self._short[prefix] = self._best(self._buckets[prefix], self.top_k)
+            else:
+                self._short.pop(prefix, None)
+
+    def set_weights(self, weights):
+        """Replace popularity weights ({id: weight}) and re-rank every prefix"""
+        self.items = {
+            item_id: {**item, "weight": weights.get(item_id, 0)}
+            for item_id, item in self.items.items()
+        }
+        self._rank_all()
+
+    def lookup(self, prefix, k):
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= self.prefix_len and k <= self.top_k:
+            refs = self._short.get(prefix, [])[:k]
+        else:
+            lo = bisect.bisect_left(self.keys, prefix)
+            hi = bisect.bisect_left(self.keys, prefix + '\uffff')
+            refs = self._best(set(self.refs[lo:hi]), k)
+        return [self.items[item_id] for item_id in refs]
+
+
+def _restaurant_item(row, weights):
+    return {"type": "restaurant", "id": row["id"], "name": row["name"], "weight": weights.get(row["id"], 0)}
+
+
+def _food_item(row, weights):
+    return {"type": "food", "id": row["id"], "name": row["name"], "resID": row["resID"],
+            "weight": weights.get(row["id"], 0)}
+
+
+def _load_weights():
+    """({resID: order count}, {foodID: quantity sold}) — хамгийн үнэтэй хэсэг"""
+    restaurants = execute_query("""
+        SELECT o."res_id" AS id, COUNT(*) AS weight
+        FROM tbl_order o
+        WHERE o."res_id" IS NOT NULL
+        GROUP BY o."res_id"
+    """)
+    foods = execute_query("""
+        SELECT "foodID" AS id, SUM("stock") AS weight
+        FROM tbl_orderfood
+        GROUP BY "foodID"
+    """)
+    return (
+        {row["id"]: int(row["weight"] or 0) for row in restaurants},
+        {row["id"]: int(row["weight"] or 0) for row in foods},
+    )
+
+
+def _load_restaurants(weights):
+    rows = execute_query('SELECT "resID" AS id, "resName" AS name FROM tbl_restaurant')
+    return [_restaurant_item(row, weights) for row in rows if row["name"]]
+
+
+def _load_foods(weights, food_ids=None):
+    query = 'SELECT "foodID" AS id, "foodName" AS name, "resID" AS "resID" FROM tbl_food'
+    params = ()
+    if food_ids is not None:
+        query += ' WHERE "foodID" = ANY(%s)'
+        params = (list(food_ids),)
+    return [_food_item(row, weights) for row in execute_query(query, params) if row["name"]]
+
+
+def _feed_position():
+    row = execute_query('SELECT COALESCE(MAX("version"), 0) AS version FROM tbl_menu_change', fetch_one=True)
+    return row["version"] if row else 0
+
+
+def _food_changes(since):
+    """(changed food ids, new position) from tbl_menu_change after `since`"""
+    # Дараалал (BIGSERIAL) commit-ийн дарааллаар биш олгогддог тул сүүлийн хэсгийг
+    # давхар уншина; дахин ачаалах нь idempotent.
+    overlap = getattr(settings, 'AUTOCOMPLETE_FEED_OVERLAP', 100)
+    rows = execute_query("""
+        SELECT "item_type", "item_id", "version"
+        FROM tbl_menu_change
+        WHERE "version" > %s
+        ORDER BY "version"
+    """, (max(0, since - overlap),))
+    food_ids = {row["item_id"] for row in rows if row["item_type"] == 'food'}
+    position = max([since] + [row["version"] for row in rows])
+    return food_ids, position
+
+
+_state = {
+    'catalogue_version': None,
+    'menu_version': None,
+    'feed_position': 0,
+    'weights_at': 0.0,
+    'weights': ({}, {}),
+    'indexes': None,
+}
+_build_lock = threading.Lock()
+
+
+def _build(state):
+    top_k = getattr(settings, 'AUTOCOMPLETE_MAX_LIMIT', 10)
+    prefix_len = getattr(settings, 'AUTOCOMPLETE_PREFIX_LEN', 3)
+    # Feed-ийн байрлалыг эхэлж уншина: дараа орсон өөрчлөлт дахин хэрэглэгдэнэ
+    state['feed_position'] = _feed_position()
+    state['weights'] = _load_weights()
+    state['weights_at'] = time.monotonic()
+    restaurant_weights, food_weights = state['weights']
+    state['indexes'] = {
+        'restaurant': AutocompleteIndex(_load_restaurants(restaurant_weights), top_k, prefix_len),
+        'food': AutocompleteIndex(_load_foods(food_weights), top_k, prefix_len),
+    }
+
+
+def _update(state, catalogue_version, menu_version, refresh):
+    indexes = dict(state['indexes'])
+    restaurant_weights, food_weights = state['weights']
+
+    if time.monotonic() - state['weights_at'] >= refresh:
+        restaurant_weights, food_weights = state['weights'] = _load_weights()
+        state['weights_at'] = time.monotonic()
+        for name, weights in (('restaurant', restaurant_weights), ('food', food_weights)):
+            indexes[name] = indexes[name].copy()
+            indexes[name].set_weights(weights)
+
+    if state['catalogue_version'] != catalogue_version:
+        restaurants = _load_restaurants(restaurant_weights)
+        old = indexes['restaurant']
+        indexes['restaurant'] = AutocompleteIndex(restaurants, old.top_k, old.prefix_len)
+        # Устгагдсан рестораны хоолыг хасна (устгахад хоол бүрээр feed бичигддэггүй)
+        live = {item["id"] for item in restaurants}
+        orphans = [item_id for item_id, item in indexes['food'].items.items() if item["resID"] not in live]
+        if orphans:
+            indexes['food'] = indexes['food'].copy()
+            indexes['food'].apply(deletes=orphans)
+
+    if state['menu_version'] != menu_version:
+        food_ids, position = _food_changes(state['feed_position'])
+        if food_ids:
+            foods = _load_foods(food_weights, food_ids)
+            found = {item["id"] for item in foods}
+            index = indexes['food'] = indexes['food'].copy()
+            index.apply(upserts=foods, deletes=food_ids - found)
+        state['feed_position'] = position
+
+    state['indexes'] = indexes
+
+
+def get_autocomplete_indexes():
+    """
+    {'restaurant': AutocompleteIndex, 'food': AutocompleteIndex}.
+    Анх бүтнээр угсарч, дараа нь catalogue/menu version солигдоход зөвхөн
+    өөрчлөгдсөн мөрүүдийг, AUTOCOMPLETE_REFRESH тутамд жинг шинэчилнэ.
+    Нэг thread шинэчилж байхад бусад нь хуучин индексээ ашиглана.
+    """
+    catalogue_version, menu_version = get_catalogue_version(), get_menu_version()
+    refresh = getattr(settings, 'AUTOCOMPLETE_REFRESH', 600)
+
+    def fresh():
+        return (
+            _state['indexes'] is not None
+            and _state['catalogue_version'] == catalogue_version
+            and _state['menu_version'] == menu_version
+            and time.monotonic() - _state['weights_at'] < refresh
+        )
+
+    if fresh():
+        return _state['indexes']
+
+    if not _build_lock.acquire(blocking=_state['indexes'] is None):
+        return _state['indexes']
+    try:
+        if not fresh():
+            if _state['indexes'] is None:
+                _build(_state)
+            else:
+                _update(_state, catalogue_version, menu_version, refresh)
+            _state['catalogue_version'] = catalogue_version
+            _state['menu_version'] = menu_version
+        return _state['indexes']
+    finally:
+        _build_lock.release()
+
+
+def suggest(q, limit, kind=None):
+    indexes = get_autocomplete_indexes()
+    kinds = [kind] if kind in indexes else list(indexes)
+    results = []
+    for name in kinds:
+        results.extend(indexes[name].lookup(q, limit))
+    if len(kinds) > 1:
+        results = heapq.nlargest(limit, results, key=lambda item: item["weight"])
+    return results
@@ -0,0 +1,99 @@
+import bcrypt
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher,
+    check_password,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from .hashing import run_hashing
+
+# ----------------------------
+# Credential schemes
+# ----------------------------
+# 'bcrypt' - users, tbl_worker (api/auth.py)
+# 'django' - auth_user (admin), tbl_restaurant
+# Ажлын хүчин зүйлийг BCRYPT_ROUNDS, PBKDF2_ITERATIONS-оор нэг дор тохируулна.
+SCHEMES = ('bcrypt', 'django')
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 hasher whose iteration count comes from settings.PBKDF2_ITERATIONS"""
+    iterations = getattr(settings, 'PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+def bcrypt_rounds():
+    return getattr(settings, 'BCRYPT_ROUNDS', 12)
+
+
+def _is_bcrypt(hashed):
+    return hashed.startswith(('$2a$', '$2b$', '$2y$'))
+
+
+def _bcrypt_hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _bcrypt_check(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def hash_password(password, scheme='bcrypt'):
+    """Hash password with the scheme's target cost (on the hashing executor)"""
+    if scheme == 'bcrypt':
+        return run_hashing(_bcrypt_hash, password, bcrypt_rounds())
+    if scheme == 'django':
+        return run_hashing(make_password, password)
+    raise ValueError(f'Unknown credential scheme: {scheme}')
+
+
+def verify_password(password, hashed):
+    """Verify password against a bcrypt or Django-format hash"""
+    if not password or not hashed:
+        return False
+    if _is_bcrypt(hashed):
+        try:
+            return run_hashing(_bcrypt_check, password, hashed)
+        except ValueError:
+            return False
+    return run_hashing(check_password, password, hashed)
+
+
+def needs_rehash(hashed, scheme='bcrypt'):
+    """
+    True when the stored hash is not in the scheme's format or its cost
+    differs from the target (weaker эсвэл хэт хүчтэй аль аль нь).
+    """
+    if not hashed:
+        return False
+    if scheme == 'bcrypt':
+        if not _is_bcrypt(hashed):
+            return True
+        try:
+            return int(hashed.split('$')[2]) != bcrypt_rounds()
+        except (IndexError, ValueError):
+            return True
+
+    if _is_bcrypt(hashed):
+        return True
+    try:
+        hasher = identify_hasher(hashed)
+    except ValueError:
+        return True
+    preferred = get_hasher('default')
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(hashed)
+
+
+def rehash_if_needed(password, hashed, scheme, save):
+    """
+    Call after a successful login: re-hash at the target cost and persist it
+    with save(new_hash). Алдаа гарвал нэвтрэлтийг саатуулахгүй.
+    """
+    if not needs_rehash(hashed, scheme):
+        return False
+    try:
+        save(hash_password(password, scheme))
+    except Exception:
+        return False
+    return True
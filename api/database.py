@@ -1,20 +1,347 @@
+import os
+import time
+import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import ContextVar
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor, execute_values
 from django.conf import settings
 from contextlib import contextmanager
 
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(Exception):
+    """No connection became free within the checkout timeout"""
+
+
+class ConnectionPool:
+    """
+    Process-wide, thread-safe psycopg2 connection pool.
+
+    - min_size холболтыг эхний хэрэглээн дээр урьдчилан нээнэ
+    - max_size-аас илүү холболт нээхгүй, чөлөөлөгдөхийг timeout хүртэл хүлээнэ
+    - удаан сул байсан холболтыг checkout хийхдээ `SELECT 1`-ээр шалгана
+    - max_lifetime хэтэрсэн холболтыг хааж шинээр нээнэ
+    """
+
+    def __init__(self, dsn, min_size=1, max_size=10, max_lifetime=1800,
+                 timeout=10, health_check_interval=30):
+        self.dsn = dsn
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = []          # [(conn, created_at, last_used)]
+        self._created_at = {}    # id(conn) -> created_at
+        self._size = 0
+        self._prefilled = False
+        self._stats = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'exhausted': 0,
+            'recycled': 0,
+            'health_check_failures': 0,
+        }
+
+    # ----------------------------
+    # internal helpers
+    # ----------------------------
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._stats['connections_created'] += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+            self._size -= 1
+            self._stats['connections_closed'] += 1
+            self._cond.notify()
+
+    def _is_expired(self, conn, now):
+        created_at = self._created_at.get(id(conn), now)
+        return self.max_lifetime and now - created_at > self.max_lifetime
+
+    def _is_healthy(self, conn, last_used, now):
+        if conn.closed:
+            return False
+        if now - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _prefill(self):
+        with self._cond:
+            if self._prefilled:
+                return
+            self._prefilled = True
+            missing = max(0, self.min_size - self._size)
+            self._size += missing
+
+        for i in range(missing):
+            try:
+                conn = self._connect()
+            except Exception:
+                # Үлдсэн нөөцийг буцааж, дараагийн getconn дахин prefill оролдоно
+                with self._cond:
+                    self._size -= missing - i
+                    self._prefilled = False
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic(), time.monotonic()))
+                self._cond.notify()
+
+    # ----------------------------
+    # public API
+    # ----------------------------
+    def getconn(self):
+        if not self._prefilled:
+            self._prefill()
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = None
+            create = False
+            with self._cond:
+                while True:
+                    if self._idle:
+                        conn, _, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['exhausted'] += 1
+                        logger.warning(
+                            'Database pool exhausted (max_size=%s, timeout=%ss)',
+                            self.max_size, self.timeout
+                        )
+                        raise PoolExhausted(
+                            f'No database connection available within {self.timeout}s'
+                        )
+                    self._stats['waits'] += 1
+                    started = time.monotonic()
+                    self._cond.wait(remaining)
+                    self._stats['wait_time_total'] += time.monotonic() - started
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            else:
+                now = time.monotonic()
+                if self._is_expired(conn, now):
+                    with self._cond:
+                        self._stats['recycled'] += 1
+                    self._close(conn)
+                    continue
+                if not self._is_healthy(conn, last_used, now):
+                    with self._cond:
+                        self._stats['health_check_failures'] += 1
+                    self._close(conn)
+                    continue
+
+            with self._cond:
+                self._stats['checkouts'] += 1
+            return conn
+
+    def putconn(self, conn, discard=False):
+        if discard or conn.closed or self._is_expired(conn, time.monotonic()):
+            self._close(conn)
+            return
+
+        # Дуусаагүй transaction-тэй холболтыг pool руу буцаахгүй
+        if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                self._close(conn)
+                return
+
+        now = time.monotonic()
+        with self._cond:
+            self._idle.append((conn, self._created_at.get(id(conn), now), now))
+            self._cond.notify()
+
+    def available(self):
+        """Idle connections plus room to open new ones (checkout would not wait)"""
+        with self._cond:
+            return len(self._idle) + self.max_size - self._size
+
+    def closeall(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                **self._stats,
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it lazily (fork-safe for gunicorn)"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            config = settings.DATABASE_CONFIG
+            # Fork хийсэн процесс эцэг процессын socket-ийг ашиглах ёсгүй тул шинэ pool үүсгэнэ
+            _pool = ConnectionPool(
+                config['url'],
+                min_size=config.get('pool_min_size', 1),
+                max_size=config.get('pool_max_size', 10),
+                max_lifetime=config.get('pool_max_lifetime', 1800),
+                timeout=config.get('pool_timeout', 10),
+                health_check_interval=config.get('pool_health_check_interval', 30),
+            )
+            _pool_pid = pid
+    return _pool
+
+
+def get_pool_stats():
+    """Pool usage and exhaustion counters for monitoring"""
+    return get_pool().stats()
+
+
+# Unit of work-д холбогдсон холболт (нэг request/thread-д нэг)
+_bound_connection = ContextVar('bound_connection', default=None)
+# set_rollback() дуудагдсан эсэх (гаднах unit of work төгсөхөд шалгана)
+_rollback_requested = ContextVar('rollback_requested', default=False)
+
+
+def set_rollback():
+    """Roll back the current unit of work instead of committing it"""
+    if _bound_connection.get() is not None:
+        _rollback_requested.set(True)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Bind one pooled connection and transaction to the current request.
+
+    Доторх бүх execute_* дуудлага энэ холболтыг ашиглаж, төгсгөлд нь
+    нэг удаа commit хийнэ. Exception гарвал эсвэл set_rollback() дуудсан бол
+    бүгд rollback болно. Давхар дуудвал гаднах unit of work-д нэгдэнэ.
+    """
+    conn = _bound_connection.get()
+    if conn is not None:
+        yield conn
+        return
+
+    pool = get_pool()
+    conn = pool.getconn()
+    token = _bound_connection.set(conn)
+    rollback_token = _rollback_requested.set(False)
+    discard = False
+    try:
+        yield conn
+        # Барьж авсан алдааны дараа transaction эвдэрсэн байж болно
+        if _rollback_requested.get() or conn.info.transaction_status == extensions.TRANSACTION_STATUS_INERROR:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            discard = True
+        if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+            discard = True
+        raise e
+    finally:
+        _rollback_requested.reset(rollback_token)
+        _bound_connection.reset(token)
+        pool.putconn(conn, discard=discard or conn.closed)
+
+
+def transactional(func):
+    """
+    Run the decorated view method inside a single unit of work.
+    Алдааны хариу (status >= 400) буцаавал бичсэн өөрчлөлтүүд rollback болно.
+    Hash, файл upload зэрэг удаан ажлыг холболт барихгүйн тулд гадна нь хийнэ.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with unit_of_work():
+            response = func(*args, **kwargs)
+            if getattr(response, 'status_code', 200) >= 400:
+                set_rollback()
+            return response
+    return wrapper
+
+
 @contextmanager
 def get_db_connection():
-    """Database connection context manager"""
-    conn = psycopg2.connect(settings.DATABASE_CONFIG['url'])
+    """Database connection context manager (borrowed from the pool)"""
+    bound = _bound_connection.get()
+    if bound is not None:
+        # Unit of work commit/rollback-ийг өөрөө хийнэ
+        yield bound
+        return
+
+    pool = get_pool()
+    conn = pool.getconn()
+    discard = False
     try:
         yield conn
         conn.commit()
     except Exception as e:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except Exception:
+            discard = True
+        if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+            discard = True
         raise e
     finally:
-        conn.close()
+        pool.putconn(conn, discard=discard or conn.closed)
 
 def execute_query(query, params=None, fetch_one=False):
     """Execute query and return results"""
@@ -51,3 +378,110 @@ def execute_delete(query, params=None):
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             cursor.execute(query, params or ())
             return cursor.rowcount
+
+def execute_batch_insert(query, rows, template=None, fetch=False):
+    """
+    Insert many rows with a single multi-row INSERT (psycopg2 execute_values).
+    query нь `VALUES %s` агуулсан байна. fetch=True бол RETURNING мөрүүдийг буцаана.
+    """
+    rows = list(rows)
+    if not rows:
+        return [] if fetch else 0
+    with get_db_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            result = execute_values(
+                cursor, query, rows,
+                template=template, page_size=len(rows), fetch=fetch
+            )
+            if fetch:
+                return [dict(row) for row in result]
+            return cursor.rowcount
+
+
+# Бие биеэсээ хамааралгүй унших query-үүдийг зэрэг ажиллуулах executor (процесс бүрт).
+# Slot-ийн тоо executor-ийн thread-ийн тоотой тэнцүү тул submit хийсэн query дараалалд хүлээхгүй.
+_parallel_executor = None
+_parallel_slots = None
+_parallel_pid = None
+_parallel_lock = threading.Lock()
+
+
+def _get_parallel_executor():
+    """(executor, slots) sized to DB_PARALLEL_WORKERS but never above the pool"""
+    global _parallel_executor, _parallel_slots, _parallel_pid
+    pid = os.getpid()
+    if _parallel_executor is not None and _parallel_pid == pid:
+        return _parallel_executor, _parallel_slots
+
+    with _parallel_lock:
+        if _parallel_executor is None or _parallel_pid != pid:
+            # Request-ийн thread өөрөө нэг холболт эзэлдэг тул pool-оос нэгийг үлдээнэ
+            workers = getattr(settings, 'DB_PARALLEL_WORKERS', 4)
+            workers = max(1, min(workers, get_pool().max_size - 1))
+            _parallel_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db-parallel')
+            _parallel_slots = threading.BoundedSemaphore(workers)
+            _parallel_pid = pid
+    return _parallel_executor, _parallel_slots
+
+
+def _timed_query(timings, name, query, params, fetch_one):
+    started = time.perf_counter()
+    try:
+        return execute_query(query, params, fetch_one)
+    finally:
+        if timings is not None:
+            timings[name] = (time.perf_counter() - started) * 1000
+
+
+def execute_parallel(queries, timings=None):
+    """
+    Run independent read queries concurrently, each on its own pooled connection.
+    queries: {name: (query, params, fetch_one)} -> {name: result}
+    timings dict өгвөл query бүрийн хугацааг (ms) болон нийт "fanout"-ыг бичнэ.
+
+    Дуудсан thread эхний query-г (болон slot олдоогүй бусдыг) өөрөө дараалан
+    ажиллуулна. Нэмэлт thread-ийг зөвхөн хүлээлгүй авсан slot, pool-д сул холболт
+    байвал өгнө (нэг request-д DB_PARALLEL_MAX_PER_REQUEST хүртэл), тиймээс ачаалалтай
+    үед энгийн дараалсан гүйцэтгэл рүү буцна.
+    Unit of work-ийн transaction-д хамаарахгүй тул зөвхөн уншихад ашиглана.
+    """
+    started = time.perf_counter()
+    items = list(queries.items())
+    executor, slots = _get_parallel_executor()
+
+    limit = min(
+        len(items) - 1,
+        getattr(settings, 'DB_PARALLEL_MAX_PER_REQUEST', 3),
+        get_pool().available(),
+    )
+    acquired = 0
+    while acquired < limit and slots.acquire(blocking=False):
+        acquired += 1
+
+    results = {}
+    futures = {}
+    try:
+        for name, (query, params, fetch_one) in items[1:acquired + 1]:
+            futures[name] = executor.submit(_timed_query, timings, name, query, params, fetch_one)
+        for name, (query, params, fetch_one) in items[:1] + items[acquired + 1:]:
+            results[name] = _timed_query(timings, name, query, params, fetch_one)
+        for name, future in futures.items():
+            results[name] = future.result()
+    finally:
+        # Алдаа гарсан ч ажиллаж буй query-г дуустал slot-ийг чөлөөлөхгүй
+        wait(futures.values())
+        for _ in range(acquired):
+            slots.release()
+
+    if timings is not None:
+        timings['fanout'] = (time.perf_counter() - started) * 1000
+    return {name: results[name] for name, _ in items}
+
+
+def add_server_timing(response, timings):
+    """DEBUG үед query бүрийн хугацааг Server-Timing header-т нэмнэ"""
+    if getattr(settings, 'DEBUG', False) and timings:
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration:.1f}' for name, duration in timings.items()
+        )
+    return response
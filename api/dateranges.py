@@ -0,0 +1,58 @@
+from datetime import date, datetime, time, timedelta
+from django.conf import settings
+from django.utils import timezone
+
+# ----------------------------
+# Sargable date ranges
+# ----------------------------
+# Хэрэглэгчийн өгсөн өдрүүдийг Asia/Ulaanbaatar (settings.TIME_ZONE)-ийн
+# [эхлэл, төгсгөл) timestamp муж болгоно. DATE(o."created_at") гэх мэт баганыг
+# функцэд оруулбал индекс ашиглагдахгүй; "created_at" >= %s AND < %s бол
+# (res_id, created_at) индексээр range scan хийнэ.
+
+
+def parse_day(value):
+    """'YYYY-MM-DD' (or a date) -> date; ValueError on anything else"""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip())
+
+
+def local_today():
+    return timezone.localdate()
+
+
+def day_start(day):
+    """Aware midnight of `day` in the project time zone"""
+    return timezone.make_aware(datetime.combine(parse_day(day), time.min))
+
+
+def day_range(date_from=None, date_to=None):
+    """
+    Half-open (start, end) aware datetimes covering date_from..date_to inclusive.
+    Өгөгдөөгүй тал нь None.
+    """
+    start = day_start(date_from) if date_from else None
+    end = day_start(parse_day(date_to) + timedelta(days=1)) if date_to else None
+    return start, end
+
+
+def range_filter(column, date_from=None, date_to=None):
+    """(' AND col >= %s AND col < %s', params) for appending to a WHERE clause"""
+    start, end = day_range(date_from, date_to)
+    sql, params = '', []
+    if start is not None:
+        sql += f' AND {column} >= %s'
+        params.append(start)
+    if end is not None:
+        sql += f' AND {column} < %s'
+        params.append(end)
+    return sql, params
+
+
+def local_day_sql(column):
+    """SQL expression for the project-local calendar day of a timestamptz column"""
+    zone = str(settings.TIME_ZONE).replace("'", "''")
+    return f"(({column}) AT TIME ZONE '{zone}')::date"
@@ -1,5 +1,5 @@
 from django.urls import path
-from .view import SignUpView, SignInView, ProfileView, AvailableOrdersView, MyOrdersView , DeliveryView, UpdateDeliveryStatusView, UpdateProfileView
+from .view import SignUpView, SignInView, ProfileView, AvailableOrdersView, MyOrdersView , DeliveryView, UpdateDeliveryStatusView, UpdateProfileView, DriverOrderStreamView
 
 
 
@@ -12,4 +12,5 @@ urlpatterns = [
     path("driver/orders/my/", MyOrdersView.as_view()),
     path("driver/orders/delivery/", DeliveryView.as_view()),
     path("driver/orders/delivery_status/", UpdateDeliveryStatusView.as_view()),
+    path("driver/orders/stream/", DriverOrderStreamView.as_view()),
 ]   
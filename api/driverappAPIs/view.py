@@ -15,12 +15,16 @@ from .serializers import (
     DeliveryStatusSerializer,
 )
 
-from ..database import execute_query, execute_insert
+from ..database import execute_query, execute_insert, execute_update, transactional, unit_of_work
+from ..order_events import order_status_changed, event_stream_response, DRIVER_CHANNEL
+from ..hashing import check_login_attempts, record_login_failure, clear_login_failures
+from ..credentials import rehash_if_needed
 from ..auth import (
     hash_password,
     verify_password,
     create_access_token,
     JWTAuthentication,
+    invalidate_principal,
 )
 from psycopg2.errors import UniqueViolation
 
@@ -66,69 +70,77 @@ class SignUpView(APIView):
 
         data = serializer.validated_data
 
-        # 1) Duplicate email/phone
-        if execute_query(
-            """
-            SELECT "workerID"
-            FROM "tbl_worker"
-            WHERE "email" = %s OR "phone" = %s
-            """,
-            (data["email"], data["phone"]),
-            fetch_one=True
-        ):
-            return Response(
-                {"error": "Имэйл эсвэл утасны дугаар аль хэдийн бүртгэлтэй байна"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
+        # Hash, зураг upload-ыг transaction-аас гадуур хийнэ (pool-ийн холболт барихгүй)
         password_hash = hash_password(data["password"])
 
-        # 2) Insert worker as PENDING (store ONLY number+series)
-        try:
-            worker = execute_insert(
+        with unit_of_work():
+            # 1) Duplicate email/phone
+            if execute_query(
                 """
-                INSERT INTO "tbl_worker"
-                ("workerName","phone","email","password_hash",
-                 "vehicleType","vehicleNumber","vehicleSeries",
-                 "image","isApproved")
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                RETURNING "workerID","workerName","phone","email",
-                          "vehicleType","vehicleNumber","vehicleSeries",
-                          "image","isApproved"
+                SELECT "workerID"
+                FROM "tbl_worker"
+                WHERE "email" = %s OR "phone" = %s
                 """,
-                (
-                    data["workerName"],
-                    data["phone"],
-                    data["email"],
-                    password_hash,
-                    data.get("vehicleType"),
-                    vehicle_number,
-                    vehicle_series,
-                    None,
-                    False,
+                (data["email"], data["phone"]),
+                fetch_one=True
+            ):
+                return Response(
+                    {"error": "Имэйл эсвэл утасны дугаар аль хэдийн бүртгэлтэй байна"},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-            )
-        except UniqueViolation:
-            return Response(
-                {"error": f"{vehicle_series} үсгийн цуваанд {vehicle_number} дугаар давхцаж байна"},
-                status=400
-            )
 
-        # 3) Optional image upload
+            # 2) Insert worker as PENDING (store ONLY number+series)
+            try:
+                worker = execute_insert(
+                    """
+                    INSERT INTO "tbl_worker"
+                    ("workerName","phone","email","password_hash",
+                     "vehicleType","vehicleNumber","vehicleSeries",
+                     "image","isApproved")
+                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                    RETURNING "workerID","workerName","phone","email",
+                              "vehicleType","vehicleNumber","vehicleSeries",
+                              "image","isApproved"
+                    """,
+                    (
+                        data["workerName"],
+                        data["phone"],
+                        data["email"],
+                        password_hash,
+                        data.get("vehicleType"),
+                        vehicle_number,
+                        vehicle_series,
+                        None,
+                        False,
+                    )
+                )
+            except UniqueViolation:
+                return Response(
+                    {"error": f"{vehicle_series} үсгийн цуваанд {vehicle_number} дугаар давхцаж байна"},
+                    status=400
+                )
+
+        # 3) Optional image upload (commit хийсний дараа; public_id нь workerID)
+        image_error = None
         image_file = request.FILES.get("image")
         if image_file:
-            image_url = upload_worker_image(image_file, worker["workerID"])
-            worker = execute_insert(
-                """
-                UPDATE "tbl_worker"
-                SET "image" = %s
-                WHERE "workerID" = %s
-                RETURNING "workerID","workerName","phone","email",
-                          "vehicleType","vehicleNumber","vehicleSeries",
-                          "image","isApproved"
-                """,
-                (image_url, worker["workerID"])
-            )
+            try:
+                image_url = upload_worker_image(image_file, worker["workerID"])
+            except Exception as e:
+                # Бүртгэл хэвээр үлдэнэ, зургийг профайлаас дахин оруулж болно
+                image_error = f"Зураг upload хийхэд алдаа гарлаа: {e}"
+            else:
+                worker = execute_insert(
+                    """
+                    UPDATE "tbl_worker"
+                    SET "image" = %s
+                    WHERE "workerID" = %s
+                    RETURNING "workerID","workerName","phone","email",
+                              "vehicleType","vehicleNumber","vehicleSeries",
+                              "image","isApproved"
+                    """,
+                    (image_url, worker["workerID"])
+                )
 
         return Response(
             {
@@ -143,7 +155,8 @@ class SignUpView(APIView):
                     "vehicleNumber": worker.get("vehicleNumber"),
                     "vehicleSeries": worker.get("vehicleSeries"),
                     "isApproved": worker.get("isApproved"),
-                }
+                },
+                **({"image_error": image_error} if image_error else {}),
             },
             status=status.HTTP_201_CREATED
         )
@@ -263,6 +276,7 @@ class UpdateProfileView(APIView):
                 {"error": f"{vehicle_series} үсгийн цуваанд {vehicle_number} дугаар давхцаж байна"},
                 status=400
             )
+        invalidate_principal(worker_id, namespace='worker')
 
         return Response(
             {
@@ -295,6 +309,7 @@ class SignInView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         data = serializer.validated_data
+        check_login_attempts(request, 'worker', data["email"])
 
         worker = execute_query(
             """
@@ -308,10 +323,16 @@ class SignInView(APIView):
         )
 
         if not worker or not verify_password(data["password"], worker["password_hash"]):
+            record_login_failure(request, 'worker', data["email"])
             return Response(
                 {"error": "Имэйл эсвэл нууц үг буруу байна"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
+        clear_login_failures(request, 'worker', data["email"])
+        rehash_if_needed(data["password"], worker["password_hash"], 'bcrypt', lambda new_hash: execute_update(
+            'UPDATE "tbl_worker" SET "password_hash" = %s WHERE "workerID" = %s',
+            (new_hash, worker["workerID"])
+        ))
 
         if not worker["isApproved"]:
             return Response(
@@ -437,6 +458,7 @@ class DeliveryView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @transactional
     def post(self, request):
         worker = request.user
 
@@ -450,7 +472,7 @@ class DeliveryView(APIView):
         # Ensure order exists
         order = execute_query(
             """
-            SELECT "orderID"
+            SELECT "orderID", "res_id", "status"
             FROM "tbl_order"
             WHERE "orderID" = %s
             """,
@@ -491,6 +513,7 @@ class DeliveryView(APIView):
                 """,
                 ("accepted", order_id)
             )
+            order_status_changed(order_id, order["res_id"], order["status"], "accepted")
 
             return Response(
                 {"message": "Захиалгыг амжилттай авлаа", "delivery": delivery},
@@ -537,6 +560,7 @@ class DeliveryView(APIView):
             """,
             ("delivered", order_id)
         )
+        order_status_changed(order_id, order["res_id"], order["status"], "delivered")
 
         return Response({"message": "Хүргэлт амжилттай дууслаа"}, status=status.HTTP_200_OK)
 
@@ -544,6 +568,7 @@ class UpdateDeliveryStatusView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @transactional
     def post(self, request):
         worker = getattr(request, "worker", None) or request.user
         if not worker:
@@ -562,7 +587,7 @@ class UpdateDeliveryStatusView(APIView):
         # 1️⃣ Захиалга байгаа эсэх
         order = execute_query(
             """
-            SELECT "orderID"
+            SELECT "orderID", "res_id", "status"
             FROM "tbl_order"
             WHERE "orderID" = %s
             """,
@@ -602,6 +627,7 @@ class UpdateDeliveryStatusView(APIView):
             """,
             (status_name, order_id)
         )
+        order_status_changed(order_id, order["res_id"], order["status"], status_name)
 
         return Response(
             {
@@ -612,3 +638,14 @@ class UpdateDeliveryStatusView(APIView):
             },
             status=status.HTTP_200_OK
         )
+
+class DriverOrderStreamView(APIView):
+    """
+    GET /driver/orders/stream/
+    Server-Sent Events: шинэ захиалга, төлөвийн өөрчлөлт (available orders-г poll хийхгүй)
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return event_stream_response([DRIVER_CHANNEL])
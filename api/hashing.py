@@ -0,0 +1,115 @@
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+
+# ----------------------------
+# Password hashing executor
+# ----------------------------
+# bcrypt/PBKDF2 нь CPU их иддэг тул request thread бүр зэрэг hash хийхгүй,
+# PASSWORD_HASH_WORKERS хэмжээтэй тусдаа executor дээр ажиллана.
+# Executor дүүрч, дараалал PASSWORD_HASH_QUEUE_LIMIT-ээс хэтэрвэл 429 буцаана.
+
+_executor = None
+_slots = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _slots, _executor_pid
+    pid = os.getpid()
+    if _executor is not None and _executor_pid == pid:
+        return _executor, _slots
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            workers = max(1, getattr(settings, 'PASSWORD_HASH_WORKERS', 2))
+            queue_limit = max(0, getattr(settings, 'PASSWORD_HASH_QUEUE_LIMIT', 8))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            # Ажиллаж байгаа + хүлээж буй нийт ажлын тоо
+            _slots = threading.BoundedSemaphore(workers + queue_limit)
+            _executor_pid = pid
+    return _executor, _slots
+
+
+def run_hashing(func, *args):
+    """
+    Run a password hash/verify function on the hashing executor.
+    Raises Throttled (429) instead of queueing past the configured depth.
+    """
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise Throttled(wait=1, detail='Сервер ачаалал ихтэй байна. Түр хүлээгээд дахин оролдоно уу.')
+    try:
+        future = executor.submit(func, *args)
+        return future.result()
+    finally:
+        slots.release()
+
+
+# ----------------------------
+# Login attempt throttling
+# ----------------------------
+# Буруу оролдлогын тоолуур Django cache-д хадгалагдана. Worker бүр нэг тоолуур харах
+# ёстой тул shared cache (REDIS_URL) шаардлагатай: DEBUG биш үед settings үүнийг
+# шаардана. LocMem (DEBUG эсвэл ALLOW_LOCAL_CACHE) үед хязгаар процесс бүрт тусдаа,
+# worker дахин эхлэхэд тэглэгдэнэ — зөвхөн нэг процесстой орчинд л зөв.
+
+def get_client_ip(request):
+    """
+    Client address for throttling. X-Forwarded-For-ийн эхний утгыг client өөрөө
+    бичиж болох тул зөвхөн TRUSTED_PROXY_COUNT итгэмжлэгдсэн proxy-ийн нэмсэн
+    (баруун талаас N дэх) утгыг авна; proxy байхгүй бол REMOTE_ADDR.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies <= 0 or not forwarded:
+        return remote_addr
+    entries = [entry.strip() for entry in forwarded.split(',') if entry.strip()]
+    if len(entries) < proxies:
+        return remote_addr
+    return entries[-proxies]
+
+
+def _attempt_keys(request, scope, identifier):
+    account = hashlib.sha1(f'{scope}:{identifier or ""}'.lower().encode('utf-8')).hexdigest()
+    return (
+        f'login_fail:acct:{account}',
+        f'login_fail:ip:{get_client_ip(request)}',
+    )
+
+
+def check_login_attempts(request, scope, identifier):
+    """
+    Call before looking up / verifying the password.
+    Данс эсвэл IP-ээс LOGIN_ATTEMPT_LIMIT-ээс олон удаа буруу оролдсон бол hash тооцохгүй.
+    """
+    limit = getattr(settings, 'LOGIN_ATTEMPT_LIMIT', 5)
+    window = getattr(settings, 'LOGIN_ATTEMPT_WINDOW', 300)
+    account_key, ip_key = _attempt_keys(request, scope, identifier)
+    counts = cache.get_many([account_key, ip_key])
+
+    # IP-ийн хязгаар нь олон данс руу оролдохыг хаана
+    if counts.get(account_key, 0) >= limit or counts.get(ip_key, 0) >= limit * 4:
+        raise Throttled(wait=window, detail='Хэт олон удаа буруу оролдлоо. Түр хүлээгээд дахин оролдоно уу.')
+
+
+def record_login_failure(request, scope, identifier):
+    window = getattr(settings, 'LOGIN_ATTEMPT_WINDOW', 300)
+    for key in _attempt_keys(request, scope, identifier):
+        # add нь зөвхөн түлхүүр байхгүй үед window-г эхлүүлнэ
+        cache.add(key, 0, window)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, window)
+
+
+def clear_login_failures(request, scope, identifier):
+    account_key, _ = _attempt_keys(request, scope, identifier)
+    cache.delete(account_key)
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from api.database import execute_query, execute_update
+
+
+class Command(BaseCommand):
+    help = 'Populate tbl_order.res_id from order lines for orders created before the column existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+
+        # Жижиг багцаар шинэчилж, урт lock үүсгэхгүй байх.
+        # resID-гүй хоолыг алгасна: эс бөгөөс NULL-ийг NULL-ээр сольж нэг багцыг үүрд сонгоно
+        while True:
+            updated = execute_update("""
+                UPDATE tbl_order o
+                SET "res_id" = src."resID"
+                FROM (
+                    SELECT o2."orderID", MIN(f."resID") AS "resID"
+                    FROM tbl_order o2
+                    JOIN tbl_orderfood of ON of."orderID" = o2."orderID"
+                    JOIN tbl_food f ON f."foodID" = of."foodID"
+                    WHERE o2."res_id" IS NULL AND f."resID" IS NOT NULL
+                    GROUP BY o2."orderID"
+                    LIMIT %s
+                ) src
+                WHERE o."orderID" = src."orderID"
+            """, (batch_size,))
+
+            if not updated:
+                break
+            total += updated
+            self.stdout.write(f'{total} orders backfilled...')
+
+        # Олон рестораны хоол агуулсан хуучин захиалгыг мэдээлэх
+        mixed = execute_query("""
+            SELECT COUNT(*) AS count
+            FROM (
+                SELECT of."orderID"
+                FROM tbl_orderfood of
+                JOIN tbl_food f ON f."foodID" = of."foodID"
+                GROUP BY of."orderID"
+                HAVING COUNT(DISTINCT f."resID") > 1
+            ) t
+        """, fetch_one=True)
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {total} orders backfilled'))
+        if mixed and mixed['count']:
+            self.stdout.write(self.style.WARNING(
+                f'{mixed["count"]} orders contain foods from several restaurants; '
+                f'they were assigned to the lowest resID'
+            ))
@@ -0,0 +1,59 @@
+import os
+import time
+import bcrypt
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.credentials import TunedPBKDF2PasswordHasher, bcrypt_rounds
+
+
+def _measure(func, seconds):
+    """Run func on one thread until `seconds` elapse; return (count, elapsed)"""
+    count = 0
+    started = time.perf_counter()
+    while True:
+        func()
+        count += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return count, elapsed
+
+
+class Command(BaseCommand):
+    help = 'Report password hashes/sec per core for each credential scheme and cost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=2.0, help='Time spent per cost setting')
+        parser.add_argument('--bcrypt-rounds', type=int, nargs='*', help='bcrypt costs to try (default: target-1..target+1)')
+        parser.add_argument('--pbkdf2-iterations', type=int, nargs='*', help='PBKDF2 iteration counts to try')
+
+    def handle(self, *args, **options):
+        seconds = options['seconds']
+        password = 'benchmark-password'
+        target_rounds = bcrypt_rounds()
+        target_iterations = TunedPBKDF2PasswordHasher.iterations
+
+        rounds_list = options['bcrypt_rounds'] or [target_rounds - 1, target_rounds, target_rounds + 1]
+        iterations_list = options['pbkdf2_iterations'] or [target_iterations // 2, target_iterations, target_iterations * 2]
+
+        workers = getattr(settings, 'PASSWORD_HASH_WORKERS', 2)
+        self.stdout.write(f'CPU cores: {os.cpu_count()}, PASSWORD_HASH_WORKERS: {workers}')
+        self.stdout.write(f'{"scheme":<10}{"cost":>12}{"hash/s/core":>14}{"ms/hash":>10}{"hash/s (pool)":>16}')
+
+        for rounds in rounds_list:
+            salt = bcrypt.gensalt(rounds=rounds)
+            count, elapsed = _measure(lambda: bcrypt.hashpw(password.encode('utf-8'), salt), seconds)
+            self._row('bcrypt', rounds, count, elapsed, workers, rounds == target_rounds)
+
+        hasher = TunedPBKDF2PasswordHasher()
+        salt = hasher.salt()
+        for iterations in iterations_list:
+            count, elapsed = _measure(lambda: hasher.encode(password, salt, iterations), seconds)
+            self._row('pbkdf2', iterations, count, elapsed, workers, iterations == target_iterations)
+
+    def _row(self, scheme, cost, count, elapsed, workers, is_target):
+        per_core = count / elapsed
+        line = f'{scheme:<10}{cost:>12}{per_core:>14.2f}{1000 / per_core:>10.1f}{per_core * workers:>16.2f}'
+        if is_target:
+            line += '  <- target'
+        self.stdout.write(line)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily sales rollup tables from tbl_order'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--res-id', type=int, default=None, help='Only this restaurant')
+
+    def handle(self, *args, **options):
+        res_id = options['res_id']
+        rows = rebuild_rollups(res_id)
+        scope = f'restaurant {res_id}' if res_id is not None else 'all restaurants'
+        self.stdout.write(self.style.SUCCESS(f'Done: {rows} daily status rows rebuilt for {scope}'))
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Store line subtotals and order totals at write time"""
+
+    dependencies = []
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                ALTER TABLE tbl_order ADD COLUMN IF NOT EXISTS "total_price" NUMERIC(12, 2);
+                ALTER TABLE tbl_orderfood ADD COLUMN IF NOT EXISTS "subtotal" NUMERIC(12, 2);
+
+                UPDATE tbl_orderfood
+                SET "subtotal" = "stock" * "price"
+                WHERE "subtotal" IS NULL;
+
+                UPDATE tbl_order o
+                SET "total_price" = t.total
+                FROM (
+                    SELECT "orderID", SUM("subtotal") AS total
+                    FROM tbl_orderfood
+                    GROUP BY "orderID"
+                ) t
+                WHERE t."orderID" = o."orderID"
+                  AND o."total_price" IS NULL;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
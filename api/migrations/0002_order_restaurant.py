@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Carry the owning restaurant on tbl_order (backfill: manage.py backfill_order_restaurant)"""
+
+    dependencies = [
+        ('api', '0001_order_totals'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                ALTER TABLE tbl_order ADD COLUMN IF NOT EXISTS "res_id" INTEGER;
+
+                CREATE INDEX IF NOT EXISTS tbl_order_res_id_created_at_idx
+                    ON tbl_order ("res_id", "created_at" DESC);
+                CREATE INDEX IF NOT EXISTS tbl_order_res_id_status_idx
+                    ON tbl_order ("res_id", "status");
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS tbl_order_res_id_status_idx;
+                DROP INDEX IF EXISTS tbl_order_res_id_created_at_idx;
+            """,
+        ),
+    ]
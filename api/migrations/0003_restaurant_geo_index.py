@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Index restaurant coordinates for the nearby bounding-box prefilter"""
+
+    dependencies = [
+        ('api', '0002_order_restaurant'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX IF NOT EXISTS tbl_restaurant_lat_lng_idx
+                    ON tbl_restaurant ("lat", "lng")
+                    WHERE "lat" IS NOT NULL AND "lng" IS NOT NULL;
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS tbl_restaurant_lat_lng_idx;
+            """,
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Trigram indexes for name search (api/search.py).
+    lower() болон pg_trgm нь кирилл үсгийг зөв задлахын тулд DB нь UTF8
+    encoding, UTF-8 LC_CTYPE-тэй байх ёстой.
+    """
+
+    dependencies = [
+        ('api', '0003_restaurant_geo_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+                CREATE INDEX IF NOT EXISTS tbl_restaurant_name_trgm_idx
+                    ON tbl_restaurant USING gin (lower("resName") gin_trgm_ops);
+                CREATE INDEX IF NOT EXISTS tbl_food_name_trgm_idx
+                    ON tbl_food USING gin (lower("foodName") gin_trgm_ops);
+                CREATE INDEX IF NOT EXISTS tbl_drinks_name_trgm_idx
+                    ON tbl_drinks USING gin (lower("drink_name") gin_trgm_ops);
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS tbl_drinks_name_trgm_idx;
+                DROP INDEX IF EXISTS tbl_food_name_trgm_idx;
+                DROP INDEX IF EXISTS tbl_restaurant_name_trgm_idx;
+            """,
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Append-only menu change feed (restaurant/<resID>/menu/?changes_since=)"""
+
+    dependencies = [
+        ('api', '0004_search_trgm'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS tbl_menu_change (
+                    "version" BIGSERIAL PRIMARY KEY,
+                    "res_id" INTEGER NOT NULL,
+                    "item_type" VARCHAR(20) NOT NULL,
+                    "item_id" INTEGER NOT NULL,
+                    "op" VARCHAR(10) NOT NULL,
+                    "changed_at" TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+
+                CREATE INDEX IF NOT EXISTS tbl_menu_change_res_id_version_idx
+                    ON tbl_menu_change ("res_id", "version");
+            """,
+            reverse_sql="""
+                DROP TABLE IF EXISTS tbl_menu_change;
+            """,
+        ),
+    ]
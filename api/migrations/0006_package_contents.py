@@ -0,0 +1,72 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Materialized package contents (api/restaurantAPIs/packages.py).
+    Одоо байгаа багцуудыг нэг удаа бөглөнө.
+    """
+
+    dependencies = [
+        ('api', '0005_menu_change_log'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                ALTER TABLE tbl_package
+                    ADD COLUMN IF NOT EXISTS "foods" JSONB NOT NULL DEFAULT '[]'::jsonb,
+                    ADD COLUMN IF NOT EXISTS "drinks" JSONB NOT NULL DEFAULT '[]'::jsonb,
+                    ADD COLUMN IF NOT EXISTS "total_price_computed" NUMERIC NOT NULL DEFAULT 0;
+
+                CREATE INDEX IF NOT EXISTS tbl_package_restaurant_id_idx
+                    ON tbl_package ("restaurant_id");
+
+                UPDATE tbl_package p SET
+                    "foods" = COALESCE((
+                        SELECT jsonb_agg(jsonb_build_object(
+                            'foodID', f."foodID",
+                            'foodName', f."foodName",
+                            'price', f."price",
+                            'quantity', pf."quantity",
+                            'subtotal', pf."quantity" * f."price",
+                            'image', f."image"
+                        ) ORDER BY pf."id")
+                        FROM tbl_package_food pf
+                        JOIN tbl_food f ON f."foodID" = pf."food_id"
+                        WHERE pf."package_id" = p."package_id"
+                    ), '[]'::jsonb),
+                    "drinks" = COALESCE((
+                        SELECT jsonb_agg(jsonb_build_object(
+                            'drink_id', d."drink_id",
+                            'drink_name', d."drink_name",
+                            'price', d."price",
+                            'quantity', pd."quantity",
+                            'subtotal', pd."quantity" * d."price",
+                            'img', d."img"
+                        ) ORDER BY pd."id")
+                        FROM tbl_package_drinks pd
+                        JOIN tbl_drinks d ON d."drink_id" = pd."drink_id"
+                        WHERE pd."package_id" = p."package_id"
+                    ), '[]'::jsonb),
+                    "total_price_computed" = COALESCE((
+                        SELECT SUM(pf."quantity" * f."price")
+                        FROM tbl_package_food pf
+                        JOIN tbl_food f ON f."foodID" = pf."food_id"
+                        WHERE pf."package_id" = p."package_id"
+                    ), 0) + COALESCE((
+                        SELECT SUM(pd."quantity" * d."price")
+                        FROM tbl_package_drinks pd
+                        JOIN tbl_drinks d ON d."drink_id" = pd."drink_id"
+                        WHERE pd."package_id" = p."package_id"
+                    ), 0);
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS tbl_package_restaurant_id_idx;
+                ALTER TABLE tbl_package
+                    DROP COLUMN IF EXISTS "total_price_computed",
+                    DROP COLUMN IF EXISTS "drinks",
+                    DROP COLUMN IF EXISTS "foods";
+            """,
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Daily per-restaurant sales rollups (api/rollups.py).
+    Хүснэгтүүдийг дүүргэх: manage.py rebuild_sales_rollups
+    """
+
+    dependencies = [
+        ('api', '0006_package_contents'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS tbl_sales_daily (
+                    "res_id" INTEGER NOT NULL,
+                    "day" DATE NOT NULL,
+                    "status" VARCHAR(50) NOT NULL,
+                    "orders" INTEGER NOT NULL DEFAULT 0,
+                    "revenue" NUMERIC(14, 2) NOT NULL DEFAULT 0,
+                    "first_order_at" TIMESTAMPTZ,
+                    "last_order_at" TIMESTAMPTZ,
+                    PRIMARY KEY ("res_id", "day", "status")
+                );
+
+                CREATE TABLE IF NOT EXISTS tbl_sales_daily_customer (
+                    "res_id" INTEGER NOT NULL,
+                    "day" DATE NOT NULL,
+                    "customer_id" TEXT NOT NULL,
+                    PRIMARY KEY ("res_id", "day", "customer_id")
+                );
+
+                CREATE TABLE IF NOT EXISTS tbl_sales_daily_food (
+                    "res_id" INTEGER NOT NULL,
+                    "day" DATE NOT NULL,
+                    "food_id" INTEGER NOT NULL,
+                    "order_count" INTEGER NOT NULL DEFAULT 0,
+                    "quantity" INTEGER NOT NULL DEFAULT 0,
+                    "revenue" NUMERIC(14, 2) NOT NULL DEFAULT 0,
+                    PRIMARY KEY ("res_id", "day", "food_id")
+                );
+            """,
+            reverse_sql="""
+                DROP TABLE IF EXISTS tbl_sales_daily_food;
+                DROP TABLE IF EXISTS tbl_sales_daily_customer;
+                DROP TABLE IF EXISTS tbl_sales_daily;
+            """,
+        ),
+    ]
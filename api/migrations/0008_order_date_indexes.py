@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Indexes for half-open created_at / date range filters (api/dateranges.py).
+    tbl_order_res_id_created_at_idx (0002) нь рестораны жагсаалтыг хамарна.
+    """
+
+    dependencies = [
+        ('api', '0007_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX IF NOT EXISTS tbl_order_res_id_status_created_at_idx
+                    ON tbl_order ("res_id", "status", "created_at" DESC);
+                CREATE INDEX IF NOT EXISTS tbl_order_created_at_idx
+                    ON tbl_order ("created_at");
+                CREATE INDEX IF NOT EXISTS tbl_order_status_date_idx
+                    ON tbl_order ("status", "date");
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS tbl_order_status_date_idx;
+                DROP INDEX IF EXISTS tbl_order_created_at_idx;
+                DROP INDEX IF EXISTS tbl_order_res_id_status_created_at_idx;
+            """,
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    created_at on restaurants/workers for the admin statistics windows.
+    Хуучин мөрүүд NULL үлдэнэ (бүртгүүлсэн огноо тодорхойгүй тул цонхонд орохгүй).
+    """
+
+    dependencies = [
+        ('api', '0008_order_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                ALTER TABLE tbl_restaurant ADD COLUMN IF NOT EXISTS "created_at" TIMESTAMPTZ;
+                ALTER TABLE tbl_restaurant ALTER COLUMN "created_at" SET DEFAULT NOW();
+                ALTER TABLE "tbl_worker" ADD COLUMN IF NOT EXISTS "created_at" TIMESTAMPTZ;
+                ALTER TABLE "tbl_worker" ALTER COLUMN "created_at" SET DEFAULT NOW();
+
+                CREATE INDEX IF NOT EXISTS tbl_restaurant_created_at_idx
+                    ON tbl_restaurant ("created_at");
+                CREATE INDEX IF NOT EXISTS tbl_worker_created_at_idx
+                    ON "tbl_worker" ("created_at");
+                CREATE INDEX IF NOT EXISTS users_created_at_idx
+                    ON users ("created_at");
+                CREATE INDEX IF NOT EXISTS tbl_sales_daily_day_idx
+                    ON tbl_sales_daily ("day");
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS tbl_sales_daily_day_idx;
+                DROP INDEX IF EXISTS users_created_at_idx;
+                DROP INDEX IF EXISTS tbl_worker_created_at_idx;
+                DROP INDEX IF EXISTS tbl_restaurant_created_at_idx;
+            """,
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Append-only PAID revenue ledger for the revenue reports (api/revenue.py).
+    Одоо байгаа PAID захиалгуудыг оруулах: manage.py rebuild_revenue_ledger
+    """
+
+    dependencies = [
+        ('api', '0009_signup_created_at'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS tbl_revenue_ledger (
+                    "entry_id" BIGSERIAL PRIMARY KEY,
+                    "order_id" INTEGER NOT NULL,
+                    "res_id" INTEGER NOT NULL,
+                    "day" DATE NOT NULL,
+                    "orders" SMALLINT NOT NULL,
+                    "amount" NUMERIC(14, 2) NOT NULL,
+                    "food_amount" NUMERIC(14, 2) NOT NULL,
+                    "recorded_at" TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+
+                CREATE INDEX IF NOT EXISTS tbl_revenue_ledger_day_res_id_idx
+                    ON tbl_revenue_ledger ("day", "res_id");
+
+                CREATE INDEX IF NOT EXISTS tbl_revenue_ledger_order_id_idx
+                    ON tbl_revenue_ledger ("order_id");
+            """,
+            reverse_sql="""
+                DROP TABLE IF EXISTS tbl_revenue_ledger;
+            """,
+        ),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Write tbl_revenue_ledger from a trigger on tbl_order.status.
+    PAID төлөвийг энэ repo-оос гадуур (төлбөрийн үйлчилгээ г.м.) бичдэг тул
+    order_events hook-оор биш, бичсэн transaction-ийн commit дээр DB өөрөө бүртгэнэ.
+    """
+
+    dependencies = [
+        ('api', '0010_revenue_ledger'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE OR REPLACE FUNCTION tbl_order_revenue_ledger() RETURNS trigger AS $$
+                DECLARE
+                    was_paid BOOLEAN := FALSE;
+                    now_paid BOOLEAN := UPPER(COALESCE(NEW."status", '')) = 'PAID';
+                BEGIN
+                    IF TG_OP = 'UPDATE' THEN
+                        was_paid := UPPER(COALESCE(OLD."status", '')) = 'PAID';
+                    END IF;
+
+                    IF now_paid AND NOT was_paid THEN
+                        -- Үлдэгдэл 0 үед л бичнэ (давхардахгүй)
+                        INSERT INTO tbl_revenue_ledger ("order_id", "res_id", "day", "orders", "amount", "food_amount")
+                        SELECT o."orderID", o."res_id", (NOW() AT TIME ZONE 'Asia/Ulaanbaatar')::date, 1,
+                               COALESCE(o."total_price", 0),
+                               COALESCE((SELECT SUM(f."subtotal") FROM tbl_orderfood f
+                                         WHERE f."orderID" = o."orderID"), 0)
+                        FROM tbl_order o
+                        WHERE o."orderID" = NEW."orderID" AND o."res_id" IS NOT NULL
+                          AND (SELECT COALESCE(SUM(l."orders"), 0) FROM tbl_revenue_ledger l
+                               WHERE l."order_id" = o."orderID") = 0;
+                    ELSIF was_paid AND NOT now_paid THEN
+                        -- Өмнө бичигдсэн дүнг яг буцаана
+                        INSERT INTO tbl_revenue_ledger ("order_id", "res_id", "day", "orders", "amount", "food_amount")
+                        SELECT "order_id", "res_id", (NOW() AT TIME ZONE 'Asia/Ulaanbaatar')::date, -1,
+                               -SUM("amount"), -SUM("food_amount")
+                        FROM tbl_revenue_ledger
+                        WHERE "order_id" = NEW."orderID"
+                        GROUP BY "order_id", "res_id"
+                        HAVING SUM("orders") > 0;
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                -- DEFERRED: захиалгын мөрүүд (tbl_orderfood) order-ийн дараа бичигддэг
+                DROP TRIGGER IF EXISTS tbl_order_revenue_ledger_trg ON tbl_order;
+                CREATE CONSTRAINT TRIGGER tbl_order_revenue_ledger_trg
+                    AFTER INSERT OR UPDATE OF "status" ON tbl_order
+                    DEFERRABLE INITIALLY DEFERRED
+                    FOR EACH ROW EXECUTE PROCEDURE tbl_order_revenue_ledger();
+            """,
+            reverse_sql="""
+                DROP TRIGGER IF EXISTS tbl_order_revenue_ledger_trg ON tbl_order;
+                DROP FUNCTION IF EXISTS tbl_order_revenue_ledger();
+            """,
+        ),
+    ]
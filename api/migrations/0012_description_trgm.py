@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Trigram indexes on food/drink descriptions.
+    contains_clause нэр OR тайлбарыг шүүдэг тул хоёр багана хоёулаа индекстэй
+    байж BitmapOr хийнэ (эс бөгөөс бүтэн scan).
+    """
+
+    dependencies = [
+        ('api', '0011_revenue_ledger_trigger'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+                CREATE INDEX IF NOT EXISTS tbl_food_description_trgm_idx
+                    ON tbl_food USING gin (lower("description") gin_trgm_ops);
+                CREATE INDEX IF NOT EXISTS tbl_drinks_description_trgm_idx
+                    ON tbl_drinks USING gin (lower("description") gin_trgm_ops);
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS tbl_drinks_description_trgm_idx;
+                DROP INDEX IF EXISTS tbl_food_description_trgm_idx;
+            """,
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Per-restaurant menu version for the changes_since feed.
+    Глобал BIGSERIAL нь insert үед олгогддог тул дараа commit хийгдсэн өөрчлөлт
+    client-ийн авсан version-оос доош орж алгасагдана. tbl_restaurant."menu_version"-г
+    мөрийн lock дор нэмэгдүүлж, тухайн transaction-д change мөрөнд бичнэ.
+    Хуучин мөр хуучин version-оо хадгалж, counter бүр одоогийн дээд утгаас эхэлнэ
+    (client-ийн өмнө авсан version хүчинтэй хэвээр).
+    """
+
+    dependencies = [
+        ('api', '0012_description_trgm'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                ALTER TABLE tbl_restaurant ADD COLUMN IF NOT EXISTS "menu_version" BIGINT NOT NULL DEFAULT 0;
+                ALTER TABLE tbl_menu_change ADD COLUMN IF NOT EXISTS "res_version" BIGINT;
+
+                UPDATE tbl_menu_change SET "res_version" = "version" WHERE "res_version" IS NULL;
+                UPDATE tbl_restaurant
+                SET "menu_version" = (SELECT COALESCE(MAX("version"), 0) FROM tbl_menu_change)
+                WHERE "menu_version" = 0;
+
+                ALTER TABLE tbl_menu_change ALTER COLUMN "res_version" SET NOT NULL;
+
+                CREATE INDEX IF NOT EXISTS tbl_menu_change_res_id_res_version_idx
+                    ON tbl_menu_change ("res_id", "res_version");
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS tbl_menu_change_res_id_res_version_idx;
+                ALTER TABLE tbl_menu_change DROP COLUMN IF EXISTS "res_version";
+                ALTER TABLE tbl_restaurant DROP COLUMN IF EXISTS "menu_version";
+            """,
+        ),
+    ]
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import queue
+import select
+import logging
+import threading
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+
+from .database import get_db_connection
+from .rollups import record_order_created, record_status_change
+
+logger = logging.getLogger(__name__)
+
+# Postgres LISTEN/NOTIFY сувгууд
+DRIVER_CHANNEL = 'orders_drivers'
+
+
+def restaurant_channel(res_id):
+    return f'orders_res_{int(res_id)}'
+
+
+def _notify(channels, payload, cursor=None):
+    """
+    pg_notify нь transaction-д хамаарна: unit of work / atomic блок commit
+    хийгдэх үед л хүргэгдэнэ, rollback болвол илгээгдэхгүй.
+    """
+    message = json.dumps(payload, default=str)
+    if cursor is not None:
+        for channel in channels:
+            cursor.execute('SELECT pg_notify(%s, %s)', [channel, message])
+        return
+
+    with get_db_connection() as conn:
+        with conn.cursor() as c:
+            for channel in channels:
+                c.execute('SELECT pg_notify(%s, %s)', [channel, message])
+
+
+def _channels_for(res_id):
+    channels = [DRIVER_CHANNEL]
+    if res_id is not None:
+        channels.append(restaurant_channel(res_id))
+    return channels
+
+
+def order_created(order, cursor=None):
+    """Call after a new tbl_order row (and its lines) has been written"""
+    record_order_created(order['orderID'], cursor=cursor)
+    _notify(_channels_for(order.get('res_id')), {
+        'event': 'order_created',
+        'orderID': order['orderID'],
+        'resID': order.get('res_id'),
+        'status': order.get('status'),
+        'total_price': order.get('total_price'),
+    }, cursor=cursor)
+
+
+def order_status_changed(order_id, res_id, old_status, new_status, cursor=None):
+    """Call after tbl_order.status has been updated"""
+    record_status_change(order_id, old_status, new_status, cursor=cursor)
+    _notify(_channels_for(res_id), {
+        'event': 'order_status_changed',
+        'orderID': order_id,
+        'resID': res_id,
+        'old_status': old_status,
+        'status': new_status,
+    }, cursor=cursor)
+
+
+class SubscriberLimitReached(Exception):
+    pass
+
+
+class _EventHub:
+    """
+    Process-wide LISTEN connection fanned out to per-subscriber queues.
+
+    Процесс бүр pool-оос гадуур ганц холболтоор LISTEN хийнэ (subscriber бүр
+    холболт нээхгүй). LISTEN/UNLISTEN-ийг зөвхөн listener thread гүйцэтгэнэ;
+    subscribe/unsubscribe нь self-pipe-ээр түүнийг сэрээнэ.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}        # channel -> set(queue)
+        self.count = 0
+        self.listening = set()
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_w, False)
+        self.thread = threading.Thread(target=self._run, name='order-events-listener', daemon=True)
+        self.thread.start()
+
+    def subscribe(self, channels):
+        limit = getattr(settings, 'ORDER_EVENTS_MAX_SUBSCRIBERS', 50)
+        events = queue.Queue(maxsize=getattr(settings, 'ORDER_EVENTS_QUEUE_SIZE', 100))
+        with self.lock:
+            if self.count >= limit:
+                raise SubscriberLimitReached()
+            self.count += 1
+            for channel in channels:
+                self.subscribers.setdefault(channel, set()).add(events)
+        self._wake()
+        return events
+
+    def unsubscribe(self, events, channels):
+        with self.lock:
+            self.count -= 1
+            for channel in channels:
+                queues = self.subscribers.get(channel)
+                if queues is not None:
+                    queues.discard(events)
+                    if not queues:
+                        del self.subscribers[channel]
+        self._wake()
+
+    def _wake(self):
+        try:
+            os.write(self.wake_w, b'.')
+        except BlockingIOError:
+            pass  # listener аль хэдийн сэрэх дохиотой
+
+    def _publish(self, channel, payload):
+        with self.lock:
+            queues = list(self.subscribers.get(channel, ()))
+        for events in queues:
+            try:
+                events.put_nowait(payload)
+            except queue.Full:
+                # Удаан уншигч: хамгийн хуучин event-ийг хаяна
+                try:
+                    events.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    events.put_nowait(payload)
+                except queue.Full:
+                    pass
+
+    def _sync_channels(self, cursor):
+        with self.lock:
+            wanted = set(self.subscribers)
+        for channel in wanted - self.listening:
+            cursor.execute(sql.SQL('LISTEN {}').format(sql.Identifier(channel)))
+        for channel in self.listening - wanted:
+            cursor.execute(sql.SQL('UNLISTEN {}').format(sql.Identifier(channel)))
+        self.listening = wanted
+
+    def _run(self):
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(settings.DATABASE_CONFIG['url'])
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                self.listening = set()
+                while True:
+                    with conn.cursor() as cursor:
+                        self._sync_channels(cursor)
+                    readable, _, _ = select.select([conn, self.wake_r], [], [], 60)
+                    if self.wake_r in readable:
+                        os.read(self.wake_r, 4096)
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self._publish(notify.channel, notify.payload)
+            except Exception:
+                logger.exception('Order event listener failed, reconnecting')
+                time.sleep(3)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+_hub = None
+_hub_pid = None
+_hub_lock = threading.Lock()
+
+
+def _get_hub():
+    global _hub, _hub_pid
+    pid = os.getpid()
+    if _hub is not None and _hub_pid == pid:
+        return _hub
+    # fork хийсний дараа listener thread шинэ процесст байхгүй
+    with _hub_lock:
+        if _hub is None or _hub_pid != pid:
+            _hub = _EventHub()
+            _hub_pid = pid
+        return _hub
+
+
+class OrderEventStream:
+    """
+    Server-Sent Events iterator for one subscriber.
+
+    ORDER_EVENTS_MAX_DURATION секундын дараа стрим хаагдаж, EventSource
+    автоматаар дахин холбогдоно (worker-ийг үүрд эзлэхгүй). Django response
+    хаагдахад close() дуудагдаж subscriber-ийг хасна.
+    """
+
+    def __init__(self, channels):
+        self.channels = list(channels)
+        self.hub = _get_hub()
+        self.events = self.hub.subscribe(self.channels)
+        self.closed = False
+
+    def __iter__(self):
+        heartbeat = getattr(settings, 'ORDER_EVENTS_HEARTBEAT', 15)
+        max_duration = getattr(settings, 'ORDER_EVENTS_MAX_DURATION', 300)
+
+        yield 'retry: 3000\n\n'
+
+        started = time.monotonic()
+        while time.monotonic() - started < max_duration:
+            try:
+                payload = self.events.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            try:
+                event = json.loads(payload).get('event', 'message')
+            except ValueError:
+                event = 'message'
+            yield f'event: {event}\ndata: {payload}\n\n'
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.hub.unsubscribe(self.events, self.channels)
+
+
+def event_stream_response(channels):
+    try:
+        stream = OrderEventStream(channels)
+    except SubscriberLimitReached:
+        response = HttpResponse(
+            json.dumps({'error': 'Too many event stream subscribers, retry later'}),
+            content_type='application/json',
+            status=503
+        )
+        response['Retry-After'] = '5'
+        return response
+
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx буфферлэхгүй
+    return response
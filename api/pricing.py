@@ -0,0 +1,64 @@
+from decimal import Decimal
+from .database import execute_query
+
+# Төрөл бүрийн үнийн эх сурвалж: (хүснэгт, ID багана, рестораны багана)
+PRICE_SOURCES = {
+    'food': ('tbl_food', '"foodID"', '"resID"'),
+    'drink': ('tbl_drinks', '"drink_id"', '"resID"'),
+    'package': ('tbl_package', '"package_id"', '"restaurant_id"'),
+}
+
+
+def resolve_prices(food_ids=(), drink_ids=(), package_ids=()):
+    """
+    Resolve authoritative prices for foods, drinks and packages in one query.
+    Буцаах утга: {('food', 12): {'price': Decimal, 'resID': 3}, ...}
+    Олдоогүй ID-ууд үр дүнд орохгүй.
+    """
+    requested = {'food': food_ids, 'drink': drink_ids, 'package': package_ids}
+
+    parts = []
+    params = []
+    for kind, ids in requested.items():
+        ids = list({int(i) for i in ids})
+        if not ids:
+            continue
+        table, id_column, res_column = PRICE_SOURCES[kind]
+        parts.append(f"""
+            SELECT %s AS kind, {id_column} AS item_id, "price", {res_column} AS "resID"
+            FROM {table}
+            WHERE {id_column} = ANY(%s)
+        """)
+        params.extend([kind, ids])
+
+    if not parts:
+        return {}
+
+    rows = execute_query(" UNION ALL ".join(parts), tuple(params))
+    return {
+        (row['kind'], row['item_id']): {
+            'price': Decimal(row['price']) if row['price'] is not None else None,
+            'resID': row['resID'],
+        }
+        for row in rows
+    }
+
+
+def price_order_lines(lines, prices, kind='food'):
+    """
+    Attach unit price and subtotal to each (item_id, quantity) line.
+    Буцаах утга: (мөрүүд, нийт дүн)
+    """
+    priced = []
+    total = Decimal('0')
+    for item_id, quantity in lines:
+        unit_price = prices[(kind, item_id)]['price'] or Decimal('0')
+        subtotal = unit_price * quantity
+        total += subtotal
+        priced.append({
+            'item_id': item_id,
+            'quantity': quantity,
+            'price': unit_price,
+            'subtotal': subtotal,
+        })
+    return priced, total
@@ -0,0 +1,461 @@
+import io
+import re
+import csv
+import json
+import zipfile
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary.uploader
+from django.conf import settings
+from django.db import connection
+
+from ..database import execute_query, execute_batch_insert, unit_of_work
+from .serializers import FoodSerializer, DrinkSerializer, PackageSerializer
+from .menu import record_menu_changes
+from .packages import refresh_package_contents
+
+# ----------------------------
+# Bulk menu import / export
+# ----------------------------
+# CSV болон JSON нэг ижил хавтгай мөрийн хэлбэртэй (CSV_FIELDS). Багцын "items"
+# нь "Хоолны нэр:2;Ундааны нэр:1" (эсвэл JSON-д [{"name", "quantity"}]) бөгөөд
+# рестораны одоо байгаа эсвэл энэ файлд шинээр орж буй хоол/ундааг нэрээр заана.
+# Нэр доторх ":", ";" болон "\"-г "\"-ээр escape хийнэ ("Бууз\;Банш:2").
+# Бүх мөрийг эхлээд шалгаж (ангилал нэг query), дараа нь нэг transaction-д
+# хүснэгт бүрт нэг multi-row INSERT хийнэ.
+
+CSV_FIELDS = ['type', 'name', 'price', 'catID', 'description', 'portion', 'image', 'items']
+ROW_TYPES = ('food', 'drink', 'package')
+
+# JSON-ийн {"foods": [...], ...} хэлбэр болон API-ийн талбарын нэрс
+GROUP_KEYS = {'foods': 'food', 'drinks': 'drink', 'packages': 'package'}
+FIELD_ALIASES = {
+    'foodName': 'name', 'drink_name': 'name', 'package_name': 'name',
+    'img': 'image', 'catName': 'catID',
+}
+IMAGE_FOLDERS = {'food': 'foods/', 'drink': 'drinks/', 'package': 'packages/'}
+
+
+def _key(name):
+    return ' '.join(str(name or '').split()).lower()
+
+
+def _normalize_row(raw, row_type=None):
+    row = {}
+    for field, value in raw.items():
+        field = FIELD_ALIASES.get(field, field)
+        if field in CSV_FIELDS:
+            row[field] = value.strip() if isinstance(value, str) else value
+    row['type'] = _key(row.get('type') or row_type)
+    return row
+
+
+def _split_unescaped(value, sep):
+    """Split on `sep` not preceded by a backslash (parts keep their escapes)"""
+    parts, start, i = [], 0, 0
+    while i < len(value):
+        if value[i] == '\\':
+            i += 2
+            continue
+        if value[i] == sep:
+            parts.append(value[start:i])
+            start = i + 1
+        i += 1
+    parts.append(value[start:])
+    return parts
+
+
+def _unescape(value):
+    return re.sub(r'\\(.)', r'\1', value)
+
+
+def _escape(value):
+    return re.sub(r'([\\:;])', r'\\\1', str(value))
+
+
+def parse_items(value):
+    """'Name:2;Other:1' or [{'name', 'quantity'}] -> [(name, quantity), ...]"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        pairs = []
+        for part in _split_unescaped(value, ';'):
+            if not part.strip():
+                continue
+            # Escape хийгээгүй ":" нэрэнд үлдэнэ (хамгийн сүүлийнх нь тоо ширхэг)
+            fields = _split_unescaped(part, ':')
+            name, quantity = ':'.join(fields[:-1]), fields[-1]
+            if not name:
+                name, quantity = quantity, '1'
+            pairs.append((_unescape(name).strip(), _unescape(quantity).strip()))
+        return pairs
+    return [(item.get('name'), item.get('quantity', 1)) for item in value]
+
+
+def format_items(items, name_field):
+    return ';'.join(f"{_escape(item[name_field])}:{item['quantity']}" for item in items or [])
+
+
+def parse_upload(upload):
+    """Rows from an uploaded CSV or JSON file; ValueError on malformed input"""
+    content = upload.read()
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValueError("File must be UTF-8 encoded")
+
+    name = (getattr(upload, 'name', '') or '').lower()
+    if name.endswith('.json') or text.lstrip()[:1] in ('[', '{'):
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if isinstance(data, dict):
+            rows = [
+                _normalize_row(raw, GROUP_KEYS[group])
+                for group in GROUP_KEYS if isinstance(data.get(group), list)
+                for raw in data[group] if isinstance(raw, dict)
+            ]
+        elif isinstance(data, list):
+            rows = [_normalize_row(raw) for raw in data if isinstance(raw, dict)]
+        else:
+            raise ValueError("JSON must be a list of rows or an object with foods/drinks/packages")
+    else:
+        rows = [_normalize_row(raw) for raw in csv.DictReader(io.StringIO(text))]
+
+    max_rows = getattr(settings, 'BULK_IMPORT_MAX_ROWS', 2000)
+    if len(rows) > max_rows:
+        raise ValueError(f"Too many rows ({len(rows)} > {max_rows})")
+    return rows
+
+
+def open_archive(upload):
+    """{basename: ZipInfo} for an optional images zip; ValueError if unusable"""
+    if not upload:
+        return None, {}
+    try:
+        archive = zipfile.ZipFile(upload)
+    except zipfile.BadZipFile:
+        raise ValueError("images must be a zip archive")
+    members = {
+        posixpath.basename(info.filename).lower(): info
+        for info in archive.infolist() if not info.is_dir()
+    }
+    limit = getattr(settings, 'BULK_IMPORT_MAX_ARCHIVE_MB', 100) * 1024 * 1024
+    if sum(info.file_size for info in members.values()) > limit:
+        raise ValueError("Image archive is too large")
+    return archive, members
+
+
+def _resolve_categories(rows):
+    """catID values (id or name) -> catID, in one tbl_foodtype lookup"""
+    ids, names = set(), set()
+    for row in rows:
+        value = row.get('catID')
+        if value in (None, ''):
+            continue
+        if str(value).isdigit():
+            ids.add(int(value))
+        else:
+            names.add(_key(value))
+    if not ids and not names:
+        return {}
+    found = execute_query(
+        'SELECT "catID", "catName" FROM tbl_foodtype WHERE "catID" = ANY(%s) OR lower("catName") = ANY(%s)',
+        (list(ids), list(names))
+    )
+    resolved = {}
+    for cat in found:
+        resolved[str(cat['catID'])] = cat['catID']
+        resolved[_key(cat['catName'])] = cat['catID']
+    return resolved
+
+
+def _existing_items(res_id):
+    rows = execute_query("""
+        SELECT 'food' AS kind, "foodID" AS id, "foodName" AS name FROM tbl_food WHERE "resID" = %s
+        UNION ALL
+        SELECT 'drink', "drink_id", "drink_name" FROM tbl_drinks WHERE "resID" = %s
+    """, (res_id, res_id))
+    items = {'food': {}, 'drink': {}}
+    for row in rows:
+        items[row['kind']].setdefault(_key(row['name']), row['id'])
+    return items
+
+
+def validate_rows(res_id, rows, members):
+    """
+    Validate every row; returns (report, valid) where report has one entry per row.
+    valid мөрүүд нь INSERT-д бэлэн "data" болон зурагны "image_member"-тэй.
+    """
+    categories = _resolve_categories(row for row in rows if row['type'] == 'food')
+    existing = _existing_items(res_id)
+    imported = {'food': set(), 'drink': set()}
+
+    report, valid = [None] * len(rows), []
+    # Багцууд энэ файлын хоол/ундааг нэрээр заах тул тэдгээрийг сүүлд шалгана
+    for index in sorted(range(len(rows)), key=lambda i: rows[i]['type'] == 'package'):
+        row = rows[index]
+        entry = {"row": index + 1, "type": row['type'], "name": row.get('name'), "status": "ok"}
+        report[index] = entry
+        errors = {}
+
+        if row['type'] not in ROW_TYPES:
+            entry.update(status="error", errors={"type": [f"Must be one of {', '.join(ROW_TYPES)}"]})
+            continue
+
+        if row['type'] == 'food':
+            category = row.get('catID')
+            cat_id = categories.get(_key(category))
+            serializer = FoodSerializer(data={
+                "foodName": row.get('name'), "resID": res_id, "catID": cat_id,
+                "price": row.get('price'), "description": row.get('description') or '',
+                **({"portion": row['portion']} if row.get('portion') else {}),
+            })
+        elif row['type'] == 'drink':
+            serializer = DrinkSerializer(data={
+                "drink_name": row.get('name'), "resID": res_id,
+                "price": row.get('price'), "description": row.get('description') or '',
+            })
+        else:
+            serializer = PackageSerializer(data={
+                "package_name": row.get('name'), "restaurant_id": res_id,
+                "price": row.get('price'),
+                **({"portion": row['portion']} if row.get('portion') else {}),
+            })
+
+        if not serializer.is_valid():
+            errors.update(serializer.errors)
+        if row['type'] == 'food' and category not in (None, '') and cat_id is None:
+            errors["catID"] = [f"Unknown food category: {category}"]
+
+        items = []
+        if row['type'] == 'package':
+            for name, quantity in parse_items(row.get('items')):
+                key = _key(name)
+                kind = next((k for k in ('food', 'drink') if key in existing[k] or key in imported[k]), None)
+                try:
+                    quantity = int(quantity)
+                except (TypeError, ValueError):
+                    quantity = 0
+                if kind is None:
+                    errors.setdefault("items", []).append(f"Unknown food or drink: {name}")
+                elif quantity <= 0:
+                    errors.setdefault("items", []).append(f"Quantity must be positive: {name}")
+                else:
+                    items.append((kind, key, quantity))
+
+        image = row.get('image') or ''
+        member = None
+        if image and not image.startswith(('http://', 'https://')):
+            member = members.get(posixpath.basename(image).lower())
+            if member is None:
+                errors["image"] = [f"Not found in images archive: {image}"]
+            image = ''
+
+        if errors:
+            entry.update(status="error", errors=errors)
+            continue
+
+        if row['type'] in imported:
+            imported[row['type']].add(_key(row['name']))
+        valid.append({
+            "entry": entry,
+            "type": row['type'],
+            "data": serializer.validated_data,
+            "image": image,
+            "image_member": member,
+            "items": items,
+        })
+
+    return report, valid
+
+
+def upload_images(valid, archive):
+    """Upload zipped images concurrently (before the transaction); failures mark the row"""
+    pending = [item for item in valid if item["image_member"] is not None]
+    if not pending:
+        return valid
+
+    # ZipFile нь thread-safe биш тул файлуудыг эхлээд уншина
+    payloads = [archive.read(item["image_member"]) for item in pending]
+
+    def upload(args):
+        item, payload = args
+        name = item["data"].get('foodName') or item["data"].get('drink_name') or item["data"].get('package_name')
+        try:
+            result = cloudinary.uploader.upload(
+                io.BytesIO(payload),
+                folder=IMAGE_FOLDERS[item["type"]],
+                public_id=f"{name}",
+                overwrite=True
+            )
+            item["image"] = result["secure_url"]
+        except Exception as e:
+            item["entry"].update(status="error", errors={"image": [f"Upload failed: {e}"]})
+
+    workers = getattr(settings, 'BULK_IMAGE_UPLOAD_WORKERS', 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(upload, zip(pending, payloads)))
+    return [item for item in valid if item["entry"]["status"] == "ok"]
+
+
+def import_rows(res_id, valid):
+    """
+    Insert validated rows in one transaction (one multi-row INSERT per table).
+    Commit хийсний дараа багцын агуулгыг материалчилж, menu change feed-д бүртгэнэ.
+    """
+    by_type = {row_type: [item for item in valid if item["type"] == row_type] for row_type in ROW_TYPES}
+    changes = []
+    package_ids = []
+
+    with unit_of_work():
+        existing = _existing_items(res_id)
+
+        foods = execute_batch_insert(
+            """
+            INSERT INTO tbl_food ("foodName", "resID", "catID", "price", "description", "image", "portion")
+            VALUES %s RETURNING "foodID" AS id
+            """,
+            [
+                (d['foodName'], res_id, d['catID'], d['price'], d.get('description', ''), item["image"], d.get('portion', ''))
+                for item in by_type['food'] for d in [item["data"]]
+            ],
+            fetch=True
+        )
+        drinks = execute_batch_insert(
+            """
+            INSERT INTO tbl_drinks ("drink_name", "resID", "price", "description", "img")
+            VALUES %s RETURNING "drink_id" AS id
+            """,
+            [
+                (d['drink_name'], res_id, d['price'], d.get('description', ''), item["image"])
+                for item in by_type['drink'] for d in [item["data"]]
+            ],
+            fetch=True
+        )
+        # Нэг INSERT ... VALUES-ийн RETURNING нь VALUES-ийн дарааллаар ирнэ
+        for row_type, name_field, inserted in (('food', 'foodName', foods), ('drink', 'drink_name', drinks)):
+            for item, row in zip(by_type[row_type], inserted):
+                item["entry"].update(status="created", id=row['id'])
+                existing[row_type][_key(item["data"][name_field])] = row['id']
+                changes.append((row_type, row['id'], 'upsert'))
+
+        # Зураг upload амжилтгүй болсон хоол/ундааг заасан багцыг алгасна
+        package_items = []
+        for item in by_type['package']:
+            missing = [key for kind, key, _ in item["items"] if key not in existing[kind]]
+            if missing:
+                item["entry"].update(status="error", errors={"items": [f"Unknown food or drink: {key}" for key in missing]})
+            else:
+                package_items.append(item)
+        by_type['package'] = package_items
+
+        # Зөвхөн үлдсэн багцуудыг оруулна (RETURNING-ийн дараалал package_items-тэй таарна)
+        packages = execute_batch_insert(
+            """
+            INSERT INTO tbl_package ("restaurant_id", "package_name", "price", "portion", "img")
+            VALUES %s RETURNING "package_id" AS id
+            """,
+            [
+                (res_id, d['package_name'], d['price'], d.get('portion', ''), item["image"])
+                for item in package_items for d in [item["data"]]
+            ],
+            fetch=True
+        )
+
+        package_rows = {'food': [], 'drink': []}
+        for item, row in zip(by_type['package'], packages):
+            item["entry"].update(status="created", id=row['id'])
+            package_ids.append(row['id'])
+            changes.append(('package', row['id'], 'upsert'))
+            for kind, key, quantity in item["items"]:
+                package_rows[kind].append((row['id'], existing[kind][key], quantity))
+
+        execute_batch_insert(
+            'INSERT INTO tbl_package_food ("package_id", "food_id", "quantity") VALUES %s',
+            package_rows['food']
+        )
+        execute_batch_insert(
+            'INSERT INTO tbl_package_drinks ("package_id", "drink_id", "quantity") VALUES %s',
+            package_rows['drink']
+        )
+
+    refresh_package_contents(package_ids)
+    record_menu_changes(res_id, changes)
+    return {"foods": len(foods), "drinks": len(drinks), "packages": len(packages)}
+
+
+# ----------------------------
+# Export
+# ----------------------------
+
+def _fetch_chunks(query, params, size=500):
+    """
+    Rows from a server-side cursor, `size` at a time.
+    Энгийн cursor нь бүх үр дүнг эхлээд санах ойд татдаг тул chunked_cursor.
+    """
+    with connection.chunked_cursor() as c:
+        c.execute(query, params)
+        while True:
+            chunk = c.fetchmany(size)
+            if not chunk:
+                break
+            yield from chunk
+
+
+def export_rows(res_id):
+    """Yield the restaurant's menu as CSV_FIELDS dicts (re-importable)"""
+    food_rows = _fetch_chunks("""
+        SELECT f."foodName", f."price", f."catID", f."description", f."portion", f."image"
+        FROM tbl_food f
+        WHERE f."resID" = %s
+        ORDER BY f."foodID"
+    """, [res_id])
+    for name, price, cat_id, description, portion, image in food_rows:
+        yield {"type": "food", "name": name, "price": price, "catID": cat_id,
+               "description": description, "portion": portion, "image": image, "items": ""}
+
+    drink_rows = _fetch_chunks("""
+        SELECT d."drink_name", d."price", d."description", d."img"
+        FROM tbl_drinks d
+        WHERE d."resID" = %s
+        ORDER BY d."drink_id"
+    """, [res_id])
+    for name, price, description, image in drink_rows:
+        yield {"type": "drink", "name": name, "price": price, "catID": "",
+               "description": description, "portion": "", "image": image, "items": ""}
+
+    package_rows = _fetch_chunks("""
+        SELECT p."package_name", p."price", p."portion", p."img", p."foods", p."drinks"
+        FROM tbl_package p
+        WHERE p."restaurant_id" = %s
+        ORDER BY p."package_id"
+    """, [res_id])
+    for name, price, portion, image, foods, drinks in package_rows:
+        items = ';'.join(filter(None, [format_items(foods, 'foodName'), format_items(drinks, 'drink_name')]))
+        yield {"type": "package", "name": name, "price": price, "catID": "",
+               "description": "", "portion": portion, "image": image, "items": items}
+
+
+class _Echo:
+    """csv.writer-ийн бичсэн мөрийг шууд буцаана (streaming)"""
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, fieldnames=CSV_FIELDS):
+    writer = csv.DictWriter(_Echo(), fieldnames=fieldnames)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow({k: ('' if v is None else v) for k, v in row.items()})
+
+
+def stream_json(rows):
+    yield '['
+    first = True
+    for row in rows:
+        yield ('' if first else ',') + json.dumps(row, ensure_ascii=False, default=str)
+        first = False
+    yield ']'
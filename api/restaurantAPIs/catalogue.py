@@ -0,0 +1,133 @@
+import time
+import hashlib
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+# ----------------------------
+# Restaurant catalogue snapshot
+# ----------------------------
+# tbl_restaurant-ийн жагсаалтыг version counter-оор хүчингүй болгодог
+# snapshot болгон хадгална:
+#   1) процесс доторх хуулбар (version таарвал DB/cache руу хандахгүй)
+#   2) shared cache (Redis тохируулсан бол бүх worker хуваалцана; LocMem бол
+#      version нь shared_ttl()-ээр богино хугацаатай тул worker бүр нийлнэ)
+# Ресторан нэмэх/засах/устгах/статус/зураг өөрчлөх бүрт bump_catalogue_version().
+
+VERSION_KEY = 'restaurant_catalogue:version'
+MENU_VERSION_KEY = 'restaurant_menu:version'
+SNAPSHOT_KEY = 'restaurant_catalogue:snapshot:{version}'
+
+CATALOGUE_FIELDS = [
+    "resID", "resName", "catID", "phone", "lng", "lat", "openTime", "closeTime",
+    "description", "image", "email", "status",
+]
+
+_local = {'version': None, 'rows': None}
+_local_lock = threading.Lock()
+
+
+def shared_ttl(ttl):
+    """
+    Timeout for keys that every worker must agree on (None = never expires).
+    LocMem нь процесс бүрт тусдаа тул өөр worker-ийн bump/invalidate-ийг алдсан
+    процесс LOCAL_CACHE_VERSION_TTL дотор шинэ утга авч нийлэхээр богиносгоно.
+    """
+    backend = getattr(settings, 'CACHES', {}).get('default', {}).get('BACKEND', '')
+    if not backend.endswith('LocMemCache'):
+        return ttl
+    local_ttl = getattr(settings, 'LOCAL_CACHE_VERSION_TTL', 30)
+    return local_ttl if ttl is None else min(ttl, local_ttl)
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Түлхүүр алга болсон ч хуучин snapshot-той давхцахгүй (өсөх) эхлэлийн утга
+        cache.add(key, int(time.time() * 1000), shared_ttl(None))
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), shared_ttl(None))
+        return cache.incr(key)
+
+
+def get_catalogue_version():
+    return _get_version(VERSION_KEY)
+
+
+def bump_catalogue_version():
+    """Call after any write that changes what RestaurantListView returns"""
+    version = _bump_version(VERSION_KEY)
+    with _local_lock:
+        _local['version'] = None
+        _local['rows'] = None
+    return version
+
+
+def get_menu_version():
+    return _get_version(MENU_VERSION_KEY)
+
+
+def bump_menu_version():
+    """Call after any food/drink/package write (autocomplete г.м. дахин бүтээгдэнэ)"""
+    return _bump_version(MENU_VERSION_KEY)
+
+
+def _load_rows():
+    with connection.cursor() as c:
+        c.execute("""
+            SELECT "resID", "resName", "catID", "phone", "lng", "lat", "openTime", "closeTime",
+                   "description", "image", "email", "status"
+            FROM tbl_restaurant
+            ORDER BY "resID"
+        """)
+        return [dict(zip(CATALOGUE_FIELDS, row)) for row in c.fetchall()]
+
+
+def get_catalogue():
+    """
+    Return (version, rows) for the current catalogue version.
+    rows-г хуваалцдаг тул дуудагч өөрчлөх ёсгүй.
+    """
+    version = get_catalogue_version()
+    with _local_lock:
+        if _local['version'] == version:
+            return version, _local['rows']
+
+    key = SNAPSHOT_KEY.format(version=version)
+    rows = cache.get(key)
+    if rows is None:
+        rows = _load_rows()
+        cache.set(key, rows, getattr(settings, 'CATALOGUE_CACHE_TTL', 300))
+
+    with _local_lock:
+        _local['version'] = version
+        _local['rows'] = rows
+    return version, rows
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(':'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
@@ -1,8 +1,9 @@
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import connection
+from django.db import connection, transaction
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
+from ..order_events import order_status_changed
 
 class ConfirmOrderView(APIView):
     authentication_classes = []
@@ -17,33 +18,37 @@ class ConfirmOrderView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        with connection.cursor() as cursor:
-            cursor.execute(
-                'SELECT status FROM tbl_order WHERE "orderID" = %s',
-                [order_id]
-            )
-            row = cursor.fetchone()
-
-            if not row:
-                return Response(
-                    {"error": "Захиалга олдсонгүй"},
-                    status=status.HTTP_404_NOT_FOUND
+        # Төлөв, rollup нэг transaction-д; FOR UPDATE нь зэрэг баталгаажуулалтыг дараалуулна
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT status, "res_id" FROM tbl_order WHERE "orderID" = %s FOR UPDATE',
+                    [order_id]
                 )
-
-            if row[0] == "CONFIRMED":
-                return Response(
-                    {"message": "Захиалга аль хэдийн баталгаажсан"},
-                    status=status.HTTP_200_OK
+                row = cursor.fetchone()
+
+                if not row:
+                    return Response(
+                        {"error": "Захиалга олдсонгүй"},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+
+                current_status, res_id = row
+                if current_status == "CONFIRMED":
+                    return Response(
+                        {"message": "Захиалга аль хэдийн баталгаажсан"},
+                        status=status.HTTP_200_OK
+                    )
+
+                cursor.execute(
+                    '''
+                    UPDATE tbl_order
+                    SET status = %s
+                    WHERE "orderID" = %s
+                    ''',
+                    ["CONFIRMED", order_id]
                 )
-
-            cursor.execute(
-                '''
-                UPDATE tbl_order
-                SET status = %s
-                WHERE "orderID" = %s
-                ''',
-                ["CONFIRMED", order_id]
-            )
+                order_status_changed(order_id, res_id, current_status, "CONFIRMED", cursor=cursor)
 
         return Response(
             {
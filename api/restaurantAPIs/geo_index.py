@@ -0,0 +1,140 @@
+import math
+import threading
+from django.conf import settings
+
+from ..geo import haversine_km, EARTH_RADIUS_KM
+from .catalogue import get_catalogue
+
+try:
+    import numpy as np
+except ImportError:  # numpy заавал биш, байхгүй бол цэвэр Python-оор тооцно
+    np = None
+
+# ----------------------------
+# In-memory restaurant grid
+# ----------------------------
+# Catalogue snapshot-ын lat/lng-г GEO_GRID_CELL_DEG хэмжээтэй нүдэнд хуваана.
+# k-nearest асуултыг төвөөс гадагш цагираг тэлж, нэр дэвшигчдэд л зай тооцно.
+# Catalogue version өөрчлөгдөхөд (ресторан нэмэх/засах/устгах) дахин бүтээнэ.
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+class GeoGrid:
+    def __init__(self, rows, cell_deg=0.01):
+        self.cell_deg = cell_deg
+        self.ids, self.names, lats, lngs = [], [], [], []
+        self.cells = {}
+
+        for row in rows:
+            if row.get("lat") is None or row.get("lng") is None:
+                continue
+            try:
+                lat, lng = float(row["lat"]), float(row["lng"])
+            except (TypeError, ValueError):
+                continue
+            i = len(self.ids)
+            self.ids.append(row["resID"])
+            self.names.append(row["resName"])
+            lats.append(lat)
+            lngs.append(lng)
+            self.cells.setdefault(self._cell(lat, lng), []).append(i)
+
+        if np is not None:
+            self.lats = np.asarray(lats, dtype=np.float64)
+            self.lngs = np.asarray(lngs, dtype=np.float64)
+        else:
+            self.lats, self.lngs = lats, lngs
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def _ring(self, center, r):
+        ci, cj = center
+        if r == 0:
+            yield center
+            return
+        for dj in range(-r, r + 1):
+            yield (ci - r, cj + dj)
+            yield (ci + r, cj + dj)
+        for di in range(-r + 1, r):
+            yield (ci + di, cj - r)
+            yield (ci + di, cj + r)
+
+    def _distances(self, indices, lat, lng):
+        if np is not None:
+            idx = np.asarray(indices, dtype=np.intp)
+            phi1 = math.radians(lat)
+            phi2 = np.radians(self.lats[idx])
+            dphi = phi2 - phi1
+            dlambda = np.radians(self.lngs[idx] - lng)
+            a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+            return (2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))).tolist()
+        return [haversine_km(lat, lng, self.lats[i], self.lngs[i]) for i in indices]
+
+    def _top_k(self, indices, lat, lng, k):
+        distances = self._distances(indices, lat, lng)
+        ranked = sorted(zip(distances, indices))[:k]
+        return [
+            {"id": self.ids[i], "name": self.names[i], "distance_km": d}
+            for d, i in ranked
+        ]
+
+    def nearest(self, lat, lng, k, max_radius_km=None):
+        """
+        k nearest restaurants as [{"id", "name", "distance_km"}], closest first.
+        max_radius_km өгвөл түүнээс холыг буцаахгүй (DB-ийн _nearest-тэй адил).
+        """
+        top = self._nearest(lat, lng, k, max_radius_km)
+        if max_radius_km:
+            top = [row for row in top if row["distance_km"] <= max_radius_km]
+        return top
+
+    def _nearest(self, lat, lng, k, max_radius_km):
+        if k <= 0 or not self.ids:
+            return []
+
+        # Нүдний хамгийн богино тал (уртрагийн дагуу өргөрөгөөс хамаарч багасна)
+        cell_km = self.cell_deg * KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + 1.0, 89.0))), 0.01)
+        max_rings = math.ceil(max_radius_km / cell_km) if max_radius_km else None
+
+        center = self._cell(lat, lng)
+        candidates = []
+        r = 0
+        while True:
+            # Радиусын бүх нүдийг үзсэн: цуглуулсан нэр дэвшигчид л хамаарна
+            if max_rings is not None and r > max_rings:
+                return self._top_k(candidates, lat, lng, k)
+            # Сийрэг бол бүх цэгийг шууд тооцох нь хурдан
+            if (2 * r + 1) ** 2 > len(self.ids):
+                return self._top_k(range(len(self.ids)), lat, lng, k)
+
+            for cell in self._ring(center, r):
+                candidates.extend(self.cells.get(cell, ()))
+
+            if len(candidates) >= k:
+                top = self._top_k(candidates, lat, lng, k)
+                # r цагираг доторх бүх цэг r * cell_km-ээс ойр байгаа нь баталгаатай
+                if top[-1]["distance_km"] <= r * cell_km:
+                    return top
+            r += 1
+
+
+_grid = {'version': None, 'grid': None}
+_grid_lock = threading.Lock()
+
+
+def get_geo_grid():
+    """GeoGrid for the current catalogue version (rebuilt when it changes)"""
+    version, rows = get_catalogue()
+    with _grid_lock:
+        if _grid['version'] == version:
+            return _grid['grid']
+    grid = GeoGrid(rows, cell_deg=getattr(settings, 'GEO_GRID_CELL_DEG', 0.01))
+    with _grid_lock:
+        _grid['version'] = version
+        _grid['grid'] = grid
+    return grid
@@ -0,0 +1,219 @@
+import json
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .catalogue import bump_menu_version, shared_ttl
+from .packages import refresh_package_contents
+
+# ----------------------------
+# Restaurant menu tree
+# ----------------------------
+# Ресторан, хоол, ундаа, багц (материалчилсан хоол/ундаатай)-ыг тогтмол 5 query-гээр
+# нэг мод болгон угсарч, content hash (ETag)-тай хамт рестораны түвшинд кэшлэнэ.
+# Цэсийг өөрчилдөг view бүр record_menu_change(...) (эсвэл invalidate_menu) дуудна.
+# tbl_menu_change нь рестораны цэсний өсөх version болон changes_since feed болно.
+# Version нь рестораны өөрийн counter (tbl_restaurant."menu_version"): мөрийн lock
+# дор нэмэгддэг тул нэг рестораны version-ууд commit-ийн дарааллаар харагдана.
+
+MENU_KEY = 'restaurant_menu:{res_id}'
+
+# item_type -> (menu дахь жагсаалт, id талбар)
+MENU_ITEM_TYPES = {
+    'food': ('foods', 'foodID'),
+    'drink': ('drinks', 'drink_id'),
+    'package': ('packages', 'package_id'),
+}
+
+
+def _fetch_dicts(cursor, query, params):
+    cursor.execute(query, params)
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _money(value):
+    return float(value) if value is not None else None
+
+
+def build_menu(res_id):
+    """Return the full menu dict for a restaurant, or None if it does not exist"""
+    with connection.cursor() as c:
+        # Version-г эхэлж уншина: дараа нь орсон өөрчлөлт дахин feed-д гарна (idempotent)
+        c.execute('SELECT "menu_version" FROM tbl_restaurant WHERE "resID" = %s', [res_id])
+        row = c.fetchone()
+        if row is None:
+            return None
+        version = row[0]
+
+        restaurants = _fetch_dicts(c, """
+            SELECT
+                r."resID", r."resName", r."catID", r."phone", r."email",
+                r."lng", r."lat", r."openTime", r."closeTime", r."description", r."status",
+                MAX(CASE WHEN i."type" = 'profile' THEN i."image_url" END) AS profile_image,
+                MAX(CASE WHEN i."type" = 'logo' THEN i."image_url" END) AS logo_image
+            FROM tbl_restaurant r
+            LEFT JOIN tbl_restaurant_images i ON i."resID" = r."resID"
+            WHERE r."resID" = %s
+            GROUP BY r."resID"
+        """, [res_id])
+        if not restaurants:
+            return None
+
+        foods = _fetch_dicts(c, """
+            SELECT f."foodID", f."foodName", f."price", f."description", f."image", f."catID"
+            FROM tbl_food f
+            WHERE f."resID" = %s
+            ORDER BY f."foodName"
+        """, [res_id])
+
+        drinks = _fetch_dicts(c, """
+            SELECT d."drink_id", d."drink_name", d."price", d."description", d."img"
+            FROM tbl_drinks d
+            WHERE d."resID" = %s
+            ORDER BY d."drink_name"
+        """, [res_id])
+
+        packages = _fetch_dicts(c, """
+            SELECT p."package_id", p."package_name", p."price", p."portion", p."img",
+                   p."foods", p."drinks", p."total_price_computed"
+            FROM tbl_package p
+            WHERE p."restaurant_id" = %s
+            ORDER BY p."package_name"
+        """, [res_id])
+
+    for food in foods:
+        food["price"] = _money(food["price"])
+    for drink in drinks:
+        drink["price"] = _money(drink["price"])
+
+    for package in packages:
+        package["foods"] = package["foods"] or []
+        package["drinks"] = package["drinks"] or []
+        for item in package["foods"] + package["drinks"]:
+            item["price"] = _money(item["price"])
+            item["subtotal"] = _money(item["subtotal"])
+        computed = _money(package["total_price_computed"]) or 0.0
+        package["total_price_computed"] = computed
+        package["price"] = _money(package["price"]) if package["price"] is not None else computed
+
+    return {
+        "version": version,
+        "restaurant": restaurants[0],
+        "foods": foods,
+        "drinks": drinks,
+        "packages": packages,
+    }
+
+
+def get_menu(res_id):
+    """(etag, menu) from cache, building it on a miss; (None, None) if not found"""
+    key = MENU_KEY.format(res_id=res_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    menu = build_menu(res_id)
+    if menu is None:
+        return None, None
+
+    # JSON-д хөрвүүлсэн агуулгын hash (Decimal, time г.м.-г str болгоно)
+    body = json.dumps(menu, sort_keys=True, default=str)
+    etag = '"' + hashlib.sha1(body.encode('utf-8')).hexdigest()[:20] + '"'
+    cache.set(key, (etag, menu), shared_ttl(getattr(settings, 'MENU_CACHE_TTL', 3600)))
+    return etag, menu
+
+
+def invalidate_menu(*res_ids):
+    """Drop cached menus after any food/drink/package/restaurant write"""
+    keys = [MENU_KEY.format(res_id=res_id) for res_id in res_ids if res_id is not None]
+    if keys:
+        cache.delete_many(keys)
+    bump_menu_version()
+
+
+def record_menu_changes(res_id, changes):
+    """Append [(item_type, item_id, op), ...] to tbl_menu_change in one INSERT"""
+    changes = [change for change in changes if change[1] is not None]
+    if res_id is not None and changes:
+        values = ', '.join(['(%s, %s::integer, %s)'] * len(changes))
+        params = [res_id] + [value for change in changes for value in change]
+        # UPDATE-ийн мөрийн lock commit хүртэл үлдэх тул дараагийн version өмнөхөөсөө
+        # өмнө commit хийгдэхгүй (client "version > since"-ээр юу ч алгасахгүй)
+        with connection.cursor() as c:
+            c.execute(f"""
+                WITH bumped AS (
+                    UPDATE tbl_restaurant SET "menu_version" = "menu_version" + 1
+                    WHERE "resID" = %s
+                    RETURNING "resID", "menu_version"
+                )
+                INSERT INTO tbl_menu_change ("res_id", "res_version", "item_type", "item_id", "op")
+                SELECT b."resID", b."menu_version", v.item_type, v.item_id, v.op
+                FROM bumped b, (VALUES {values}) AS v (item_type, item_id, op)
+            """, params)
+    invalidate_menu(res_id)
+
+
+def record_menu_change(res_id, item_type, item_id, op='upsert'):
+    """Append a change to tbl_menu_change and drop the cached menu"""
+    record_menu_changes(res_id, [(item_type, item_id, op)])
+
+
+def record_package_change(*package_ids):
+    """Package contents (or a food/drink inside them) changed: re-materialize and log"""
+    for package_id, res_id in refresh_package_contents(package_ids):
+        record_menu_change(res_id, 'package', package_id)
+
+
+def get_menu_changes(res_id, since):
+    """
+    Items added/updated/deleted after `since`, up to the cached menu's version.
+    Шинэчлэгдсэн мөрүүдийг кэшлэсэн цэснээс авна (нэмэлт query зөвхөн change log).
+    """
+    etag, menu = get_menu(res_id)
+    if menu is not None and since > menu["version"]:
+        # Client-ийн version кэшээс шинэ: кэш хоцорсон тул DB-ээс дахин угсарна
+        cache.delete(MENU_KEY.format(res_id=res_id))
+        etag, menu = get_menu(res_id)
+    if menu is None:
+        return None
+
+    with connection.cursor() as c:
+        c.execute("""
+            SELECT DISTINCT ON ("item_type", "item_id") "item_type", "item_id", "op"
+            FROM tbl_menu_change
+            WHERE "res_id" = %s AND "res_version" > %s AND "res_version" <= %s
+            ORDER BY "item_type", "item_id", "res_version" DESC, "version" DESC
+        """, [res_id, since, menu["version"]])
+        changes = c.fetchall()
+
+    result = {
+        "resID": res_id,
+        "since": since,
+        # Client-ийг хэзээ ч ухраахгүй
+        "version": max(since, menu["version"]),
+        "restaurant": None,
+        "deleted": {},
+    }
+    upserts = {}
+    for item_type, item_id, op in changes:
+        if item_type == 'restaurant':
+            result["restaurant"] = menu["restaurant"]
+        elif item_type in MENU_ITEM_TYPES:
+            upserts.setdefault(item_type, set())
+            if op == 'delete':
+                result["deleted"].setdefault(MENU_ITEM_TYPES[item_type][0], []).append(item_id)
+            else:
+                upserts[item_type].add(item_id)
+
+    for item_type, (list_key, id_key) in MENU_ITEM_TYPES.items():
+        wanted = upserts.get(item_type, set())
+        items = [item for item in menu[list_key] if item[id_key] in wanted]
+        result[list_key] = items
+        # Өөр ресторан руу шилжсэн г.м. цэснээс алга болсон мөр
+        missing = wanted - {item[id_key] for item in items}
+        if missing:
+            result["deleted"].setdefault(list_key, []).extend(sorted(missing))
+
+    return result
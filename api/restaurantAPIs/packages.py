@@ -0,0 +1,89 @@
+from django.db import connection
+
+# ----------------------------
+# Materialized package contents
+# ----------------------------
+# tbl_package."foods" / "drinks" (jsonb) болон "total_price_computed"-г багцын
+# хоол/ундаа, эсвэл тэдгээрийн хоол/ундааны үнэ өөрчлөгдөх үед дахин тооцно.
+# Ингэснээр багц унших нь tbl_package-аас нэг индексжсэн SELECT болно.
+
+REFRESH_SQL = """
+    UPDATE tbl_package p SET
+        "foods" = COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'foodID', f."foodID",
+                'foodName', f."foodName",
+                'price', f."price",
+                'quantity', pf."quantity",
+                'subtotal', pf."quantity" * f."price",
+                'image', f."image"
+            ) ORDER BY pf."id")
+            FROM tbl_package_food pf
+            JOIN tbl_food f ON f."foodID" = pf."food_id"
+            WHERE pf."package_id" = p."package_id"
+        ), '[]'::jsonb),
+        "drinks" = COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'drink_id', d."drink_id",
+                'drink_name', d."drink_name",
+                'price', d."price",
+                'quantity', pd."quantity",
+                'subtotal', pd."quantity" * d."price",
+                'img', d."img"
+            ) ORDER BY pd."id")
+            FROM tbl_package_drinks pd
+            JOIN tbl_drinks d ON d."drink_id" = pd."drink_id"
+            WHERE pd."package_id" = p."package_id"
+        ), '[]'::jsonb),
+        "total_price_computed" = COALESCE((
+            SELECT SUM(pf."quantity" * f."price")
+            FROM tbl_package_food pf
+            JOIN tbl_food f ON f."foodID" = pf."food_id"
+            WHERE pf."package_id" = p."package_id"
+        ), 0) + COALESCE((
+            SELECT SUM(pd."quantity" * d."price")
+            FROM tbl_package_drinks pd
+            JOIN tbl_drinks d ON d."drink_id" = pd."drink_id"
+            WHERE pd."package_id" = p."package_id"
+        ), 0)
+    WHERE p."package_id" = ANY(%s)
+    RETURNING p."package_id", p."restaurant_id"
+"""
+
+
+def refresh_package_contents(package_ids):
+    """Recompute contents/totals; returns [(package_id, restaurant_id), ...]"""
+    package_ids = sorted({int(i) for i in package_ids if i is not None})
+    if not package_ids:
+        return []
+    with connection.cursor() as c:
+        c.execute(REFRESH_SQL, [package_ids])
+        return c.fetchall()
+
+
+def package_ids_containing(food_id=None, drink_id=None):
+    """Packages that include the given food or drink"""
+    with connection.cursor() as c:
+        if food_id is not None:
+            c.execute('SELECT DISTINCT "package_id" FROM tbl_package_food WHERE "food_id" = %s', [food_id])
+        else:
+            c.execute('SELECT DISTINCT "package_id" FROM tbl_package_drinks WHERE "drink_id" = %s', [drink_id])
+        return [row[0] for row in c.fetchall()]
+
+
+def package_row(row):
+    """
+    (package_id, package_name, price, portion, img, foods, drinks, total_price_computed)
+    мөрийг API-ийн dict болгоно.
+    """
+    total = float(row[7] or 0)
+    return {
+        "package_id": row[0],
+        "package_name": row[1],
+        "price": float(row[2]) if row[2] is not None else total,
+        "portion": row[3],
+        "img": row[4],
+        "total_price_computed": total,
+        "foods": row[5] or [],
+        "drinks": row[6] or [],
+    }
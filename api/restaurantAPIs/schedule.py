@@ -0,0 +1,196 @@
+import math
+import bisect
+import threading
+from datetime import time as dtime, timedelta
+from django.conf import settings
+from django.utils import timezone
+
+from .catalogue import get_catalogue
+
+# ----------------------------
+# Open-now schedule index
+# ----------------------------
+# openTime/closeTime нь Asia/Ulaanbaatar (settings.TIME_ZONE)-ийн өдрийн цаг.
+# Өдрийг секундээр илэрхийлж, бүх нээх/хаах цэгээр хуваасан сегмент бүрт
+# нээлттэй рестораны олонлогийг урьдчилан тооцно. Асуулт бүр bisect (O(log n)).
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+def _to_time(value):
+    if isinstance(value, dtime):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return dtime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _seconds(t):
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def open_intervals(open_time, close_time):
+    """
+    Half-open [start, end) second-of-day intervals for one restaurant.
+    is_restaurant_open-той адил хаах цагийг оруулна; шөнө дамжвал хоёр хэсэг болно.
+    """
+    open_time, close_time = _to_time(open_time), _to_time(close_time)
+    if open_time is None or close_time is None:
+        return []
+    start, end = _seconds(open_time), _seconds(close_time) + 1
+    if open_time < close_time:
+        return [(start, end)]
+    if open_time == close_time:
+        return [(0, DAY_SECONDS)]
+    # Шөнө дамжих (жишээ: 22:00 - 03:00)
+    return [(start, DAY_SECONDS), (0, min(end, DAY_SECONDS))]
+
+
+def local_now(instant=None):
+    instant = instant or timezone.now()
+    if timezone.is_naive(instant):
+        instant = timezone.make_aware(instant)
+    return timezone.localtime(instant)
+
+
+def _second_of_day(local):
+    return local.hour * 3600 + local.minute * 60 + local.second
+
+
+def is_open_at(open_time, close_time, instant=None):
+    second = _second_of_day(local_now(instant))
+    return any(start <= second < end for start, end in open_intervals(open_time, close_time))
+
+
+def next_transition_at(open_time, close_time, instant=None):
+    """Next local datetime when this one restaurant opens or closes (None if never)"""
+    open_time, close_time = _to_time(open_time), _to_time(close_time)
+    if open_time is None or close_time is None or open_time == close_time:
+        return None
+    points = sorted({_seconds(open_time), (_seconds(close_time) + 1) % DAY_SECONDS})
+    return _next_point(points, local_now(instant))
+
+
+def _next_point(points, local):
+    second = _second_of_day(local)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    i = bisect.bisect_right(points, second)
+    if i < len(points):
+        return midnight + timedelta(seconds=points[i])
+    return midnight + timedelta(days=1, seconds=points[0])
+
+
+class ScheduleIndex:
+    """
+    Sweep-line index: second-of-day -> frozenset of open (active) resIDs.
+    Сегмент бүрийн олонлогийг хадгалахгүй: цэг бүрт зөвхөн өөрчлөлт (delta), ~√n цэг
+    тутамд checkpoint олонлог хадгалж, асуултад ойрын checkpoint-оос delta-г хэрэглэнэ.
+    """
+
+    def __init__(self, rows):
+        self.rows = {row["resID"]: row for row in rows}
+        self.intervals = {}
+        events = {}
+        for row in rows:
+            if row.get("status") != 'active':
+                continue
+            intervals = open_intervals(row.get("openTime"), row.get("closeTime"))
+            if intervals:
+                self.intervals[row["resID"]] = intervals
+            for start, end in intervals:
+                events.setdefault(start, (set(), set()))[0].add(row["resID"])
+                if end < DAY_SECONDS:
+                    events.setdefault(end, (set(), set()))[1].add(row["resID"])
+
+        self.boundaries = sorted(set(events) | {0})
+
+        # (нээгдсэн, хаагдсан); close+1 == open үед нэг цэгт хоёулаа таарч өөрчлөлтгүй
+        self.deltas = []
+        for boundary in self.boundaries:
+            opened, closed = events.get(boundary, ((), ()))
+            self.deltas.append((frozenset(set(opened) - set(closed)), frozenset(set(closed) - set(opened))))
+
+        self._step = max(1, math.isqrt(len(self.boundaries)))
+        self._checkpoints = []
+        current = set()
+        for i, (opened, closed) in enumerate(self.deltas):
+            current -= closed
+            current |= opened
+            if i % self._step == 0:
+                self._checkpoints.append(frozenset(current))
+
+        # Олонлог өөрчлөгдөх цэгүүд; өдрийн төгсгөлийнх 0 цэгийнхээс ялгаатай бол шөнө дунд ч
+        self._changes = [
+            boundary for boundary, (opened, closed) in zip(self.boundaries, self.deltas)
+            if boundary > 0 and (opened or closed)
+        ]
+        if current != self._checkpoints[0]:
+            self._changes.insert(0, 0)
+
+        self._last = None   # (segment, frozenset) — дараалсан асуулт нэг сегментэд ордог
+
+    def _segment(self, second):
+        return bisect.bisect_right(self.boundaries, second) - 1
+
+    def _open_set(self, i):
+        last = self._last
+        if last is not None and last[0] == i:
+            return last[1]
+        first = i - i % self._step
+        result = self._checkpoints[i // self._step]
+        if first != i:
+            current = set(result)
+            for opened, closed in self.deltas[first + 1:i + 1]:
+                current -= closed
+                current |= opened
+            result = frozenset(current)
+        self._last = (i, result)
+        return result
+
+    def _at_second(self, second):
+        return self._open_set(self._segment(second))
+
+    def open_at(self, instant=None):
+        """frozenset of resIDs open (and active) at the given instant"""
+        return self._at_second(_second_of_day(local_now(instant)))
+
+    def is_open(self, res_id, instant=None):
+        second = _second_of_day(local_now(instant))
+        return any(start <= second < end for start, end in self.intervals.get(res_id, ()))
+
+    def next_transition(self, instant=None):
+        """Local datetime when the open set next changes (None if it never does)"""
+        if not self._changes:
+            return None
+        return _next_point(self._changes, local_now(instant))
+
+
+_index = {'version': None, 'index': None}
+_index_lock = threading.Lock()
+
+
+def get_schedule_index():
+    """ScheduleIndex for the current catalogue version (rebuilt when it changes)"""
+    version, rows = get_catalogue()
+    with _index_lock:
+        if _index['version'] == version:
+            return _index['index']
+    index = ScheduleIndex(rows)
+    with _index_lock:
+        _index['version'] = version
+        _index['index'] = index
+    return index
+
+
+def cache_max_age(moment, instant=None):
+    """
+    Seconds a response may be cached: until the next open/close transition,
+    capped by SCHEDULE_CACHE_MAX_AGE (catalogue засвар ч мөн өөрчилж болно).
+    """
+    cap = getattr(settings, 'SCHEDULE_CACHE_MAX_AGE', 60)
+    if moment is None:
+        return cap
+    return max(0, min(cap, int((moment - local_now(instant)).total_seconds())))
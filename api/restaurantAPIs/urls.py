@@ -7,6 +7,9 @@ from .views import (
     RestaurantImageUploadView,
     RestaurantImageView,
     RestaurantListView,
+    RestaurantMenuView,
+    MenuImportView,
+    MenuExportView,
     RestaurantMultipleImageUploadView, 
     RestaurantUpdateView, 
     RestaurantDeleteView,
@@ -53,6 +56,7 @@ from .views import (
     RestaurantOrderDetailView,
     OrderStatusUpdateView,
     NewOrderCountView,
+    RestaurantOrderEventStreamView,
     RestaurantOrderListView,
     FoodDetailView,
     PackageDetailView,
@@ -80,6 +84,9 @@ urlpatterns = [
     path('signin/', RestaurantSigninView.as_view()),  # POST
     path('profileres/<int:res_id>/', RestaurantDetailView.as_view()),
     path('list/', RestaurantListView.as_view()),
+    path('<int:resID>/menu/', RestaurantMenuView.as_view()),
+    path('<int:resID>/menu/import/', MenuImportView.as_view()),
+    path('<int:resID>/menu/export/', MenuExportView.as_view()),
     path('update/<int:resID>/', RestaurantUpdateView.as_view()),
     path('delete/<int:resID>/', RestaurantDeleteView.as_view()),
 
@@ -151,6 +158,7 @@ urlpatterns = [
     path('<int:resID>/orders/<int:orderID>/', RestaurantOrderDetailView.as_view()),
     path('<int:resID>/orders/<int:orderID>/status/', OrderStatusUpdateView.as_view()),
     path('<int:resID>/orders/new/count/', NewOrderCountView.as_view()),
+    path('<int:resID>/orders/stream/', RestaurantOrderEventStreamView.as_view()),
 
 
     path('reports/revenue/<int:resID>/', RevenueReportView.as_view(), name='revenue-report'),
@@ -1,10 +1,28 @@
+import json
+import base64
+from datetime import datetime
+
+
 def is_order_belongs_to_restaurant(cursor, order_id, res_id):
     cursor.execute("""
         SELECT 1
         FROM tbl_order o
-        JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-        JOIN tbl_food f ON f."foodID" = of."foodID"
-        WHERE o."orderID" = %s AND f."resID" = %s
-        LIMIT 1
+        WHERE o."orderID" = %s AND o."res_id" = %s
     """, [order_id, res_id])
-    return cursor.fetchone() is not None
\ No newline at end of file
+    return cursor.fetchone() is not None
+
+
+def encode_order_cursor(created_at, order_id):
+    """Opaque keyset token for (created_at, orderID)"""
+    raw = json.dumps([created_at.isoformat(), order_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_order_cursor(token):
+    """Inverse of encode_order_cursor; raises ValueError on a malformed token"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, order_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(order_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
@@ -13,7 +13,20 @@ from django.core.files.storage import FileSystemStorage
 import uuid
 import cloudinary.uploader
 import time
-from .utils import is_order_belongs_to_restaurant
+from .utils import is_order_belongs_to_restaurant, encode_order_cursor, decode_order_cursor
+from ..order_events import order_status_changed, event_stream_response, restaurant_channel
+from .catalogue import get_catalogue, bump_catalogue_version, make_etag, etag_matches
+from .menu import get_menu, get_menu_changes, invalidate_menu, record_menu_change, record_package_change
+from .packages import package_ids_containing, package_row
+from .bulk import parse_upload, open_archive, validate_rows, upload_images, import_rows, export_rows, stream_csv, stream_json
+from django.http import StreamingHttpResponse
+from .schedule import get_schedule_index, is_open_at, next_transition_at, cache_max_age
+from django.utils import timezone
+from ..search import contains_clause
+from ..rollups import status_totals_query, period_totals_query, popular_foods_query
+from ..database import execute_parallel, add_server_timing
+from ..dateranges import range_filter, local_today
+from ..revenue import report_range, daily_report, restaurant_report, DAILY_CSV_FIELDS, REPORT_CSV_FIELDS
 from .serializers import OrderStatusUpdateSerializer
 
 
@@ -46,7 +59,9 @@ from .serializers import (
 from datetime import datetime, time
 import pytz
 from rest_framework import serializers
-from django.contrib.auth.hashers import make_password, check_password
+from ..credentials import hash_password, verify_password, rehash_if_needed
+from ..auth import create_restaurant_token, RestaurantJWTAuthentication, IsRestaurantOwner, invalidate_principal
+from ..hashing import check_login_attempts, record_login_failure, clear_login_failures
 
 
 cloudinary.config(
@@ -121,7 +136,7 @@ class RestaurantCreateView(APIView):
                     )
 
                 # ===== Hash password =====
-                password_hashed = make_password(password_raw)
+                password_hashed = hash_password(password_raw, scheme='django')
 
                 # ===== Insert restaurant =====
                 c.execute("""
@@ -136,6 +151,7 @@ class RestaurantCreateView(APIView):
                 ])
                 res_id = c.fetchone()[0]
 
+            bump_catalogue_version()
             return Response({"message": "Restaurant added", "resID": res_id}, status=status.HTTP_201_CREATED)
 
         # Serializer validation errors
@@ -220,41 +236,141 @@ class RestaurantDetailView(APIView):
         return Response({"restaurant": res_data}, status=status.HTTP_200_OK)
 
 
+class RestaurantMenuView(APIView):
+    """
+    Рестораны мэдээлэл, хоол, ундаа, багцыг нэг хүсэлтээр буцаана
+    (тогтмол тооны query, агуулгын hash-аар ETag / 304)
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, resID):
+        # ?changes_since=<version> → зөвхөн тэр version-оос хойш өөрчлөгдсөн мөрүүд
+        changes_since = request.query_params.get('changes_since')
+        if changes_since is not None:
+            try:
+                since = int(changes_since)
+            except ValueError:
+                return Response({"error": "changes_since must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            changes = get_menu_changes(resID, since)
+            if changes is None:
+                return Response({"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response(changes)
+
+        etag, menu = get_menu(resID)
+        if menu is None:
+            return Response({"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(menu)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+        return response
+
+
+class MenuImportView(APIView):
+    """
+    CSV/JSON файл (+ зургийн zip)-аас хоол, ундаа, багцыг бөөнөөр нэмнэ.
+    Анхдагчаар бүх мөр зөв байж байж л бичнэ; ?partial=1 бол зөв мөрүүдийг л оруулна.
+    """
+    permission_classes = [AllowAny]  # Дараа нь isAuthenticated болгож болно
+
+    def post(self, request, resID):
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"error": "file is required (CSV or JSON)"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with connection.cursor() as c:
+            c.execute('SELECT 1 FROM tbl_restaurant WHERE "resID" = %s', [resID])
+            if not c.fetchone():
+                return Response({"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            rows = parse_upload(upload)
+            archive, members = open_archive(request.FILES.get("images"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        partial = request.query_params.get('partial') in ('1', 'true', 'True')
+        report, valid = validate_rows(resID, rows, members)
+
+        def failed():
+            return [entry for entry in report if entry["status"] == "error"]
+
+        if not partial and failed():
+            return Response({"error": "Import rejected", "rows": report}, status=status.HTTP_400_BAD_REQUEST)
+
+        valid = upload_images(valid, archive)
+        if not partial and failed():
+            return Response({"error": "Image upload failed", "rows": report}, status=status.HTTP_400_BAD_REQUEST)
+
+        created = import_rows(resID, valid)
+        return Response({
+            "message": "Menu imported",
+            "created": created,
+            "errors": len(failed()),
+            "rows": report
+        }, status=status.HTTP_201_CREATED if any(created.values()) else status.HTTP_400_BAD_REQUEST)
+
+
+class MenuExportView(APIView):
+    """Рестораны цэсийг import-той ижил хэлбэрээр stream хийнэ (?fmt=csv|json)"""
+    permission_classes = [AllowAny]
+
+    def get(self, request, resID):
+        fmt = request.query_params.get('fmt', 'csv')
+        if fmt not in ('csv', 'json'):
+            return Response({"error": "fmt must be csv or json"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with connection.cursor() as c:
+            c.execute('SELECT 1 FROM tbl_restaurant WHERE "resID" = %s', [resID])
+            if not c.fetchone():
+                return Response({"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if fmt == 'csv':
+            response = StreamingHttpResponse(stream_csv(export_rows(resID)), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(stream_json(export_rows(resID)), content_type='application/json')
+        response['Content-Disposition'] = f'attachment; filename="menu_{resID}.{fmt}"'
+        return response
+
+
 class RestaurantListView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        with connection.cursor() as c:
-            c.execute("""
-                SELECT "resID", "resName", "catID", "phone", "lng", "lat", "openTime", "closeTime",
-                       "description", "image", "email", "status"
-                FROM tbl_restaurant
-            """)
-            rows = c.fetchall()
+        # Version-оор хүчингүй болдог snapshot (DB-г version өөрчлөгдөхөд л уншина)
+        version, rows = get_catalogue()
 
-        data = []
-        for r in rows:
-            resID, resName, catID, phone, lng, lat, openTime, closeTime, description, image, email, status_val = r
-
-            open_now = is_restaurant_open(openTime, closeTime) and status_val == 'active'
-
-            data.append({
-                "resID": resID,
-                "resName": resName,
-                "catID": catID,
-                "phone": phone,
-                "lng": lng,
-                "lat": lat,
-                "openTime": openTime,
-                "closeTime": closeTime,
-                "description": description,
-                "image": image,
-                "email": email,
-                "status": status_val,
-                "openNow": open_now
-            })
+        try:
+            limit = int(request.query_params['limit']) if 'limit' in request.query_params else None
+            offset = max(0, int(request.query_params.get('offset', 0)))
+        except ValueError:
+            return Response({"error": "limit/offset must be integers"}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(data)
+        page = rows[offset:offset + limit] if limit is not None else rows[offset:]
+
+        # Нээлттэй ресторануудыг мөр бүрээр биш schedule index-ээс авна
+        now = timezone.now()
+        index = get_schedule_index()
+        open_ids = index.open_at(now)
+        next_change = index.next_transition(now)
+
+        # Дараагийн нээх/хаах хүртэл open set өөрчлөгдөхгүй тул ETag-д оруулна
+        etag = make_etag(version, offset, limit, next_change and next_change.isoformat())
+
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response([
+                {**r, "openNow": r["resID"] in open_ids}
+                for r in page
+            ])
+        response['ETag'] = etag
+        response['Cache-Control'] = f'public, max-age={cache_max_age(next_change, now)}, must-revalidate'
+        response['X-Total-Count'] = str(len(rows))
+        return response
 
 
 class RestaurantUpdateView(APIView):
@@ -269,6 +385,9 @@ class RestaurantUpdateView(APIView):
                     SET "resName"=%s, "catID"=%s, "phone"=%s, "password"=%s, "lng"=%s, "lat"=%s, "openTime"=%s, "closeTime"=%s, "description"=%s, "image"=%s, "email"=%s
                     WHERE "resID"=%s
                 """, [d['resName'], d['catID'], d.get('phone',''), d.get('password',''), d.get('lng',''), d.get('lat',''), d.get('openTime',''), d.get('closeTime',''), d.get('description',''), d.get('image',''), d.get('email',''), resID])
+            invalidate_principal(resID, namespace='restaurant')
+            bump_catalogue_version()
+            record_menu_change(resID, 'restaurant', resID)
             return Response({"message": "Restaurant updated"}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -304,6 +423,9 @@ class RestaurantDeleteView(APIView):
 
             # 7️⃣ Рестораныг устгах
             c.execute('DELETE FROM tbl_restaurant WHERE "resID" = %s', [resID])
+        invalidate_principal(resID, namespace='restaurant')
+        bump_catalogue_version()
+        invalidate_menu(resID)
         return Response({"message": "Restaurant deleted"}, status=status.HTTP_200_OK)
 
 
@@ -317,6 +439,7 @@ class RestaurantSigninView(APIView):
     def post(self, request):
         email = request.data.get('email')
         password = request.data.get('password')
+        check_login_attempts(request, 'restaurant', email)
 
         with connection.cursor() as c:
             c.execute("""
@@ -327,13 +450,20 @@ class RestaurantSigninView(APIView):
             res = c.fetchone()
 
         if not res:
+            record_login_failure(request, 'restaurant', email)
             return Response({"error": "Invalid email or password"}, status=401)
 
         resID, resName, hashed_password, status_val = res
 
-        from django.contrib.auth.hashers import check_password
-        if not check_password(password, hashed_password):
+        if not verify_password(password, hashed_password):
+            record_login_failure(request, 'restaurant', email)
             return Response({"error": "Invalid email or password"}, status=401)
+        clear_login_failures(request, 'restaurant', email)
+
+        def save_hash(new_hash):
+            with connection.cursor() as c:
+                c.execute('UPDATE tbl_restaurant SET "password" = %s WHERE "resID" = %s', [new_hash, resID])
+        rehash_if_needed(password, hashed_password, 'django', save_hash)
 
         if status_val != 'active':
             return Response({"error": "Restaurant is inactive"}, status=403)
@@ -345,7 +475,8 @@ class RestaurantSigninView(APIView):
             "message": "Login successful",
             "resID": resID,
             "resName": resName,
-            "token": custom_token
+            "token": custom_token,
+            "access_token": create_restaurant_token(resID, email)
         }, status=200)
 
 
@@ -368,14 +499,8 @@ def is_restaurant_open(open_time, close_time):
     if not open_time or not close_time:
         return False  # Null орж ирвэл хаалттай
 
-    now = datetime.now().time()
-
-    # Хэрвээ шөнө дамжих цаггүй бол энгийн шалгалт
-    if open_time < close_time:
-        return open_time <= now <= close_time
-    else:
-        # Шөнө дамжих (жишээ: 22:00 - 03:00)
-        return now >= open_time or now <= close_time
+    # Asia/Ulaanbaatar цагаар шалгана (schedule.open_intervals-тай ижил дүрэм)
+    return is_open_at(open_time, close_time)
 
 
 # ----------------------------
@@ -401,6 +526,9 @@ class RestaurantStatusUpdateView(APIView):
             if not updated:
                 return Response({"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND)
 
+            invalidate_principal(resID, namespace='restaurant')
+            bump_catalogue_version()
+            record_menu_change(resID, 'restaurant', resID)
             return Response({"message": f"Restaurant status updated to {new_status}"}, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -413,26 +541,27 @@ class RestaurantStatusCheckView(APIView):
     permission_classes = [AllowAny]  # бүгдэд нээлттэй
 
     def get(self, request, resID):
-        with connection.cursor() as c:
-            c.execute("""
-                SELECT "resName", "status", "openTime", "closeTime"
-                FROM tbl_restaurant
-                WHERE "resID" = %s
-            """, [resID])
-            res = c.fetchone()
+        # Catalogue snapshot-оос уншина (DB руу хандахгүй)
+        now = timezone.now()
+        index = get_schedule_index()
+        res = index.rows.get(resID)
 
         if not res:
             return Response({"error": "Restaurant not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        res_name, status_val, open_time, close_time = res
-        open_now = is_restaurant_open(open_time, close_time) and status_val == 'active'
+        status_val = res["status"]
+        open_now = index.is_open(resID, now)
+        next_change = next_transition_at(res["openTime"], res["closeTime"], now) if status_val == 'active' else None
 
-        return Response({
+        response = Response({
             "resID": resID,
-            "resName": res_name,
+            "resName": res["resName"],
             "status": status_val,
-            "openNow": open_now
+            "openNow": open_now,
+            "nextTransition": next_change.isoformat() if next_change else None
         }, status=status.HTTP_200_OK)
+        response['Cache-Control'] = f'public, max-age={cache_max_age(next_change, now)}'
+        return response
 
 
 # ------------------- FOOD CATEGORY -------------------
@@ -501,8 +630,9 @@ class FoodListView(APIView):
             params.append(int(cat_id))
 
         if search:
-            query += ' AND (f."foodName" ILIKE %s OR f."description" ILIKE %s)'
-            params.extend([f'%{search}%', f'%{search}%'])
+            clause, clause_params = contains_clause(['f."foodName"', 'f."description"'], search)
+            query += f' AND {clause}'
+            params.extend(clause_params)
 
         query += ' ORDER BY f."foodName"'
 
@@ -566,6 +696,7 @@ class FoodCreateView(APIView):
                 ])
                 foodID = c.fetchone()[0]
 
+            record_menu_change(d['resID'], 'food', foodID)
             return Response({"message": "Food added", "foodID": foodID, "image_url": image_url}, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -577,18 +708,31 @@ class FoodUpdateView(APIView):
         if serializer.is_valid():
             d = serializer.validated_data
             with connection.cursor() as c:
+                # old нь шинэчлэхээс өмнөх мөр: өөр ресторан руу шилжсэн эсэхийг мэдэнэ
                 c.execute("""
-                    UPDATE tbl_food SET "foodName"=%s,"resID"=%s,"catID"=%s,"price"=%s,"description"=%s,"image"=%s,"portion"=%s
-                    WHERE "foodID"=%s
+                    UPDATE tbl_food f SET "foodName"=%s,"resID"=%s,"catID"=%s,"price"=%s,"description"=%s,"image"=%s,"portion"=%s
+                    FROM tbl_food old
+                    WHERE f."foodID"=%s AND old."foodID"=f."foodID"
+                    RETURNING old."resID"
                 """, [d['foodName'], d['resID'], d['catID'], d['price'], d.get('description',''), d.get('image',''), d.get('portion',''), foodID])
+                previous = c.fetchone()
+            if previous and previous[0] != d['resID']:
+                # Хуучин рестораны кэш ба feed-ээс хасна
+                record_menu_change(previous[0], 'food', foodID, 'delete')
+            record_menu_change(d['resID'], 'food', foodID)
+            record_package_change(*package_ids_containing(food_id=foodID))
             return Response({"message": "Food updated"})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class FoodDeleteView(APIView):
     permission_classes = [AllowAny] #test hiij duusni ardaas [isAuthenticated bolgn]
     def delete(self, request, foodID):
+        package_ids = package_ids_containing(food_id=foodID)
         with connection.cursor() as c:
-            c.execute('DELETE FROM tbl_food WHERE "foodID"=%s', [foodID])
+            c.execute('DELETE FROM tbl_food WHERE "foodID"=%s RETURNING "resID"', [foodID])
+            deleted = c.fetchone()
+        record_menu_change(deleted[0] if deleted else None, 'food', foodID, 'delete')
+        record_package_change(*package_ids)
         return Response({"message": "Food deleted"})
 
 class FoodDetailView(APIView):
@@ -645,8 +789,9 @@ class DrinkListView(APIView):
 
         # Search filter
         if search:
-            query += ' AND (d."drink_name" ILIKE %s OR d."description" ILIKE %s)'
-            params.extend([f'%{search}%', f'%{search}%'])
+            clause, clause_params = contains_clause(['d."drink_name"', 'd."description"'], search)
+            query += f' AND {clause}'
+            params.extend(clause_params)
 
         query += ' ORDER BY d."drink_name"'
 
@@ -710,6 +855,7 @@ class DrinkCreateView(APIView):
 
                 drink_id = c.fetchone()[0]
 
+            record_menu_change(d['resID'], 'drink', drink_id)
             return Response({
                 "message": "Drink added",
                 "drink_id": drink_id,
@@ -727,15 +873,23 @@ class DrinkUpdateView(APIView):
             with connection.cursor() as c:
                 c.execute("""
                     UPDATE tbl_drinks SET "drink_name"=%s,"price"=%s,"description"=%s,"img"=%s WHERE "drink_id"=%s
+                    RETURNING "resID"
                 """, [d['drink_name'], d['price'], d.get('description',''), d.get('img',''), drink_id])
+                updated = c.fetchone()
+            record_menu_change(updated[0] if updated else None, 'drink', drink_id)
+            record_package_change(*package_ids_containing(drink_id=drink_id))
             return Response({"message": "Drink updated"})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class DrinkDeleteView(APIView):
     permission_classes = [AllowAny] #test hiij duusni ardaas [isAuthenticated bolgn]
     def delete(self, request, drink_id):
+        package_ids = package_ids_containing(drink_id=drink_id)
         with connection.cursor() as c:
-            c.execute('DELETE FROM tbl_drinks WHERE "drink_id"=%s', [drink_id])
+            c.execute('DELETE FROM tbl_drinks WHERE "drink_id"=%s RETURNING "resID"', [drink_id])
+            deleted = c.fetchone()
+        record_menu_change(deleted[0] if deleted else None, 'drink', drink_id, 'delete')
+        record_package_change(*package_ids)
         return Response({"message": "Drink deleted"})
 
 
@@ -761,6 +915,7 @@ class PackageCreateView(APIView):
                     VALUES (%s,%s,%s,%s,%s) RETURNING "package_id"
                 """, [d['restaurant_id'], d['package_name'], d['price'],d['portion'],d['img']])
                 package_id = c.fetchone()[0]
+            record_menu_change(d['restaurant_id'], 'package', package_id)
             return Response({"message": "Package added", "package_id": package_id}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -772,7 +927,7 @@ class PackageUpdateView(APIView):
             # Эхлээд багц байгаа эсэхийг шалгах
             with connection.cursor() as cursor:
                 # Багц байгаа эсэхийг шалгах
-                cursor.execute('SELECT "package_id" FROM tbl_package WHERE "package_id" = %s', [package_id])
+                cursor.execute('SELECT "package_id", "restaurant_id" FROM tbl_package WHERE "package_id" = %s', [package_id])
                 package_exists = cursor.fetchone()
                 
                 if not package_exists:
@@ -812,6 +967,9 @@ class PackageUpdateView(APIView):
                 updated_package = cursor.fetchone()
                 
                 if updated_package:
+                    if package_exists[1] != updated_package[5]:
+                        record_menu_change(package_exists[1], 'package', package_id, 'delete')
+                    record_menu_change(updated_package[5], 'package', package_id)
                     # Шинэчлэгдсэн багцын мэдээллийг буцаах
                     return Response({
                         "message": "Багц амжилттай шинэчлэгдлээ",
@@ -843,146 +1001,62 @@ class PackageDeleteView(APIView):
     permission_classes = [AllowAny] #test hiij duusni ardaas [isAuthenticated bolgn]
     def delete(self, request, package_id):
         with connection.cursor() as c:
-            c.execute('DELETE FROM tbl_package WHERE "package_id"=%s', [package_id])
+            c.execute('DELETE FROM tbl_package WHERE "package_id"=%s RETURNING "restaurant_id"', [package_id])
+            deleted = c.fetchone()
+        record_menu_change(deleted[0] if deleted else None, 'package', package_id, 'delete')
         return Response({"message": "Package deleted"})
 
 class RestaurantPackageListView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, resID):
-        print(f"🔍 Рестораны ID: {resID}")
-        
-        try:
-            with connection.cursor() as cursor:
-                # 1. Ресторан байгаа эсэхийг шалгах (БАГИЙН ДҮРМИЙГ АШИГЛАХ)
-                cursor.execute('SELECT "resID", "resName" FROM tbl_restaurant WHERE "resID" = %s', [resID])
-                restaurant = cursor.fetchone()
-                
-                if not restaurant:
-                    return Response({
-                        "error": "Ресторан олдсонгүй",
-                        "restaurant_id": resID
-                    }, status=404)
-                
-                print(f"✅ Ресторан олдлоо: ID={restaurant[0]}, Name={restaurant[1]}")
-                
-                # 2. Багцууд байгаа эсэхийг шалгах
-                cursor.execute('SELECT "package_id", "package_name" FROM tbl_package WHERE "restaurant_id" = %s', [resID])
-                packages = cursor.fetchall()
-                
-                if not packages:
-                    return Response({
-                        "message": "Энэ ресторанд багц олдсонгүй",
-                        "restaurant_id": resID,
-                        "restaurant_name": restaurant[1]
-                    })
-                
-                print(f"✅ {len(packages)} багц олдлоо")
-                
-                # 3. Бүрэн query ажиллуулах (БАГИЙН ДҮРМИЙГ АШИГЛАХ)
-                cursor.execute("""
-                    SELECT 
-                        p."package_id",
-                        p."package_name",
-                        p."price",
-                        p."portion",
-                        p."img",
-                        COALESCE(json_agg(
-                            json_build_object(
-                                'foodID', f."foodID",
-                                'foodName', f."foodName",
-                                'price', f."price",
-                                'quantity', pf."quantity",
-                                'subtotal', pf."quantity" * f."price",
-                                'image', f."image"
-                            )
-                        ) FILTER (WHERE f."foodID" IS NOT NULL), '[]') AS foods
-                    FROM tbl_package p
-                    LEFT JOIN tbl_package_food pf ON p."package_id" = pf."package_id"
-                    LEFT JOIN tbl_food f ON f."foodID" = pf."food_id"
-                    WHERE p."restaurant_id" = %s
-                    GROUP BY p."package_id", p."package_name", p."price", p."portion", p."img"
-                    ORDER BY p."package_name"
-                """, [resID])
-                
-                rows = cursor.fetchall()
-                print(f"✅ Бүрэн query-ийн үр дүн: {len(rows)} мөр")
-                
-        except Exception as e:
-            print(f"❌ Алдаа гарлаа: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return Response({"error": str(e)}, status=500)
-        
-        # Өгөгдлийг бэлтгэх
-        data = []
-        for r in rows:
-            foods = r[5] if r[5] else []
-            total_price = sum(f.get('subtotal', 0) for f in foods)
-            
-            data.append({
-                "package_id": r[0],
-                "package_name": r[1],
-                "price": float(r[2]) if r[2] is not None else float(total_price),
-                "portion": r[3],
-                "img": r[4],
-                "total_price_computed": float(total_price),
-                "foods": foods
+        # Нэг query: ресторан + материалчилсан багцууд (tbl_package_restaurant_id_idx)
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    p."package_id", p."package_name", p."price", p."portion", p."img",
+                    p."foods", p."drinks", p."total_price_computed",
+                    r."resName"
+                FROM tbl_restaurant r
+                LEFT JOIN tbl_package p ON p."restaurant_id" = r."resID"
+                WHERE r."resID" = %s
+                ORDER BY p."package_name"
+            """, [resID])
+            rows = cursor.fetchall()
+
+        if not rows:
+            return Response({
+                "error": "Ресторан олдсонгүй",
+                "restaurant_id": resID
+            }, status=404)
+
+        if rows[0][0] is None:
+            return Response({
+                "message": "Энэ ресторанд багц олдсонгүй",
+                "restaurant_id": resID,
+                "restaurant_name": rows[0][8]
             })
-        
-        return Response(data)
+
+        return Response([package_row(r) for r in rows])
 
 class PackageDetailView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, packageID):
-        try:
-            with connection.cursor() as cursor:
-                # БАГИЙН ДҮРМИЙГ АШИГЛАХ
-                cursor.execute("""
-                    SELECT 
-                        p."package_id",
-                        p."package_name",
-                        p."price",
-                        p."portion",
-                        p."img",
-                        COALESCE(json_agg(
-                            json_build_object(
-                                'foodID', f."foodID",
-                                'foodName', f."foodName",
-                                'price', f."price",
-                                'quantity', pf."quantity",
-                                'subtotal', pf."quantity" * f."price",
-                                'image', f."image"
-                            )
-                        ) FILTER (WHERE f."foodID" IS NOT NULL), '[]') AS foods
-                    FROM tbl_package p
-                    LEFT JOIN tbl_package_food pf ON p."package_id" = pf."package_id"
-                    LEFT JOIN tbl_food f ON f."foodID" = pf."food_id"
-                    WHERE p."package_id" = %s
-                    GROUP BY p."package_id"
-                """, [packageID])
-                
-                row = cursor.fetchone()
-                if not row:
-                    return Response({"error": "Багц олдсонгүй"}, status=404)
-
-        except Exception as e:
-            print(f"❌ Алдаа гарлаа: {str(e)}")
-            return Response({"error": str(e)}, status=500)
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    p."package_id", p."package_name", p."price", p."portion", p."img",
+                    p."foods", p."drinks", p."total_price_computed"
+                FROM tbl_package p
+                WHERE p."package_id" = %s
+            """, [packageID])
+            row = cursor.fetchone()
 
-        foods = row[5] if row[5] else []
-        total_price = sum(f.get('subtotal', 0) for f in foods)
+        if not row:
+            return Response({"error": "Багц олдсонгүй"}, status=404)
 
-        return Response({
-            "package_id": row[0],
-            "package_name": row[1],
-            "price": float(row[2]) if row[2] is not None else float(total_price),
-            "portion": row[3],
-            "img": row[4],
-            "total_price_computed": float(total_price),
-            "foods": foods
-        })
+        return Response(package_row(row))
 
 
 # ------------------- PACKAGE FOOD -------------------
@@ -1007,6 +1081,7 @@ class PackageFoodCreateView(APIView):
                     VALUES (%s,%s,%s) RETURNING "id"
                 """, [d['package_id'], d['food_id'], d['quantity']])
                 id = c.fetchone()[0]
+            record_package_change(d['package_id'])
             return Response({"message": "Package Food added", "id": id}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -1021,16 +1096,19 @@ class PackageFoodUpdateView(APIView):
             try:
                 with connection.cursor() as cursor:
                     # Хамгийн хялбар UPDATE query
+                    # old нь шинэчлэхээс өмнөх мөр: өөр багц руу шилжвэл хоёуланг нь дахин тооцно
                     cursor.execute("""
-                        UPDATE tbl_package_food 
+                        UPDATE tbl_package_food pf
                         SET "package_id" = %s, "food_id" = %s, "quantity" = %s 
-                        WHERE "id" = %s
-                        RETURNING "id", "package_id", "food_id", "quantity"
+                        FROM tbl_package_food old
+                        WHERE pf."id" = %s AND old."id" = pf."id"
+                        RETURNING pf."id", pf."package_id", pf."food_id", pf."quantity", old."package_id"
                     """, [d['package_id'], d['food_id'], d['quantity'], id])
                     
                     updated = cursor.fetchone()
                     
                     if updated:
+                        record_package_change(updated[1], updated[4])
                         return Response({
                             "message": "Package Food updated successfully",
                             "data": {
@@ -1057,7 +1135,10 @@ class PackageFoodDeleteView(APIView):
     permission_classes = [AllowAny] #test hiij duusni ardaas [isAuthenticated bolgn]
     def delete(self, request, id):
         with connection.cursor() as c:
-            c.execute('DELETE FROM tbl_package_food WHERE "id"=%s', [id])
+            c.execute('DELETE FROM tbl_package_food WHERE "id"=%s RETURNING "package_id"', [id])
+            deleted = c.fetchone()
+        if deleted:
+            record_package_change(deleted[0])
         return Response({"message": "Package Food deleted"})
 
 class RestaurantPackageFoodListView(APIView):
@@ -1116,6 +1197,7 @@ class PackageDrinkCreateView(APIView):
                     VALUES (%s,%s,%s) RETURNING "id"
                 """, [d['package_id'], d['drink_id'], d['quantity']])
                 id = c.fetchone()[0]
+            record_package_change(d['package_id'])
             return Response({"message": "Package Drink added", "id": id}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -1127,8 +1209,13 @@ class PackageDrinkUpdateView(APIView):
             d = serializer.validated_data
             with connection.cursor() as c:
                 c.execute("""
-                    UPDATE tbl_package_drinks SET "package_id"=%s,"drink_id"=%s,"quantity"=%s WHERE "id"=%s
+                    UPDATE tbl_package_drinks pd SET "package_id"=%s,"drink_id"=%s,"quantity"=%s
+                    FROM tbl_package_drinks old
+                    WHERE pd."id"=%s AND old."id" = pd."id"
+                    RETURNING old."package_id"
                 """, [d['package_id'], d['drink_id'], d['quantity'], id])
+                previous = c.fetchone()
+            record_package_change(d['package_id'], previous[0] if previous else None)
             return Response({"message": "Package Drink updated"})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -1136,7 +1223,10 @@ class PackageDrinkDeleteView(APIView):
     permission_classes = [AllowAny] #test hiij duusni ardaas [isAuthenticated bolgn]
     def delete(self, request, id):
         with connection.cursor() as c:
-            c.execute('DELETE FROM tbl_package_drinks WHERE "id"=%s', [id])
+            c.execute('DELETE FROM tbl_package_drinks WHERE "id"=%s RETURNING "package_id"', [id])
+            deleted = c.fetchone()
+        if deleted:
+            record_package_change(deleted[0])
         return Response({"message": "Package Drink deleted"})
 
 class RestaurantPackageDrinkListView(APIView):
@@ -1339,6 +1429,7 @@ class RestaurantMultipleImageUploadView(APIView):
                 "type": file_type
             })
 
+        record_menu_change(resID, 'restaurant', resID)
         return Response({
             "message": "Image saved",
             "uploaded": uploaded
@@ -1385,6 +1476,8 @@ class RestaurantImageUploadView(APIView):
             if not result:
                 return Response({"error": "Restaurant not found"}, status=404)
 
+        bump_catalogue_version()
+        record_menu_change(resID, 'restaurant', resID)
         return Response({
             "message": "Restaurant image updated",
             "resID": result[0],
@@ -1435,6 +1528,8 @@ class RestaurantImageView(APIView):
             if not result:
                 return Response({"error": "Restaurant not found"}, status=404)
 
+        bump_catalogue_version()
+        record_menu_change(resID, 'restaurant', resID)
         return Response({
             "message": "Restaurant image updated",
             "resID": result[0],
@@ -1487,6 +1582,8 @@ class FoodImageUpdateView(APIView):
             if not result:
                 return Response({"error": "Food not found"}, status=404)
 
+        record_menu_change(result[2], 'food', foodID)
+        record_package_change(*package_ids_containing(food_id=foodID))
         return Response({
             "message": "Food image updated",
             "image_url": image_url
@@ -1502,7 +1599,7 @@ class RestaurantOrderListView(APIView):
                     o."orderID",
                     o."status",
                     o."created_at",
-                    SUM(of."stock" * of."price") AS total_price,
+                    o."total_price",
                     COALESCE(
                         json_agg(
                             json_build_object(
@@ -1510,7 +1607,7 @@ class RestaurantOrderListView(APIView):
                                 'foodName', f."foodName",
                                 'stock', of."stock",
                                 'price', of."price",
-                                'subtotal', of."stock" * of."price"
+                                'subtotal', of."subtotal"
                             )
                         ),
                         '[]'
@@ -1518,8 +1615,8 @@ class RestaurantOrderListView(APIView):
                 FROM tbl_order o
                 JOIN tbl_orderfood of ON o."orderID" = of."orderID"
                 JOIN tbl_food f ON f."foodID" = of."foodID"
-                WHERE f."resID" = %s
-                GROUP BY o."orderID", o."status", o."created_at"
+                WHERE o."res_id" = %s
+                GROUP BY o."orderID", o."status", o."created_at", o."total_price"
                 ORDER BY o."created_at" DESC
             """, [resID])
 
@@ -1561,7 +1658,7 @@ class RestaurantOrderDetailView(APIView):
                                 'foodName', f."foodName",
                                 'stock', of."stock",
                                 'price', of."price",
-                                'subtotal', of."stock" * of."price"
+                                'subtotal', of."subtotal"
                             )
                         ),
                         '[]'
@@ -1602,10 +1699,7 @@ class OrderStatusUpdateView(APIView):
             cursor.execute("""
                 SELECT o."status"
                 FROM tbl_order o
-                JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-                JOIN tbl_food f ON f."foodID" = of."foodID"
-                WHERE o."orderID" = %s AND f."resID" = %s
-                LIMIT 1
+                WHERE o."orderID" = %s AND o."res_id" = %s
             """, [orderID, resID])
 
             row = cursor.fetchone()
@@ -1630,12 +1724,18 @@ class OrderStatusUpdateView(APIView):
             # -----------------------------
             try:
                 with transaction.atomic():
-                    # Update order status
+                    # Уншсан төлөв хэвээр байгаа үед л шинэчилнэ (зэрэг шилжилтийг rollup-д давхар тоолохгүй)
                     cursor.execute("""
                         UPDATE tbl_order
                         SET "status" = %s
-                        WHERE "orderID" = %s
-                    """, [new_status, orderID])
+                        WHERE "orderID" = %s AND "status" = %s
+                        RETURNING "orderID"
+                    """, [new_status, orderID, current_status])
+
+                    if cursor.fetchone() is None:
+                        return Response({
+                            "error": "Order status was changed concurrently, reload and retry"
+                        }, status=status.HTTP_409_CONFLICT)
 
                     # Insert into history (changed_at auto)
                     cursor.execute("""
@@ -1644,6 +1744,8 @@ class OrderStatusUpdateView(APIView):
                         VALUES (%s, %s, %s)
                     """, [orderID, current_status, new_status])
 
+                    order_status_changed(orderID, resID, current_status, new_status, cursor=cursor)
+
             except Exception as e:
                 return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -1657,17 +1759,28 @@ class OrderStatusUpdateView(APIView):
         })
 
 
+class RestaurantOrderEventStreamView(APIView):
+    """
+    Server-Sent Events: шинэ захиалга, статус өөрчлөлтийг push хийнэ
+    (NewOrderCountView-г давтан poll хийхийн оронд).
+    Зөвхөн тухайн рестораны access_token-оор (header эсвэл ?access_token=).
+    """
+    authentication_classes = [RestaurantJWTAuthentication]
+    permission_classes = [IsRestaurantOwner]
+
+    def get(self, request, resID):
+        return event_stream_response([restaurant_channel(resID)])
+
+
 class NewOrderCountView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, resID):
         with connection.cursor() as cursor:
             cursor.execute("""
-                SELECT COUNT(DISTINCT o."orderID")
+                SELECT COUNT(*)
                 FROM tbl_order o
-                JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-                JOIN tbl_food f ON f."foodID" = of."foodID"
-                WHERE f."resID" = %s
+                WHERE o."res_id" = %s
                   AND o."status" = 'PENDING'
             """, [resID])
 
@@ -1680,7 +1793,9 @@ from datetime import datetime, date, timedelta
 from django.db import transaction
 from rest_framework.viewsets import ViewSet
 from django.utils import timezone
+from django.core.cache import cache
 from rest_framework.decorators import action
+import hashlib
 
 STATUS_FLOW_CONFIG = {
     "PENDING": ["ACCEPTED", "CANCELLED"],
@@ -1694,6 +1809,26 @@ STATUS_FLOW_CONFIG = {
     "CANCELLED": []
 }
 
+def cached_order_count(resID, filters, filter_params):
+    """
+    Approximate order count for cursor mode, cached for ORDER_COUNT_CACHE_TTL.
+    Таблет бүр хуудас солих болгонд COUNT ажиллуулахгүй байх зорилготой.
+    """
+    key_source = repr((resID, filters, [str(p) for p in filter_params]))
+    cache_key = 'order_count:' + hashlib.sha1(key_source.encode('utf-8')).hexdigest()
+
+    total = cache.get(cache_key)
+    if total is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*) FROM tbl_order o WHERE o."res_id" = %s' + filters,
+                [resID] + list(filter_params)
+            )
+            total = cursor.fetchone()[0] or 0
+        cache.set(cache_key, total, getattr(settings, 'ORDER_COUNT_CACHE_TTL', 60))
+    return total
+
+
 class RestaurantOrderViewSet(ViewSet):
     """
     Рестораны захиалгуудын CRUD операцууд
@@ -1703,15 +1838,42 @@ class RestaurantOrderViewSet(ViewSet):
     def list(self, request, resID=None):
         """
         Рестораны бүх захиалгуудыг жагсаалт хэлбэрээр буцаана
+
+        ?cursor= өгвөл keyset (cursor) горимд ажиллана: `next` токеноор
+        дараагийн хуудсыг авна, COUNT query ажиллахгүй.
+        ?include_total=1 бол кэшлэсэн ойролцоо нийт тоог нэмж буцаана.
         """
         # Query parameters
         status = request.query_params.get('status')
         date_from = request.query_params.get('date_from')
         date_to = request.query_params.get('date_to')
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', 20))
+        cursor_token = request.query_params.get('cursor')
+        use_cursor = cursor_token is not None
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = int(request.query_params.get('page_size', 20))
+        except (TypeError, ValueError):
+            return Response({"error": "page/page_size must be integers"}, status=400)
+        page = max(1, page)
+        page_size = max(1, min(page_size, getattr(settings, 'ORDER_LIST_MAX_PAGE_SIZE', 100)))
         offset = (page - 1) * page_size
+
+        # Filters (жагсаалт болон тоонд адилхан хэрэглэнэ)
+        filters = ""
+        filter_params = []
+
+        if status:
+            filters += " AND o.\"status\" = %s"
+            filter_params.append(status)
         
+        # Asia/Ulaanbaatar-ийн өдрүүдийг [эхлэл, төгсгөл) timestamp муж болгоно (индекс ашиглана)
+        try:
+            date_filter, date_params = range_filter('o."created_at"', date_from, date_to)
+        except ValueError:
+            return Response({"error": "date_from/date_to must be YYYY-MM-DD"}, status=400)
+        filters += date_filter
+        filter_params.extend(date_params)
+
         # Base query with filters
         query = """
             SELECT 
@@ -1731,62 +1893,61 @@ class RestaurantOrderViewSet(ViewSet):
                     'image', f."image",
                     'quantity', of."stock",
                     'price', of."price",
-                    'subtotal', of."stock" * of."price"
+                    'subtotal', of."subtotal"
                 )) as items,
                 COUNT(DISTINCT f."foodID") as item_count
             FROM tbl_order o
             JOIN "auth_user" u ON u."id" = o."customer_id"
             JOIN tbl_orderfood of ON o."orderID" = of."orderID"
             JOIN tbl_food f ON f."foodID" = of."foodID"
-            WHERE f."resID" = %s
-        """
-        
-        params = [resID]
-        
-        # Add filters
-        if status:
-            query += " AND o.\"status\" = %s"
-            params.append(status)
-        
-        if date_from:
-            query += " AND DATE(o.\"created_at\") >= %s"
-            params.append(date_from)
-        
-        if date_to:
-            query += " AND DATE(o.\"created_at\") <= %s"
-            params.append(date_to)
-        
-        # Group and order
-        query += """
-            GROUP BY 
-                o."orderID", u."username", u."phone"
-            ORDER BY o."created_at" DESC
-            LIMIT %s OFFSET %s
-        """
-        params.extend([page_size, offset])
-        
-        # Count query
-        count_query = """
-            SELECT COUNT(DISTINCT o."orderID")
-            FROM tbl_order o
-            JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-            JOIN tbl_food f ON f."foodID" = of."foodID"
-            WHERE f."resID" = %s
-        """
-        count_params = [resID]
-        
-        if status:
-            count_query += " AND o.\"status\" = %s"
-            count_params.append(status)
-        
+            WHERE o."res_id" = %s
+        """ + filters
+        params = [resID] + filter_params
+
+        if use_cursor:
+            if cursor_token:
+                try:
+                    after_created_at, after_order_id = decode_order_cursor(cursor_token)
+                except ValueError:
+                    return Response({"error": "cursor буруу байна"}, status=400)
+                query += " AND (o.\"created_at\", o.\"orderID\") < (%s, %s)"
+                params.extend([after_created_at, after_order_id])
+
+            # Дараагийн хуудас байгаа эсэхийг мэдэхийн тулд нэг мөр илүү авна
+            query += """
+                GROUP BY 
+                    o."orderID", u."username", u."phone"
+                ORDER BY o."created_at" DESC, o."orderID" DESC
+                LIMIT %s
+            """
+            params.append(page_size + 1)
+        else:
+            # Group and order
+            query += """
+                GROUP BY 
+                    o."orderID", u."username", u."phone"
+                ORDER BY o."created_at" DESC, o."orderID" DESC
+                LIMIT %s OFFSET %s
+            """
+            params.extend([page_size, offset])
+
         with connection.cursor() as cursor:
-            # Get total count
-            cursor.execute(count_query, count_params)
-            total_count = cursor.fetchone()[0] or 0
+            if not use_cursor:
+                # Get total count
+                cursor.execute(
+                    'SELECT COUNT(*) FROM tbl_order o WHERE o."res_id" = %s' + filters,
+                    [resID] + filter_params
+                )
+                total_count = cursor.fetchone()[0] or 0
             
             # Get orders
             cursor.execute(query, params)
             rows = cursor.fetchall()
+
+        next_token = None
+        if use_cursor and len(rows) > page_size:
+            rows = rows[:page_size]
+            next_token = encode_order_cursor(rows[-1][8], rows[-1][0])
         
         # Format response
         orders = []
@@ -1813,6 +1974,18 @@ class RestaurantOrderViewSet(ViewSet):
                 },
                 "items": row[10] or []
             })
+
+        if use_cursor:
+            response_data = {
+                "restaurant_id": resID,
+                "page_size": page_size,
+                "next": next_token,
+                "orders": orders
+            }
+            if request.query_params.get('include_total') in ('1', 'true'):
+                response_data["total_orders"] = cached_order_count(resID, filters, filter_params)
+                response_data["total_is_approximate"] = True
+            return Response(response_data)
         
         return Response({
             "restaurant_id": resID,
@@ -1829,26 +2002,10 @@ class RestaurantOrderViewSet(ViewSet):
         """
         orderID = pk
         
-        with connection.cursor() as cursor:
-            # Verify restaurant ownership
-            cursor.execute("""
-                SELECT EXISTS(
-                    SELECT 1 
-                    FROM tbl_order o
-                    JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-                    JOIN tbl_food f ON f."foodID" = of."foodID"
-                    WHERE o."orderID" = %s AND f."resID" = %s
-                )
-            """, [orderID, resID])
-            
-            if not cursor.fetchone()[0]:
-                return Response(
-                    {"error": "Захиалга олдсонгүй эсвэл хандах эрхгүй"},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            # Get order details
-            cursor.execute("""
+        # Захиалга (эзэмшлийг res_id-ээр шалгана), төлөвийн түүх, ресторан — зэрэг
+        timings = {}
+        results = execute_parallel({
+            'order': ("""
                 SELECT 
                     o."orderID",
                     o."customer_id",
@@ -1870,23 +2027,16 @@ class RestaurantOrderViewSet(ViewSet):
                         'category_id', f."catID",
                         'quantity', of."stock",
                         'unit_price', of."price",
-                        'subtotal', of."stock" * of."price"
+                        'subtotal', of."subtotal"
                     )) as items
                 FROM tbl_order o
                 JOIN "auth_user" u ON u."id" = o."customer_id"
                 JOIN tbl_orderfood of ON o."orderID" = of."orderID"
                 JOIN tbl_food f ON f."foodID" = of."foodID"
-                WHERE o."orderID" = %s
+                WHERE o."orderID" = %s AND o."res_id" = %s
                 GROUP BY o."orderID", u."username", u."phone", u."email"
-            """, [orderID])
-            
-            order_data = cursor.fetchone()
-            
-            if not order_data:
-                return Response({"error": "Захиалга олдсонгүй"}, status=404)
-            
-            # Get status history
-            cursor.execute("""
+            """, (orderID, resID), True),
+            'history': ("""
                 SELECT 
                     "old_status",
                     "new_status",
@@ -1896,12 +2046,8 @@ class RestaurantOrderViewSet(ViewSet):
                 FROM tbl_order_status_history
                 WHERE "order_id" = %s
                 ORDER BY "changed_at" DESC
-            """, [orderID])
-            
-            status_history = cursor.fetchall()
-            
-            # Get restaurant info
-            cursor.execute("""
+            """, (orderID,), False),
+            'restaurant': ("""
                 SELECT 
                     r."resName",
                     r."phone" as restaurant_phone,
@@ -1909,79 +2055,84 @@ class RestaurantOrderViewSet(ViewSet):
                     r."lng",
                     r."lat"
                 FROM tbl_restaurant r
-                JOIN tbl_food f ON f."resID" = r."resID"
-                JOIN tbl_orderfood of ON of."foodID" = f."foodID"
-                WHERE of."orderID" = %s
-                LIMIT 1
-            """, [orderID])
-            
-            restaurant_info = cursor.fetchone()
+                WHERE r."resID" = %s
+            """, (resID,), True),
+        }, timings)
+
+        order_data = results['order']
+        if not order_data:
+            return Response(
+                {"error": "Захиалга олдсонгүй эсвэл хандах эрхгүй"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        status_history = results['history']
+        restaurant_info = results['restaurant']
         
         # Format status history
         history_list = []
         for hist in status_history:
             history_list.append({
-                "from_status": hist[0],
-                "to_status": hist[1],
-                "changed_at": hist[2].isoformat() if hist[2] else None,
-                "changed_by": hist[3],
-                "notes": hist[4]
+                "from_status": hist["old_status"],
+                "to_status": hist["new_status"],
+                "changed_at": hist["changed_at"].isoformat() if hist["changed_at"] else None,
+                "changed_by": hist["changed_by"],
+                "notes": hist["change_notes"]
             })
         
         response_data = {
-            "order_id": order_data[0],
+            "order_id": order_data["orderID"],
             "customer": {
-                "id": order_data[1],
-                "name": order_data[2],
-                "phone": order_data[3],
-                "email": order_data[4]
+                "id": order_data["customer_id"],
+                "name": order_data["customer_name"],
+                "phone": order_data["customer_phone"],
+                "email": order_data["customer_email"]
             },
             "status_info": {
-                "current_status": order_data[5],
-                "next_possible_statuses": STATUS_FLOW_CONFIG.get(order_data[5], []),
+                "current_status": order_data["status"],
+                "next_possible_statuses": STATUS_FLOW_CONFIG.get(order_data["status"], []),
                 "history": history_list
             },
             "delivery": {
-                "location": order_data[6],
-                "payment_method": order_data[7],
-                "notes": order_data[9]
+                "location": order_data["location"],
+                "payment_method": order_data["payment_method"],
+                "notes": order_data["notes"]
             },
             "financial": {
-                "total_price": float(order_data[8]) if order_data[8] else 0,
-                "items": order_data[12] or []
+                "total_price": float(order_data["total_price"]) if order_data["total_price"] else 0,
+                "items": order_data["items"] or []
             },
             "restaurant": restaurant_info and {
-                "name": restaurant_info[0],
-                "phone": restaurant_info[1],
-                "email": restaurant_info[2],
+                "name": restaurant_info["resName"],
+                "phone": restaurant_info["restaurant_phone"],
+                "email": restaurant_info["restaurant_email"],
                 "coordinates": {
-                    "lng": float(restaurant_info[3]) if restaurant_info[3] else None,
-                    "lat": float(restaurant_info[4]) if restaurant_info[4] else None
+                    "lng": float(restaurant_info["lng"]) if restaurant_info["lng"] else None,
+                    "lat": float(restaurant_info["lat"]) if restaurant_info["lat"] else None
                 }
             },
             "timestamps": {
-                "created_at": order_data[10].isoformat() if order_data[10] else None,
-                "updated_at": order_data[11].isoformat() if order_data[11] else None,
+                "created_at": order_data["created_at"].isoformat() if order_data["created_at"] else None,
+                "updated_at": order_data["updated_at"].isoformat() if order_data["updated_at"] else None,
                 "estimated_preparation_time": None,  # Тооцоолсон бэлтгэх хугацаа
                 "estimated_delivery_time": None      # Тооцоолсон хүргэлтийн хугацаа
             }
         }
         
         # Calculate estimated times based on status
-        if order_data[10]:  # created_at
-            created_at = order_data[10]
-            if order_data[5] == "PREPARING":
+        if order_data["created_at"]:
+            created_at = order_data["created_at"]
+            if order_data["status"] == "PREPARING":
                 # Бэлтгэж эхэлснээс хойш 30-40 минут
                 response_data["timestamps"]["estimated_preparation_time"] = (
                     created_at + timedelta(minutes=30)
                 ).isoformat()
-            elif order_data[5] in ["READY_FOR_PICKUP", "ON_DELIVERY"]:
+            elif order_data["status"] in ["READY_FOR_PICKUP", "ON_DELIVERY"]:
                 # Бэлэн болсоноос хойш 20-30 минут
                 response_data["timestamps"]["estimated_delivery_time"] = (
                     created_at + timedelta(minutes=50)
                 ).isoformat()
         
-        return Response(response_data)
+        return add_server_timing(Response(response_data), timings)
     
     @action(detail=True, methods=['patch'])
     def update_status(self, request, resID=None, pk=None):
@@ -2006,13 +2157,9 @@ class RestaurantOrderViewSet(ViewSet):
                         SELECT 
                             o."status",
                             o."customer_id",
-                            r."resID"
+                            o."res_id"
                         FROM tbl_order o
-                        JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-                        JOIN tbl_food f ON f."foodID" = of."foodID"
-                        JOIN tbl_restaurant r ON r."resID" = f."resID"
-                        WHERE o."orderID" = %s AND r."resID" = %s
-                        LIMIT 1
+                        WHERE o."orderID" = %s AND o."res_id" = %s
                     """, [orderID, resID])
                     
                     order_info = cursor.fetchone()
@@ -2040,11 +2187,18 @@ class RestaurantOrderViewSet(ViewSet):
                         SET 
                             "status" = %s,
                             "updated_at" = CURRENT_TIMESTAMP
-                        WHERE "orderID" = %s
+                        WHERE "orderID" = %s AND "status" = %s
                         RETURNING "orderID", "status", "updated_at"
-                    """, [new_status, orderID])
+                    """, [new_status, orderID, current_status])
                     
                     updated_order = cursor.fetchone()
+
+                    # Өөр хүсэлт төлөвийг түрүүлж сольсон (rollup-д давхар тоолохгүй)
+                    if updated_order is None:
+                        return Response({
+                            "error": "Захиалгын статус өөрчлөгдсөн байна, дахин ачаална уу",
+                            "current_status": current_status
+                        }, status=status.HTTP_409_CONFLICT)
                     
                     # Record status history
                     cursor.execute("""
@@ -2060,6 +2214,8 @@ class RestaurantOrderViewSet(ViewSet):
                             SET "status" = %s 
                             WHERE "orderID" = %s
                         """, [new_status, orderID])
+
+                    order_status_changed(orderID, restaurant_id, current_status, new_status, cursor=cursor)
         
         except Exception as e:
             return Response(
@@ -2088,7 +2244,7 @@ class RestaurantOrderViewSet(ViewSet):
         period = request.query_params.get('period', 'today')  # today, week, month, year
         
         # Define date ranges
-        today = date.today()
+        today = local_today()
         if period == 'today':
             date_start = today
             date_end = today
@@ -2106,72 +2262,22 @@ class RestaurantOrderViewSet(ViewSet):
             date_start = today
             date_end = today
         
-        with connection.cursor() as cursor:
-            # Overall statistics
-            cursor.execute("""
-                SELECT 
-                    COUNT(DISTINCT o."orderID") as total_orders,
-                    SUM(o."total_price") as total_revenue,
-                    AVG(o."total_price") as avg_order_value,
-                    MIN(o."created_at") as first_order_date,
-                    MAX(o."created_at") as last_order_date
-                FROM tbl_order o
-                JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-                JOIN tbl_food f ON f."foodID" = of."foodID"
-                WHERE f."resID" = %s
-            """, [resID])
-            
-            overall_stats = cursor.fetchone()
-            
-            # Status breakdown
-            cursor.execute("""
-                SELECT 
-                    o."status",
-                    COUNT(DISTINCT o."orderID") as count,
-                    SUM(o."total_price") as revenue
-                FROM tbl_order o
-                JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-                JOIN tbl_food f ON f."foodID" = of."foodID"
-                WHERE f."resID" = %s
-                GROUP BY o."status"
-                ORDER BY count DESC
-            """, [resID])
-            
-            status_stats = cursor.fetchall()
-            
-            # Period statistics
-            cursor.execute("""
-                SELECT 
-                    COUNT(DISTINCT o."orderID") as period_orders,
-                    SUM(o."total_price") as period_revenue,
-                    COUNT(DISTINCT o."customer_id") as unique_customers
-                FROM tbl_order o
-                JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-                JOIN tbl_food f ON f."foodID" = of."foodID"
-                WHERE f."resID" = %s 
-                AND DATE(o."created_at") BETWEEN %s AND %s
-            """, [resID, date_start, date_end])
-            
-            period_stats = cursor.fetchone()
-            
-            # Popular items
-            cursor.execute("""
-                SELECT 
-                    f."foodName",
-                    COUNT(of."orderID") as order_count,
-                    SUM(of."stock") as total_quantity,
-                    SUM(of."stock" * of."price") as total_revenue
-                FROM tbl_orderfood of
-                JOIN tbl_food f ON f."foodID" = of."foodID"
-                JOIN tbl_order o ON o."orderID" = of."orderID"
-                WHERE f."resID" = %s
-                GROUP BY f."foodID", f."foodName"
-                ORDER BY total_quantity DESC
-                LIMIT 10
-            """, [resID])
-            
-            popular_items = cursor.fetchall()
-        
+        # Бүгд өдрийн rollup-аас (api/rollups.py), гурван query зэрэг ажиллана
+        timings = {}
+        results = execute_parallel({
+            'status': status_totals_query(resID),
+            'period': period_totals_query(resID, date_start, date_end),
+            'popular': popular_foods_query(resID, 10),
+        }, timings)
+        status_stats = results['status']
+        period_stats = results['period']
+        popular_items = results['popular']
+
+        total_orders = sum(stat["count"] for stat in status_stats)
+        total_revenue = sum(float(stat["revenue"] or 0) for stat in status_stats)
+        first_order = min((stat["first_order_at"] for stat in status_stats if stat["first_order_at"]), default=None)
+        last_order = max((stat["last_order_at"] for stat in status_stats if stat["last_order_at"]), default=None)
+
         # Format response
         response_data = {
             "restaurant_id": resID,
@@ -2181,86 +2287,59 @@ class RestaurantOrderViewSet(ViewSet):
                 "end_date": date_end.isoformat()
             },
             "overall": {
-                "total_orders": overall_stats[0] or 0,
-                "total_revenue": float(overall_stats[1] or 0),
-                "avg_order_value": float(overall_stats[2] or 0),
-                "first_order_date": overall_stats[3].isoformat() if overall_stats[3] else None,
-                "last_order_date": overall_stats[4].isoformat() if overall_stats[4] else None
+                "total_orders": total_orders,
+                "total_revenue": total_revenue,
+                "avg_order_value": total_revenue / total_orders if total_orders else 0.0,
+                "first_order_date": first_order.isoformat() if first_order else None,
+                "last_order_date": last_order.isoformat() if last_order else None
             },
             "period_summary": {
-                "orders": period_stats[0] or 0,
-                "revenue": float(period_stats[1] or 0),
-                "unique_customers": period_stats[2] or 0
+                "orders": period_stats["orders"] or 0,
+                "revenue": float(period_stats["revenue"] or 0),
+                "unique_customers": period_stats["unique_customers"] or 0
             },
             "status_breakdown": [
                 {
-                    "status": stat[0],
-                    "count": stat[1],
-                    "revenue": float(stat[2] or 0)
+                    "status": stat["status"],
+                    "count": stat["count"],
+                    "revenue": float(stat["revenue"] or 0)
                 }
                 for stat in status_stats
             ],
             "popular_items": [
                 {
-                    "food_name": item[0],
-                    "order_count": item[1],
-                    "total_quantity": item[2],
-                    "total_revenue": float(item[3] or 0)
+                    "food_name": item["foodName"],
+                    "order_count": item["order_count"],
+                    "total_quantity": item["total_quantity"],
+                    "total_revenue": float(item["total_revenue"] or 0)
                 }
                 for item in popular_items
             ]
         }
         
         # Calculate completion rate
-        total_orders = overall_stats[0] or 0
-        completed_orders = sum(stat[1] for stat in status_stats if stat[0] in ["COMPLETED", "DELIVERED"])
+        completed_orders = sum(stat["count"] for stat in status_stats if stat["status"] in ["COMPLETED", "DELIVERED"])
         if total_orders > 0:
             response_data["completion_rate"] = round(completed_orders / total_orders * 100, 2)
         else:
             response_data["completion_rate"] = 0
         
-        return Response(response_data)
+        return add_server_timing(Response(response_data), timings)
     
     @action(detail=False, methods=['get'])
     def dashboard(self, request, resID=None):
         """
         Рестораны захиалгын dashboard мэдээлэл
         """
-        today = date.today()
+        today = local_today()
         yesterday = today - timedelta(days=1)
         
-        with connection.cursor() as cursor:
-            # Today's orders
-            cursor.execute("""
-                SELECT 
-                    COUNT(DISTINCT o."orderID") as today_orders,
-                    SUM(o."total_price") as today_revenue,
-                    COUNT(DISTINCT o."customer_id") as today_customers
-                FROM tbl_order o
-                JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-                JOIN tbl_food f ON f."foodID" = of."foodID"
-                WHERE f."resID" = %s 
-                AND DATE(o."created_at") = %s
-            """, [resID, today])
-            
-            today_stats = cursor.fetchone()
-            
-            # Yesterday's orders
-            cursor.execute("""
-                SELECT 
-                    COUNT(DISTINCT o."orderID") as yesterday_orders,
-                    SUM(o."total_price") as yesterday_revenue
-                FROM tbl_order o
-                JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-                JOIN tbl_food f ON f."foodID" = of."foodID"
-                WHERE f."resID" = %s 
-                AND DATE(o."created_at") = %s
-            """, [resID, yesterday])
-            
-            yesterday_stats = cursor.fetchone()
-            
-            # Pending orders
-            cursor.execute("""
+        # Өнөөдөр / өчигдрийн дүн rollup-аас, жагсаалтууд tbl_order-оос — бүгд зэрэг
+        timings = {}
+        results = execute_parallel({
+            'today': period_totals_query(resID, today, today),
+            'yesterday': period_totals_query(resID, yesterday, yesterday),
+            'pending': ("""
                 SELECT 
                     o."orderID",
                     o."customer_id",
@@ -2268,21 +2347,15 @@ class RestaurantOrderViewSet(ViewSet):
                     o."status",
                     o."total_price",
                     o."created_at",
-                    TIMESTAMPDIFF(MINUTE, o."created_at", NOW()) as minutes_passed
+                    FLOOR(EXTRACT(EPOCH FROM (NOW() - o."created_at")) / 60)::int as minutes_passed
                 FROM tbl_order o
                 JOIN "auth_user" u ON u."id" = o."customer_id"
-                JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-                JOIN tbl_food f ON f."foodID" = of."foodID"
-                WHERE f."resID" = %s 
+                WHERE o."res_id" = %s 
                 AND o."status" IN ('PENDING', 'ACCEPTED', 'PREPARING')
                 ORDER BY o."created_at" ASC
                 LIMIT 10
-            """, [resID])
-            
-            pending_orders = cursor.fetchall()
-            
-            # Recent completed orders
-            cursor.execute("""
+            """, (resID,), False),
+            'recent': ("""
                 SELECT 
                     o."orderID",
                     o."customer_id",
@@ -2293,19 +2366,20 @@ class RestaurantOrderViewSet(ViewSet):
                     o."updated_at"
                 FROM tbl_order o
                 JOIN "auth_user" u ON u."id" = o."customer_id"
-                JOIN tbl_orderfood of ON o."orderID" = of."orderID"
-                JOIN tbl_food f ON f."foodID" = of."foodID"
-                WHERE f."resID" = %s 
+                WHERE o."res_id" = %s 
                 AND o."status" IN ('COMPLETED', 'DELIVERED')
                 ORDER BY o."updated_at" DESC
                 LIMIT 5
-            """, [resID])
-            
-            recent_completed = cursor.fetchall()
+            """, (resID,), False),
+        }, timings)
+        today_stats = results['today']
+        yesterday_stats = results['yesterday']
+        pending_orders = results['pending']
+        recent_completed = results['recent']
         
         # Calculate growth
-        today_rev = float(today_stats[1] or 0)
-        yesterday_rev = float(yesterday_stats[1] or 0)
+        today_rev = float(today_stats["revenue"] or 0)
+        yesterday_rev = float(yesterday_stats["revenue"] or 0)
         revenue_growth = 0
         if yesterday_rev > 0:
             revenue_growth = ((today_rev - yesterday_rev) / yesterday_rev) * 100
@@ -2313,45 +2387,46 @@ class RestaurantOrderViewSet(ViewSet):
         # Format pending orders
         formatted_pending = []
         for order in pending_orders:
+            minutes = order["minutes_passed"] or 0
             formatted_pending.append({
-                "order_id": order[0],
+                "order_id": order["orderID"],
                 "customer": {
-                    "id": order[1],
-                    "name": order[2]
+                    "id": order["customer_id"],
+                    "name": order["customer_name"]
                 },
-                "status": order[3],
-                "total_price": float(order[4]) if order[4] else 0,
-                "created_at": order[5].isoformat() if order[5] else None,
-                "waiting_time_minutes": order[6] or 0,
-                "urgency": "high" if (order[6] or 0) > 30 else "medium" if (order[6] or 0) > 15 else "low"
+                "status": order["status"],
+                "total_price": float(order["total_price"]) if order["total_price"] else 0,
+                "created_at": order["created_at"].isoformat() if order["created_at"] else None,
+                "waiting_time_minutes": minutes,
+                "urgency": "high" if minutes > 30 else "medium" if minutes > 15 else "low"
             })
         
         # Format recent completed orders
         formatted_recent = []
         for order in recent_completed:
             formatted_recent.append({
-                "order_id": order[0],
+                "order_id": order["orderID"],
                 "customer": {
-                    "id": order[1],
-                    "name": order[2]
+                    "id": order["customer_id"],
+                    "name": order["customer_name"]
                 },
-                "status": order[3],
-                "total_price": float(order[4]) if order[4] else 0,
-                "created_at": order[5].isoformat() if order[5] else None,
-                "completed_at": order[6].isoformat() if order[6] else None
+                "status": order["status"],
+                "total_price": float(order["total_price"]) if order["total_price"] else 0,
+                "created_at": order["created_at"].isoformat() if order["created_at"] else None,
+                "completed_at": order["updated_at"].isoformat() if order["updated_at"] else None
             })
         
-        return Response({
+        return add_server_timing(Response({
             "restaurant_id": resID,
             "date": today.isoformat(),
             "summary": {
                 "today": {
-                    "orders": today_stats[0] or 0,
+                    "orders": today_stats["orders"] or 0,
                     "revenue": today_rev,
-                    "customers": today_stats[2] or 0
+                    "customers": today_stats["unique_customers"] or 0
                 },
                 "yesterday": {
-                    "orders": yesterday_stats[0] or 0,
+                    "orders": yesterday_stats["orders"] or 0,
                     "revenue": yesterday_rev
                 },
                 "revenue_growth_percent": round(revenue_growth, 2)
@@ -2364,7 +2439,7 @@ class RestaurantOrderViewSet(ViewSet):
                 "count": len(formatted_recent),
                 "orders": formatted_recent
             }
-        })
+        }), timings)
 
 
 
@@ -2374,29 +2449,29 @@ class RevenueReportView(APIView):
 
     def get(self, request, resID):
         """
-        Restaurant-аар орлогын тайлан
-        Шууд SQL query ашиглана
+        Restaurant-ын орлогын тайлан (tbl_revenue_ledger-ээс)
+        ?start_date=2026-01-01&end_date=2026-01-19 (өгөхгүй бол энэ сар), ?export=csv
         """
         try:
-            with connection.cursor() as cursor:
-                query = """
-                SELECT 
-                    r."resName" AS restaurant_name,
-                    COUNT(DISTINCT o."orderID") AS total_orders,
-                    SUM(o."total_price") AS total_revenue,
-                    SUM(of."stock" * of."price") AS total_food_revenue
-                FROM tbl_order o
-                JOIN tbl_restaurant r ON r."resID" = o."res_id"
-                JOIN tbl_orderfood of ON of."orderID" = o."orderID"
-                WHERE o."status" = 'PAID'
-                GROUP BY r."resName"
-                ORDER BY total_revenue DESC;
-                """
-                cursor.execute(query)
-                columns = [col[0] for col in cursor.description]
-                data = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-            return Response({"report": data}, status=200)
+            date_start, date_end = report_range(
+                request.query_params.get("start_date"), request.query_params.get("end_date")
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        try:
+            data = restaurant_report(date_start, date_end, res_id=resID)
+
+            if request.query_params.get("export") == "csv":
+                response = StreamingHttpResponse(stream_csv(data, REPORT_CSV_FIELDS), content_type='text/csv; charset=utf-8')
+                response['Content-Disposition'] = f'attachment; filename="revenue_{resID}_{date_start}_{date_end}.csv"'
+                return response
+
+            return Response({
+                "start_date": date_start,
+                "end_date": date_end,
+                "report": data
+            }, status=200)
 
         except Exception as e:
             return Response({"error": str(e)}, status=500)
@@ -2406,37 +2481,37 @@ class DailyRevenueReportView(APIView):
 
     def get(self, request):
         """
-        Restaurant тус бүрийн өдөр тутмын орлого
-        query param-аар хоорондын өдөр ашиглаж болно
-        ?start_date=2026-01-01&end_date=2026-01-19
+        Restaurant тус бүрийн өдөр тутмын орлого (tbl_revenue_ledger-ээс)
+        ?start_date=2026-01-01&end_date=2026-01-19 (өгөхгүй бол энэ сар),
+        ?res_id=5 зөвхөн нэг ресторан, ?export=csv
         """
-        start_date = request.query_params.get("start_date")
-        end_date = request.query_params.get("end_date")
-
         try:
-            with connection.cursor() as cursor:
-                query = """
-                SELECT 
-                    r."resName" AS restaurant_name,
-                    o."date",
-                    SUM(o."total_price") AS total_revenue
-                FROM tbl_order o
-                JOIN tbl_restaurant r ON r."resID" = o."res_id"
-                WHERE o."status" = 'PAID'
-                """
-                
-                params = []
-                if start_date and end_date:
-                    query += " AND o.\"date\" BETWEEN %s AND %s"
-                    params.extend([start_date, end_date])
+            date_start, date_end = report_range(
+                request.query_params.get("start_date"), request.query_params.get("end_date")
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
 
-                query += " GROUP BY r.\"resName\", o.\"date\" ORDER BY o.\"date\", r.\"resName\";"
+        res_id = request.query_params.get("res_id")
+        if res_id is not None:
+            try:
+                res_id = int(res_id)
+            except ValueError:
+                return Response({"error": "res_id must be an integer"}, status=400)
+
+        try:
+            data = daily_report(date_start, date_end, res_id=res_id)
 
-                cursor.execute(query, params)
-                columns = [col[0] for col in cursor.description]
-                data = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            if request.query_params.get("export") == "csv":
+                response = StreamingHttpResponse(stream_csv(data, DAILY_CSV_FIELDS), content_type='text/csv; charset=utf-8')
+                response['Content-Disposition'] = f'attachment; filename="daily_revenue_{date_start}_{date_end}.csv"'
+                return response
 
-            return Response({"daily_report": data}, status=200)
+            return Response({
+                "start_date": date_start,
+                "end_date": date_end,
+                "daily_report": data
+            }, status=200)
 
         except Exception as e:
             return Response({"error": str(e)}, status=500)
\ No newline at end of file
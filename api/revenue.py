@@ -0,0 +1,179 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+
+from .database import execute_query, get_db_connection
+from .dateranges import local_day_sql, local_today, parse_day
+from .restaurantAPIs.catalogue import shared_ttl
+
+# ----------------------------
+# Revenue ledger
+# ----------------------------
+# tbl_revenue_ledger нь зөвхөн нэмэгддэг бүртгэл: захиалга PAID болоход +1 мөр,
+# PAID-аас гарвал өмнө бичсэн дүнг хасах -1 мөр нэмнэ (мөрийг хэзээ ч засахгүй).
+# PAID-г энэ repo-оос гадуур бичдэг тул мөрүүдийг tbl_order дээрх DEFERRED
+# trigger (migration 0011) тухайн transaction-ийн commit дээр бичнэ.
+# "day" нь бичигдсэн өдөр (Asia/Ulaanbaatar) тул хаагдсан өдрийн дүн дахин
+# өөрчлөгдөхгүй: өдөр бүрийн дүнг удаан кэшлэж, зөвхөн нээлттэй өдрүүдийг
+# ledger-ээс шууд уншина. Тайлангийн view-үүд зөвхөн эндээс уншина.
+
+PAID_STATUS = 'PAID'
+
+# Бичигдсэн огноо мэдэгдэхгүй хуучин захиалгыг created_at-ийн өдрөөр оруулна
+REBUILD_SQL = f"""
+    INSERT INTO tbl_revenue_ledger ("order_id", "res_id", "day", "orders", "amount", "food_amount")
+    SELECT o."orderID", o."res_id", {local_day_sql('COALESCE(o."created_at", NOW())')}, 1,
+           COALESCE(o."total_price", 0), COALESCE(SUM(of."subtotal"), 0)
+    FROM tbl_order o
+    LEFT JOIN tbl_orderfood of ON of."orderID" = o."orderID"
+    WHERE UPPER(o."status") = %s AND o."res_id" IS NOT NULL {{where}}
+    GROUP BY o."orderID"
+"""
+
+GENERATION_KEY = 'revenue_ledger_generation'
+DAY_KEY = 'revenue_day:{generation}:{day}'
+
+DAILY_CSV_FIELDS = ['date', 'resID', 'restaurant_name', 'total_orders', 'total_revenue', 'total_food_revenue']
+REPORT_CSV_FIELDS = ['resID', 'restaurant_name', 'total_orders', 'total_revenue', 'total_food_revenue']
+
+
+def rebuild_ledger(res_id=None):
+    """Replace the ledger with one entry per currently PAID order (all or one restaurant)"""
+    if res_id is not None:
+        where, ledger_where, params = 'AND o."res_id" = %s', 'WHERE "res_id" = %s', [res_id]
+    else:
+        where, ledger_where, params = '', '', []
+
+    with get_db_connection() as conn:
+        with conn.cursor() as c:
+            c.execute(f'DELETE FROM tbl_revenue_ledger {ledger_where}', params)
+            c.execute(REBUILD_SQL.format(where=where), [PAID_STATUS] + params)
+            count = c.rowcount
+
+    # Хаагдсан өдрүүдийн кэш хүчингүй болно
+    cache.set(GENERATION_KEY, int(time.time() * 1000), shared_ttl(None))
+    return count
+
+
+# ----------------------------
+# Reads
+# ----------------------------
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, int(time.time() * 1000), shared_ttl(None))
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def report_range(start_value=None, end_value=None):
+    """
+    (start, end) inclusive days from query params; defaults to this month so far.
+    ValueError on a bad date, reversed range or a span over REVENUE_REPORT_MAX_DAYS.
+    """
+    try:
+        end = parse_day(end_value) if end_value else local_today()
+        start = parse_day(start_value) if start_value else end.replace(day=1)
+    except ValueError:
+        raise ValueError("start_date/end_date must be YYYY-MM-DD")
+
+    if start > end:
+        raise ValueError("start_date must not be after end_date")
+    max_days = getattr(settings, 'REVENUE_REPORT_MAX_DAYS', 366)
+    if (end - start).days + 1 > max_days:
+        raise ValueError(f"Date range must be at most {max_days} days")
+    return start, end
+
+
+def _load_days(days):
+    result = {day: {} for day in days}
+    if not days:
+        return result
+    rows = execute_query("""
+        SELECT "day", "res_id",
+               SUM("orders") AS orders, SUM("amount") AS revenue, SUM("food_amount") AS food_revenue
+        FROM tbl_revenue_ledger
+        WHERE "day" = ANY(%s)
+        GROUP BY "day", "res_id"
+    """, (list(days),))
+    for row in rows:
+        result[row["day"]][row["res_id"]] = (int(row["orders"]), row["revenue"], row["food_revenue"])
+    return result
+
+
+def daily_totals(date_start, date_end):
+    """
+    {day: {res_id: (orders, revenue, food_revenue)}} for an inclusive day range.
+    Шөнө дундаас өмнө эхэлсэн transaction өчигдрийн огноогоор commit хийгдэж болох
+    тул өнөөдөр, өчигдрөөс бусад өдрийг л хаагдсан гэж үзэж кэшлэнэ.
+    """
+    today = local_today()
+    date_end = min(date_end, today)
+    days = [date_start + timedelta(days=n) for n in range((date_end - date_start).days + 1)]
+
+    cutoff = today - timedelta(days=1)
+    generation = _generation()
+    keys = {
+        day: DAY_KEY.format(generation=generation, day=day.isoformat())
+        for day in days if day < cutoff
+    }
+    cached = cache.get_many(list(keys.values())) if keys else {}
+    result = {day: cached[key] for day, key in keys.items() if key in cached}
+
+    loaded = _load_days([day for day in days if day not in result])
+    closed = {keys[day]: totals for day, totals in loaded.items() if day in keys}
+    if closed:
+        cache.set_many(closed, getattr(settings, 'REVENUE_CLOSED_DAY_CACHE_TTL', 86400))
+    result.update(loaded)
+    return result
+
+
+def _restaurant_names(res_ids):
+    if not res_ids:
+        return {}
+    rows = execute_query(
+        'SELECT "resID", "resName" FROM tbl_restaurant WHERE "resID" = ANY(%s)',
+        (list(res_ids),)
+    )
+    return {row["resID"]: row["resName"] for row in rows}
+
+
+def daily_report(date_start, date_end, res_id=None):
+    """Per-restaurant per-day rows ordered by day, restaurant name"""
+    rows = []
+    for day, totals in daily_totals(date_start, date_end).items():
+        for rid, (orders, revenue, food_revenue) in totals.items():
+            # Бүрэн буцаагдсан өдрийг алгасна
+            if (res_id is None or rid == res_id) and (orders or revenue):
+                rows.append({
+                    "date": day,
+                    "resID": rid,
+                    "total_orders": orders,
+                    "total_revenue": revenue,
+                    "total_food_revenue": food_revenue,
+                })
+
+    names = _restaurant_names({row["resID"] for row in rows})
+    for row in rows:
+        row["restaurant_name"] = names.get(row["resID"])
+    rows.sort(key=lambda row: (row["date"], row["restaurant_name"] or ''))
+    return rows
+
+
+def restaurant_report(date_start, date_end, res_id=None):
+    """Per-restaurant totals over the range, highest revenue first"""
+    totals = {}
+    for row in daily_report(date_start, date_end, res_id):
+        entry = totals.setdefault(row["resID"], {
+            "resID": row["resID"],
+            "restaurant_name": row["restaurant_name"],
+            "total_orders": 0,
+            "total_revenue": 0,
+            "total_food_revenue": 0,
+        })
+        entry["total_orders"] += row["total_orders"]
+        entry["total_revenue"] += row["total_revenue"]
+        entry["total_food_revenue"] += row["total_food_revenue"]
+    return sorted(totals.values(), key=lambda entry: entry["total_revenue"], reverse=True)
@@ -0,0 +1,183 @@
+from .database import execute_query, get_db_connection
+from .dateranges import local_day_sql
+
+# ----------------------------
+# Daily sales rollups
+# ----------------------------
+# tbl_sales_daily (ресторан, өдөр, төлөв), tbl_sales_daily_customer (өдрийн
+# давтагдаагүй үйлчлүүлэгч), tbl_sales_daily_food (өдрийн хоол бүр).
+# order_events.order_created / order_status_changed нь захиалгатай нэг
+# transaction-д эдгээрийг нэмэгдүүлж шинэчилнэ; rebuild_rollups нь бүгдийг
+# tbl_order-оос дахин тооцно. Статистик, dashboard нь зөвхөн эндээс уншина.
+
+# Өдрийг Asia/Ulaanbaatar-аар тооцно (session-ий TimeZone-оос хамаарахгүй)
+ORDER_DAY = local_day_sql('o."created_at"')
+
+# Нэг ижил SQL-ийг нэг захиалга ({where} = orderID) болон бүрэн rebuild-д ашиглана
+ORDERS_SQL = """
+    INSERT INTO tbl_sales_daily AS s
+        ("res_id", "day", "status", "orders", "revenue", "first_order_at", "last_order_at")
+    SELECT o."res_id", {day}, COALESCE(o."status", ''),
+           COUNT(*), COALESCE(SUM(o."total_price"), 0), MIN(o."created_at"), MAX(o."created_at")
+    FROM tbl_order o
+    WHERE o."res_id" IS NOT NULL AND o."created_at" IS NOT NULL AND {where}
+    GROUP BY 1, 2, 3
+    ON CONFLICT ("res_id", "day", "status") DO UPDATE SET
+        "orders" = s."orders" + EXCLUDED."orders",
+        "revenue" = s."revenue" + EXCLUDED."revenue",
+        "first_order_at" = LEAST(s."first_order_at", EXCLUDED."first_order_at"),
+        "last_order_at" = GREATEST(s."last_order_at", EXCLUDED."last_order_at")
+"""
+
+CUSTOMERS_SQL = """
+    INSERT INTO tbl_sales_daily_customer ("res_id", "day", "customer_id")
+    SELECT DISTINCT o."res_id", {day}, o."userID"::text
+    FROM tbl_order o
+    WHERE o."res_id" IS NOT NULL AND o."created_at" IS NOT NULL AND o."userID" IS NOT NULL AND {where}
+    ON CONFLICT DO NOTHING
+"""
+
+FOODS_SQL = """
+    INSERT INTO tbl_sales_daily_food AS s
+        ("res_id", "day", "food_id", "order_count", "quantity", "revenue")
+    SELECT o."res_id", {day}, of."foodID",
+           COUNT(*), COALESCE(SUM(of."stock"), 0), COALESCE(SUM(of."subtotal"), 0)
+    FROM tbl_order o
+    JOIN tbl_orderfood of ON of."orderID" = o."orderID"
+    WHERE o."res_id" IS NOT NULL AND o."created_at" IS NOT NULL AND {where}
+    GROUP BY 1, 2, 3
+    ON CONFLICT ("res_id", "day", "food_id") DO UPDATE SET
+        "order_count" = s."order_count" + EXCLUDED."order_count",
+        "quantity" = s."quantity" + EXCLUDED."quantity",
+        "revenue" = s."revenue" + EXCLUDED."revenue"
+"""
+
+# Төлөв өөрчлөгдөхөд хуучин төлөвийн мөрөөс хасна
+UNDO_STATUS_SQL = """
+    UPDATE tbl_sales_daily s
+    SET "orders" = s."orders" - 1,
+        "revenue" = s."revenue" - COALESCE(o."total_price", 0)
+    FROM tbl_order o
+    WHERE o."orderID" = %s
+      AND s."res_id" = o."res_id"
+      AND s."day" = {day}
+      AND s."status" = %s
+"""
+
+ROLLUP_TABLES = ('tbl_sales_daily', 'tbl_sales_daily_customer', 'tbl_sales_daily_food')
+
+
+def _sql(template, where='TRUE'):
+    return template.format(day=ORDER_DAY, where=where)
+
+
+def _run(statements, cursor=None):
+    if cursor is not None:
+        for query, params in statements:
+            cursor.execute(query, params)
+        return
+
+    with get_db_connection() as conn:
+        with conn.cursor() as c:
+            for query, params in statements:
+                c.execute(query, params)
+
+
+def record_order_created(order_id, cursor=None):
+    """Add a new order (already written with its lines) to the rollups"""
+    where = 'o."orderID" = %s'
+    _run([
+        (_sql(ORDERS_SQL, where), [order_id]),
+        (_sql(CUSTOMERS_SQL, where), [order_id]),
+        (_sql(FOODS_SQL, where), [order_id]),
+    ], cursor=cursor)
+
+
+def record_status_change(order_id, old_status, new_status, cursor=None):
+    """Move an order between status rows (tbl_order.status already updated)"""
+    if old_status == new_status:
+        return
+    _run([
+        (_sql(UNDO_STATUS_SQL), [order_id, old_status or '']),
+        (_sql(ORDERS_SQL, 'o."orderID" = %s'), [order_id]),
+    ], cursor=cursor)
+
+
+def rebuild_rollups(res_id=None):
+    """Recompute rollups from tbl_order in one transaction (all or one restaurant)"""
+    if res_id is not None:
+        where, rollup_where, params = 'o."res_id" = %s', 'WHERE "res_id" = %s', [res_id]
+    else:
+        where, rollup_where, params = 'TRUE', '', []
+
+    with get_db_connection() as conn:
+        with conn.cursor() as c:
+            for table in ROLLUP_TABLES:
+                c.execute(f'DELETE FROM {table} {rollup_where}', params)
+            for template in (ORDERS_SQL, CUSTOMERS_SQL, FOODS_SQL):
+                c.execute(_sql(template, where), params)
+            c.execute(f'SELECT COUNT(*) FROM tbl_sales_daily {rollup_where}', params)
+            return c.fetchone()[0]
+
+
+# ----------------------------
+# Reads
+# ----------------------------
+
+def status_totals_query(res_id):
+    """All-time per-status counts/revenue plus first/last order timestamps"""
+    return ("""
+        SELECT
+            "status",
+            SUM("orders") AS count,
+            SUM("revenue") AS revenue,
+            MIN("first_order_at") AS first_order_at,
+            MAX("last_order_at") AS last_order_at
+        FROM tbl_sales_daily
+        WHERE "res_id" = %s
+        GROUP BY "status"
+        HAVING SUM("orders") > 0
+        ORDER BY count DESC
+    """, (res_id,), False)
+
+
+def period_totals_query(res_id, date_start, date_end):
+    """Orders, revenue and unique customers for an inclusive day range"""
+    return ("""
+        SELECT
+            (SELECT COALESCE(SUM("orders"), 0) FROM tbl_sales_daily
+             WHERE "res_id" = %s AND "day" BETWEEN %s AND %s) AS orders,
+            (SELECT COALESCE(SUM("revenue"), 0) FROM tbl_sales_daily
+             WHERE "res_id" = %s AND "day" BETWEEN %s AND %s) AS revenue,
+            (SELECT COUNT(DISTINCT "customer_id") FROM tbl_sales_daily_customer
+             WHERE "res_id" = %s AND "day" BETWEEN %s AND %s) AS unique_customers
+    """, (res_id, date_start, date_end) * 3, True)
+
+
+def popular_foods_query(res_id, limit=10):
+    return ("""
+        SELECT
+            f."foodName",
+            SUM(s."order_count") AS order_count,
+            SUM(s."quantity") AS total_quantity,
+            SUM(s."revenue") AS total_revenue
+        FROM tbl_sales_daily_food s
+        JOIN tbl_food f ON f."foodID" = s."food_id"
+        WHERE s."res_id" = %s
+        GROUP BY f."foodID", f."foodName"
+        ORDER BY total_quantity DESC
+        LIMIT %s
+    """, (res_id, limit), False)
+
+
+# execute_parallel-д (query, params, fetch_one) хэлбэрээр өгч болно
+def status_totals(res_id):
+    return execute_query(*status_totals_query(res_id))
+
+
+def period_totals(res_id, date_start, date_end):
+    return execute_query(*period_totals_query(res_id, date_start, date_end))
+
+
+def popular_foods(res_id, limit=10):
+    return execute_query(*popular_foods_query(res_id, limit))
@@ -0,0 +1,84 @@
+from django.conf import settings
+
+from .database import execute_query
+
+# ----------------------------
+# Name search (pg_trgm)
+# ----------------------------
+# lower(name) LIKE '%q%' нь 0004_search_trgm-ийн GIN trigram индексийг ашиглана.
+# Кирилл/монгол үсгийг (Ө, Ү г.м.) Python талд lower() хийж, Postgres-ийн
+# lower()-тэй тааруулна.
+
+
+def normalize_query(q):
+    """Collapse whitespace and lowercase (Unicode-aware, Cyrillic included)"""
+    return ' '.join((q or '').split()).lower()
+
+
+def like_pattern(q):
+    """'%q%' pattern with LIKE wildcards in the user input escaped"""
+    escaped = q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def contains_clause(columns, q):
+    """
+    SQL fragment matching q inside any of the given (quoted) columns.
+    Returns (sql, params) for appending after WHERE ... AND.
+    """
+    pattern = like_pattern(normalize_query(q))
+    sql = ' OR '.join(f'lower({column}) LIKE %s' for column in columns)
+    return f'({sql})', [pattern] * len(columns)
+
+
+def parse_pagination(params):
+    """(limit, offset) from query params, clamped to SEARCH_MAX_LIMIT"""
+    default_limit = getattr(settings, 'SEARCH_DEFAULT_LIMIT', 20)
+    max_limit = getattr(settings, 'SEARCH_MAX_LIMIT', 50)
+    try:
+        limit = int(params.get('limit', default_limit))
+        offset = int(params.get('offset', 0))
+    except (TypeError, ValueError):
+        limit, offset = default_limit, 0
+    return max(1, min(limit, max_limit)), max(0, offset)
+
+
+def _rank_order(column):
+    # Яг таарсан > эхлэлээрээ таарсан > trigram төстэй байдал
+    return f"""
+        (lower({column}) = %s) DESC,
+        (lower({column}) LIKE %s) DESC,
+        similarity(lower({column}), %s) DESC,
+        {column}
+    """
+
+
+def search_restaurants(q, limit, offset=0):
+    q = normalize_query(q)
+    prefix = like_pattern(q)[1:]
+    return execute_query(
+        f"""
+        SELECT r."resID", r."resName"
+        FROM tbl_restaurant r
+        WHERE lower(r."resName") LIKE %s
+        ORDER BY {_rank_order('r."resName"')}
+        LIMIT %s OFFSET %s
+        """,
+        (like_pattern(q), q, prefix, q, limit, offset)
+    )
+
+
+def search_foods(q, limit, offset=0):
+    q = normalize_query(q)
+    prefix = like_pattern(q)[1:]
+    return execute_query(
+        f"""
+        SELECT f."foodID", f."foodName", r."resID", r."resName"
+        FROM tbl_food f
+        JOIN tbl_restaurant r ON r."resID" = f."resID"
+        WHERE lower(f."foodName") LIKE %s
+        ORDER BY {_rank_order('f."foodName"')}
+        LIMIT %s OFFSET %s
+        """,
+        (like_pattern(q), q, prefix, q, limit, offset)
+    )
@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from api import autocomplete
+
+
+def food(food_id, name, res_id=1, weight=0):
+    return {"type": "food", "id": food_id, "name": name, "resID": res_id, "weight": weight}
+
+
+class AutocompleteIndexTests(SimpleTestCase):
+    def test_apply_matches_full_build(self):
+        index = autocomplete.AutocompleteIndex([food(1, 'Бууз', weight=5), food(2, 'Банш', weight=3)])
+        index.apply(upserts=[food(3, 'Бургер', weight=9), food(2, 'Хуушуур', weight=3)], deletes=[1])
+
+        expected = autocomplete.AutocompleteIndex([food(2, 'Хуушуур', weight=3), food(3, 'Бургер', weight=9)])
+        self.assertEqual(index.keys, expected.keys)
+        self.assertEqual(index.refs, expected.refs)
+        self.assertEqual(index._short, expected._short)
+        self.assertEqual([item["id"] for item in index.lookup('б', 5)], [3])
+
+    def test_set_weights_reranks(self):
+        index = autocomplete.AutocompleteIndex([food(1, 'Бууз', weight=5), food(2, 'Банш', weight=3)])
+        index.set_weights({2: 10})
+        self.assertEqual([item["id"] for item in index.lookup('б', 2)], [2, 1])
+
+
+@override_settings(AUTOCOMPLETE_REFRESH=600, AUTOCOMPLETE_FEED_OVERLAP=0)
+class IncrementalUpdateTests(SimpleTestCase):
+    def setUp(self):
+        self.restaurants = [{"id": 1, "name": 'Ресторан'}]
+        self.foods = {1: {"id": 1, "name": 'Бууз', "resID": 1}}
+        self.feed = []
+        self.weight_loads = 0
+        self.full_food_loads = 0
+        self.versions = [1, 1]
+
+        def fake_query(query, params=None, fetch_one=False):
+            if 'MAX("version")' in query:
+                return {"version": len(self.feed)}
+            if 'FROM tbl_menu_change' in query:
+                return [row for row in self.feed if row["version"] > params[0]]
+            if 'FROM tbl_order' in query:
+                self.weight_loads += 'tbl_orderfood' in query
+                return []
+            if 'FROM tbl_restaurant' in query:
+                return self.restaurants
+            if 'FROM tbl_food' in query:
+                if params:
+                    return [self.foods[i] for i in params[0] if i in self.foods]
+                self.full_food_loads += 1
+                return list(self.foods.values())
+            raise AssertionError(query)
+
+        patches = [
+            mock.patch.object(autocomplete, 'execute_query', side_effect=fake_query),
+            mock.patch.object(autocomplete, 'get_catalogue_version', side_effect=lambda: self.versions[0]),
+            mock.patch.object(autocomplete, 'get_menu_version', side_effect=lambda: self.versions[1]),
+            mock.patch.dict(autocomplete._state, {
+                'catalogue_version': None, 'menu_version': None, 'feed_position': 0,
+                'weights_at': 0.0, 'weights': ({}, {}), 'indexes': None,
+            }),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def change(self, food_id, op='upsert'):
+        self.feed.append({"item_type": 'food', "item_id": food_id, "version": len(self.feed) + 1, "op": op})
+        self.versions[1] += 1
+
+    def names(self, q):
+        return [item["name"] for item in autocomplete.suggest(q, 5, 'food')]
+
+    def test_menu_changes_apply_without_full_rebuild(self):
+        self.assertEqual(self.names('бу'), ['Бууз'])
+
+        self.foods[2] = {"id": 2, "name": 'Бургер', "resID": 1}
+        self.change(2)
+        del self.foods[1]
+        self.change(1, 'delete')
+
+        self.assertEqual(self.names('бу'), ['Бургер'])
+        self.assertEqual(self.full_food_loads, 1)
+        self.assertEqual(self.weight_loads, 1)
+
+    def test_catalogue_change_drops_foods_of_removed_restaurant(self):
+        self.assertEqual(self.names('бу'), ['Бууз'])
+
+        self.restaurants = []
+        self.versions[0] += 1
+
+        self.assertEqual(self.names('бу'), [])
+        self.assertEqual(self.full_food_loads, 1)
@@ -0,0 +1,85 @@
+import io
+import zipfile
+from contextlib import nullcontext
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.restaurantAPIs import bulk
+
+
+def _item(row_type, data, items=(), image_member=None):
+    return {
+        "entry": {"row": 0, "type": row_type, "name": None, "status": "ok"},
+        "type": row_type,
+        "data": data,
+        "image": '',
+        "image_member": image_member,
+        "items": list(items),
+    }
+
+
+class ImportRowsTests(SimpleTestCase):
+    def setUp(self):
+        self.inserts = []
+        self.next_id = {'tbl_food': 100, 'tbl_drinks': 200, 'tbl_package': 300}
+
+        def fake_insert(query, rows, template=None, fetch=False):
+            rows = list(rows)
+            table = query.split('INSERT INTO')[1].split()[0]
+            self.inserts.append((table, rows))
+            if not fetch:
+                return len(rows)
+            start = self.next_id.get(table, 0)
+            self.next_id[table] = start + len(rows)
+            return [{"id": start + i} for i in range(len(rows))]
+
+        patches = [
+            mock.patch.object(bulk, 'execute_batch_insert', side_effect=fake_insert),
+            mock.patch.object(bulk, 'unit_of_work', nullcontext),
+            mock.patch.object(bulk, '_existing_items', return_value={'food': {'salad': 7}, 'drink': {}}),
+            mock.patch.object(bulk, 'refresh_package_contents'),
+            mock.patch.object(bulk, 'record_menu_changes'),
+            mock.patch.object(bulk.cloudinary.uploader, 'upload', side_effect=RuntimeError('boom')),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _inserted(self, table):
+        return [rows for name, rows in self.inserts if name == table]
+
+    def test_failed_image_upload_skips_packages_that_use_the_food(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('burger.jpg', b'image')
+        archive = zipfile.ZipFile(buffer)
+
+        burger = _item('food', {"foodName": "Burger", "catID": 1, "price": 10},
+                       image_member=archive.getinfo('burger.jpg'))
+        combo = _item('package', {"package_name": "Combo", "price": 15}, items=[('food', 'burger', 1)])
+        lunch = _item('package', {"package_name": "Lunch", "price": 12}, items=[('food', 'salad', 2)])
+
+        valid = bulk.upload_images([burger, combo, lunch], archive)
+        self.assertEqual(burger["entry"]["status"], "error")
+        self.assertEqual(valid, [combo, lunch])
+
+        result = bulk.import_rows(5, valid)
+
+        # Амжилтгүй хоолыг заасан багц tbl_package-д огт орохгүй
+        self.assertEqual(self._inserted('tbl_package'), [[(5, "Lunch", 12, '', '')]])
+        self.assertEqual(combo["entry"]["status"], "error")
+        self.assertEqual(lunch["entry"], {"row": 0, "type": "package", "name": None, "status": "created", "id": 300})
+        self.assertEqual(self._inserted('tbl_package_food'), [[(300, 7, 2)]])
+        self.assertEqual(result, {"foods": 0, "drinks": 0, "packages": 1})
+
+
+class PackageItemsFormatTests(SimpleTestCase):
+    def test_names_with_separators_round_trip(self):
+        items = [{"foodName": 'Бууз; том', "quantity": 2}, {"foodName": 'Цай: сүүтэй\\', "quantity": 1}]
+        formatted = bulk.format_items(items, 'foodName')
+        self.assertEqual(bulk.parse_items(formatted), [('Бууз; том', '2'), ('Цай: сүүтэй\\', '1')])
+
+    def test_unescaped_input_still_parses(self):
+        self.assertEqual(bulk.parse_items('Бууз:2;Цай: сүүтэй:1;Банш'),
+                         [('Бууз', '2'), ('Цай: сүүтэй', '1'), ('Банш', '1')])
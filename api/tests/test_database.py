@@ -0,0 +1,101 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from api import database
+
+
+class FakePool:
+    def __init__(self, available, max_size=10):
+        self._available = available
+        self.max_size = max_size
+
+    def available(self):
+        return self._available
+
+
+@override_settings(DB_PARALLEL_WORKERS=2, DB_PARALLEL_MAX_PER_REQUEST=3)
+class ExecuteParallelTests(SimpleTestCase):
+    def setUp(self):
+        self.threads = {}
+
+        def fake_query(query, params=None, fetch_one=False):
+            self.threads[query] = threading.current_thread().name
+            return {"query": query, "params": params} if fetch_one else [query]
+
+        # Тест бүр шинэ executor/slot-той эхэлнэ
+        patches = [
+            mock.patch.object(database, 'execute_query', side_effect=fake_query),
+            mock.patch.object(database, '_parallel_executor', None),
+            mock.patch.object(database, '_parallel_slots', None),
+            mock.patch.object(database, '_parallel_pid', None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _queries(self):
+        return {
+            "stats": ("a", (1,), True),
+            "today": ("b", (2,), True),
+            "pending": ("c", (), False),
+            "recent": ("d", (), False),
+        }
+
+    def test_results_are_merged_by_name_in_request_order(self):
+        timings = {}
+        with mock.patch.object(database, 'get_pool', return_value=FakePool(available=10)):
+            results = database.execute_parallel(self._queries(), timings)
+
+        self.assertEqual(list(results), ["stats", "today", "pending", "recent"])
+        self.assertEqual(results["stats"], {"query": "a", "params": (1,)})
+        self.assertEqual(results["pending"], ["c"])
+        self.assertEqual(set(timings), {"stats", "today", "pending", "recent", "fanout"})
+        self.assertTrue(all(duration >= 0 for duration in timings.values()))
+        self.assertGreaterEqual(timings["fanout"], max(timings[name] for name in results))
+
+        # 2 slot: эхний query болон slot-гүй үлдсэн нь дуудсан thread дээр
+        caller = threading.current_thread().name
+        self.assertEqual(self.threads["a"], caller)
+        self.assertEqual(self.threads["d"], caller)
+        self.assertTrue(self.threads["b"].startswith('db-parallel'))
+        self.assertTrue(self.threads["c"].startswith('db-parallel'))
+
+    def test_falls_back_to_serial_when_pool_is_busy(self):
+        with mock.patch.object(database, 'get_pool', return_value=FakePool(available=0)):
+            results = database.execute_parallel(self._queries())
+
+        self.assertEqual(len(results), 4)
+        caller = threading.current_thread().name
+        self.assertEqual(set(self.threads.values()), {caller})
+
+    def test_slots_are_released_after_an_error(self):
+        def failing(query, params=None, fetch_one=False):
+            if query == "a":
+                raise RuntimeError("boom")
+            return []
+
+        with mock.patch.object(database, 'get_pool', return_value=FakePool(available=10)), \
+                mock.patch.object(database, 'execute_query', side_effect=failing):
+            with self.assertRaises(RuntimeError):
+                database.execute_parallel(self._queries())
+            _, slots = database._get_parallel_executor()
+            self.assertTrue(slots.acquire(blocking=False))
+            self.assertTrue(slots.acquire(blocking=False))
+
+
+class ConnectionPoolPrefillTests(SimpleTestCase):
+    def test_failed_prefill_releases_reserved_slots_and_retries(self):
+        pool = database.ConnectionPool('dsn', min_size=3, max_size=3)
+        conn = mock.Mock(closed=False)
+
+        with mock.patch.object(database.psycopg2, 'connect', side_effect=[conn, OSError('down')]):
+            with self.assertRaises(OSError):
+                pool.getconn()
+        # Холбогдсон 1 нь idle-д үлдэж, бусад нөөц буцаагдана
+        self.assertEqual(pool._size, 1)
+
+        with mock.patch.object(database.psycopg2, 'connect', return_value=mock.Mock(closed=False)):
+            pool.getconn()
+        self.assertEqual(pool._size, 3)
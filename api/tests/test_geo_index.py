@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+
+from api.restaurantAPIs.geo_index import GeoGrid
+
+
+def restaurant(res_id, lat, lng):
+    return {"resID": res_id, "resName": f'R{res_id}', "lat": lat, "lng": lng}
+
+
+class GeoGridTests(SimpleTestCase):
+    def setUp(self):
+        # Улаанбаатарт 10, Дарханд (~200 км) 1 ресторан
+        rows = [restaurant(i, 47.918 + i * 0.001, 106.917) for i in range(10)]
+        rows.append(restaurant(99, 49.486, 105.922))
+        self.grid = GeoGrid(rows)
+
+    def test_radius_stop_excludes_far_restaurants(self):
+        result = self.grid.nearest(47.918, 106.917, 20, max_radius_km=50)
+        self.assertEqual(len(result), 10)
+        self.assertTrue(all(row["distance_km"] <= 50 for row in result))
+
+    def test_sparse_full_scan_respects_radius(self):
+        grid = GeoGrid([restaurant(1, 47.918, 106.917), restaurant(99, 49.486, 105.922)])
+        result = grid.nearest(47.918, 106.917, 5, max_radius_km=50)
+        self.assertEqual([row["id"] for row in result], [1])
+
+    def test_without_radius_returns_k_nearest(self):
+        result = self.grid.nearest(47.918, 106.917, 3)
+        self.assertEqual([row["id"] for row in result], [0, 1, 2])
@@ -0,0 +1,36 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.restaurantAPIs import menu
+
+
+def cached_menu(version):
+    return '"etag"', {
+        "version": version, "restaurant": {"resID": 1},
+        "foods": [], "drinks": [], "packages": [],
+    }
+
+
+class MenuChangesTests(SimpleTestCase):
+    def setUp(self):
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.fetchall.return_value = []
+        patches = {
+            'cache': mock.patch.object(menu, 'cache'),
+            'connection': mock.patch.object(menu, 'connection', **{'cursor.return_value': cursor}),
+        }
+        for name, patch in patches.items():
+            setattr(self, name, patch.start())
+            self.addCleanup(patch.stop)
+
+    def test_stale_cached_menu_is_rebuilt(self):
+        with mock.patch.object(menu, 'get_menu', side_effect=[cached_menu(5), cached_menu(9)]):
+            result = menu.get_menu_changes(1, 7)
+        self.cache.delete.assert_called_once_with(menu.MENU_KEY.format(res_id=1))
+        self.assertEqual(result["version"], 9)
+
+    def test_version_never_moves_client_back(self):
+        with mock.patch.object(menu, 'get_menu', return_value=cached_menu(5)):
+            result = menu.get_menu_changes(1, 7)
+        self.assertEqual(result["version"], 7)
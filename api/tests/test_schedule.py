@@ -0,0 +1,55 @@
+import random
+
+from django.test import SimpleTestCase
+
+from api.restaurantAPIs.schedule import DAY_SECONDS, ScheduleIndex, open_intervals
+
+
+def restaurant(res_id, open_time, close_time, status='active'):
+    return {"resID": res_id, "status": status, "openTime": open_time, "closeTime": close_time}
+
+
+def brute_open(rows, second):
+    return frozenset(
+        row["resID"] for row in rows
+        if row["status"] == 'active'
+        and any(start <= second < end for start, end in open_intervals(row["openTime"], row["closeTime"]))
+    )
+
+
+class ScheduleIndexTests(SimpleTestCase):
+    def test_overnight_close_adjacent_to_open_stays_open(self):
+        index = ScheduleIndex([
+            restaurant(1, '10:00:00', '09:59:59'),
+            restaurant(2, '09:00:00', '11:00:00'),
+        ])
+        for second in index.boundaries:
+            self.assertIn(1, index._at_second(second))
+
+    def test_overnight_interval(self):
+        index = ScheduleIndex([restaurant(1, '22:00:00', '03:00:00')])
+        self.assertEqual(index.boundaries, [0, 3 * 3600 + 1, 22 * 3600])
+        self.assertEqual(index._at_second(0), frozenset({1}))
+        self.assertEqual(index._at_second(12 * 3600), frozenset())
+        self.assertEqual(index._at_second(23 * 3600), frozenset({1}))
+        # Шөнө дунд олонлог өөрчлөгдөхгүй
+        self.assertEqual(index._changes, [3 * 3600 + 1, 22 * 3600])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        rows = []
+        for res_id in range(60):
+            open_time = f'{rng.randrange(24):02d}:{rng.choice([0, 30]):02d}:00'
+            close_time = f'{rng.randrange(24):02d}:{rng.choice([0, 29, 59]):02d}:{rng.choice([0, 59]):02d}'
+            rows.append(restaurant(res_id, open_time, close_time, rng.choice(['active', 'active', 'inactive'])))
+        index = ScheduleIndex(rows)
+
+        seconds = sorted({0, DAY_SECONDS - 1} | {b + d for b in index.boundaries for d in (-1, 0, 1) if 0 <= b + d < DAY_SECONDS})
+        for second in rng.sample(seconds, len(seconds)):
+            self.assertEqual(index._at_second(second), brute_open(rows, second), second)
+
+        expected = [
+            second for second in index.boundaries
+            if brute_open(rows, second) != brute_open(rows, (second - 1) % DAY_SECONDS)
+        ]
+        self.assertEqual(index._changes, expected)
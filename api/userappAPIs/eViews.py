@@ -4,9 +4,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework import serializers
+from django.conf import settings
 from django.utils.datastructures import MultiValueDictKeyError
 
 from ..database import execute_query
+from ..geo import haversine_km, bounding_box
+from ..search import search_restaurants, search_foods, parse_pagination, contains_clause
+from ..autocomplete import suggest
+from ..restaurantAPIs.geo_index import get_geo_grid
 
 
 # =========================
@@ -30,8 +35,8 @@ class FoodSearchSerializer(serializers.Serializer):
 
 class RestaurantOnlySearchAPIView(APIView):
     """
-    🔍 Restaurant name-аар л хайна
-    жишээ: /api/search/restaurants/?q=nomads
+    🔍 Restaurant name-аар л хайна (trigram индекс, relevance эрэмбэ)
+    жишээ: /api/search/restaurants/?q=nomads&limit=20&offset=0
     """
     permission_classes = [AllowAny]
 
@@ -40,17 +45,8 @@ class RestaurantOnlySearchAPIView(APIView):
         if not q:
             return Response([])
 
-        restaurants = execute_query(
-            """
-            SELECT
-                "resID",
-                "resName"
-            FROM tbl_restaurant
-            WHERE "resName" ILIKE %s
-            ORDER BY "resName"
-            """,
-            (f"%{q}%",)
-        )
+        limit, offset = parse_pagination(request.GET)
+        restaurants = search_restaurants(q, limit, offset)
 
         data = [
             {
@@ -70,8 +66,8 @@ class RestaurantOnlySearchAPIView(APIView):
 
 class FoodOnlySearchAPIView(APIView):
     """
-    🍕 Food name-аар л хайна
-    жишээ: /api/search/foods/?q=pizza
+    🍕 Food name-аар л хайна (trigram индекс, relevance эрэмбэ)
+    жишээ: /api/search/foods/?q=pizza&limit=20&offset=0
     """
     permission_classes = [AllowAny]
 
@@ -80,20 +76,8 @@ class FoodOnlySearchAPIView(APIView):
         if not q:
             return Response([])
 
-        foods = execute_query(
-            """
-            SELECT
-                f."foodID",
-                f."foodName",
-                r."resID",
-                r."resName"
-            FROM tbl_food f
-            JOIN tbl_restaurant r ON r."resID" = f."resID"
-            WHERE f."foodName" ILIKE %s
-            ORDER BY f."foodName"
-            """,
-            (f"%{q}%",)
-        )
+        limit, offset = parse_pagination(request.GET)
+        foods = search_foods(q, limit, offset)
 
         data = [
             {
@@ -110,6 +94,36 @@ class FoodOnlySearchAPIView(APIView):
         serializer = FoodSearchSerializer(data, many=True)
         return Response(serializer.data)
 
+# =========================
+# AUTOCOMPLETE (PREFIX)
+# =========================
+
+class AutocompleteAPIView(APIView):
+    """
+    ⌨️ Бичих явцад санал болгох (санах ойн prefix индекс, захиалгын тоогоор эрэмбэлнэ)
+    жишээ: /api/autocomplete/?q=бууз&type=food&limit=8
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        q = request.GET.get("q", "").strip()
+        if not q:
+            return Response({"query": q, "suggestions": []})
+
+        try:
+            limit = int(request.GET.get("limit", 8))
+        except ValueError:
+            limit = 8
+        limit = max(1, min(limit, getattr(settings, 'AUTOCOMPLETE_MAX_LIMIT', 10)))
+        kind = request.GET.get("type")
+
+        suggestions = [
+            {key: value for key, value in item.items() if key != "weight"}
+            for item in suggest(q, limit, kind)
+        ]
+        return Response({"query": q, "suggestions": suggestions})
+
+
 class RestaurantListSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     name = serializers.CharField()
@@ -129,51 +143,23 @@ class NearbyOrSearchRestaurantsAPIView(APIView):
 
     def get(self, request):
         q = request.GET.get("q", "").strip()
-        limit = int(request.GET.get("limit", 12))
 
         try:
             lat = float(request.GET.get("lat"))
             lon = float(request.GET.get("lon"))
+            limit = int(request.GET.get("limit", 12))
         except (ValueError, TypeError, MultiValueDictKeyError):
             return Response(
-                {"error": "lat болон lon заавал өгөх ёстой (тоо утга)"},
+                {"error": "lat болон lon заавал өгөх ёстой (тоо утга), limit нь бүхэл тоо"},
                 status=400
             )
+        limit = max(1, min(limit, getattr(settings, 'NEARBY_MAX_LIMIT', 50)))
 
-        # Earth radius (km)
-        R = 6371.0
-
-        base_query = """
-            SELECT 
-                r."resID" AS id,
-                r."resName" AS name,
-                (6371 * acos(
-                    cos(radians(%s)) 
-                    * cos(radians(r."lat")) 
-                    * cos(radians(r."lng") - radians(%s)) 
-                    + sin(radians(%s)) 
-                    * sin(radians(r."lat"))
-                )) AS distance_km
-            FROM tbl_restaurant r
-            WHERE r."lat" IS NOT NULL 
-              AND r."lng" IS NOT NULL
-        """
-
-        params = [lat, lon, lat]
-
-        if q:
-            base_query += """ 
-                AND r."resName" ILIKE %s
-            """
-            params.append(f"%{q}%")
-
-        base_query += """
-            ORDER BY distance_km
-            LIMIT %s
-        """
-        params.append(limit)
-
-        results = execute_query(base_query, tuple(params))
+        if not q and getattr(settings, 'NEARBY_IN_MEMORY', True):
+            # Нэрийн хайлтгүй (home screen) үед DB-д хандахгүй, санах ойн grid-ээс
+            candidates = get_geo_grid().nearest(lat, lon, limit, getattr(settings, 'NEARBY_MAX_RADIUS_KM', 50.0))
+        else:
+            candidates = self._nearest(lat, lon, q, limit)
 
         data = [
             {
@@ -181,7 +167,7 @@ class NearbyOrSearchRestaurantsAPIView(APIView):
                 "name": row["name"],
                 "distance_km": round(row["distance_km"], 2) if row["distance_km"] is not None else None
             }
-            for row in results
+            for row in candidates
         ]
 
         serializer = RestaurantListSerializer(data, many=True)
@@ -190,4 +176,55 @@ class NearbyOrSearchRestaurantsAPIView(APIView):
             "searched_term": q if q else None,
             "user_location": {"lat": lat, "lon": lon},
             "count": len(data)
-        })
\ No newline at end of file
+        })
+
+    def _fetch(self, q, box=None):
+        query = """
+            SELECT r."resID" AS id, r."resName" AS name, r."lat", r."lng"
+            FROM tbl_restaurant r
+            WHERE r."lat" IS NOT NULL
+              AND r."lng" IS NOT NULL
+        """
+        params = []
+
+        # (lat, lng) индекс ашиглах bounding-box шүүлт
+        if box:
+            min_lat, max_lat, min_lon, max_lon = box
+            query += """
+                AND r."lat" BETWEEN %s AND %s
+            """
+            params += [min_lat, max_lat]
+            if min_lon is not None:
+                query += """
+                    AND r."lng" BETWEEN %s AND %s
+                """
+                params += [min_lon, max_lon]
+
+        if q:
+            clause, clause_params = contains_clause(['r."resName"'], q)
+            query += f"""
+                AND {clause}
+            """
+            params += clause_params
+
+        return execute_query(query, tuple(params))
+
+    def _nearest(self, lat, lon, q, limit):
+        """
+        Радиусыг limit хүрэх хүртэл 2 дахин томруулж, зөвхөн хайрцагт орсон
+        ресторанд яг зайг тооцно. NEARBY_MAX_RADIUS_KM-ээс цааш хайхгүй
+        (хүрэлцэхгүй бол олдсоноо буцаана; хүснэгтийг бүтнээр уншихгүй).
+        """
+        radius = getattr(settings, 'NEARBY_INITIAL_RADIUS_KM', 2.0)
+        max_radius = getattr(settings, 'NEARBY_MAX_RADIUS_KM', 50.0)
+
+        while True:
+            rows = self._fetch(q, bounding_box(lat, lon, radius))
+            for row in rows:
+                row["distance_km"] = haversine_km(lat, lon, float(row["lat"]), float(row["lng"]))
+            # Хайрцгийн булан дахь (тойргоос гадуурх) мөрийг тооцохгүй
+            within = [row for row in rows if row["distance_km"] <= radius]
+            if len(within) >= limit or radius >= max_radius:
+                within.sort(key=lambda row: row["distance_km"])
+                return within[:limit]
+            radius = min(radius * 2, max_radius)
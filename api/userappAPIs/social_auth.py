@@ -4,7 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework import status
 
-from ..database import execute_query, execute_insert
+from ..database import execute_query, execute_insert, unit_of_work
 from ..auth import create_access_token
 
 GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v3/userinfo"
@@ -57,31 +57,32 @@ class SocialLoginView(APIView):
             profile_image = userinfo.get("picture", {}).get("data", {}).get("url")
 
 
-        # ===== USER CHECK =====
-        user = execute_query(
-            "SELECT * FROM users WHERE email = %s",
-            (email,),
-            fetch_one=True
-        )
-
-        # ===== REGISTER IF NOT EXISTS =====
-        if not user:
-            user = execute_insert(
-                """
-                INSERT INTO users (email, full_name, user_type, is_verified, is_active, profile_image_url)
-                VALUES (%s, %s, 'customer', true, true, %s)
-                RETURNING id, email, full_name, user_type, is_verified
-                """,
-                (email, full_name, profile_image)
+        with unit_of_work():
+            # ===== USER CHECK =====
+            user = execute_query(
+                "SELECT * FROM users WHERE email = %s",
+                (email,),
+                fetch_one=True
             )
 
-            execute_insert(
-                """
-                INSERT INTO customer_profiles (user_id)
-                VALUES (%s)
-                """,
-                (user["id"],)
-            )
+            # ===== REGISTER IF NOT EXISTS =====
+            if not user:
+                user = execute_insert(
+                    """
+                    INSERT INTO users (email, full_name, user_type, is_verified, is_active, profile_image_url)
+                    VALUES (%s, %s, 'customer', true, true, %s)
+                    RETURNING id, email, full_name, user_type, is_verified
+                    """,
+                    (email, full_name, profile_image)
+                )
+
+                execute_insert(
+                    """
+                    INSERT INTO customer_profiles (user_id)
+                    VALUES (%s)
+                    """,
+                    (user["id"],)
+                )
 
         # ===== JWT =====
         token = create_access_token(user["id"], user["email"])
@@ -12,7 +12,7 @@ from .views import (
     CartItemUpdateView,
     CartItemDeleteView,
 )
-from .eViews import RestaurantOnlySearchAPIView, FoodOnlySearchAPIView, NearbyOrSearchRestaurantsAPIView
+from .eViews import RestaurantOnlySearchAPIView, FoodOnlySearchAPIView, NearbyOrSearchRestaurantsAPIView, AutocompleteAPIView
 from .reviews import RestaurantReviewView, DriverReviewView, FoodReviewView
 
 urlpatterns = [
@@ -35,6 +35,7 @@ urlpatterns = [
     # SEARCH
     path("restaurants/search/", RestaurantOnlySearchAPIView.as_view(), name="search-restaurants"),
     path("foods/search/", FoodOnlySearchAPIView.as_view(), name="search-foods"),
+    path("autocomplete/", AutocompleteAPIView.as_view(), name="autocomplete"),
    path('restaurants/nearby/', NearbyOrSearchRestaurantsAPIView.as_view(), name='nearby-restaurants'),
 
     # REVIEWS
@@ -6,8 +6,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from ..database import execute_query, execute_insert, execute_update
-from ..auth import hash_password, verify_password, create_access_token, JWTAuthentication
+from ..database import execute_query, execute_insert, execute_update, execute_batch_insert, transactional, unit_of_work
+from ..auth import hash_password, verify_password, create_access_token, JWTAuthentication, invalidate_principal
+from ..hashing import check_login_attempts, record_login_failure, clear_login_failures
+from ..credentials import rehash_if_needed
+from ..pricing import resolve_prices, price_order_lines
+from ..order_events import order_created
 from .serializers import ProfileSearchSerializer, CustomerSignUpSerializer, SignInSerializer, UserSearchSerializer
 from urllib.parse import urlparse, unquote
 
@@ -36,7 +40,8 @@ class CreateOrderView(APIView):
                 )
 
             location = data.get('location')
-            status_value = data.get('status', 'pending')
+            # Төлөвийг client-ээс авахгүй: PAID г.м.-г revenue ledger, rollup шууд тоолно
+            status_value = 'pending'
 
             if not location:
                 return Response(
@@ -49,66 +54,96 @@ class CreateOrderView(APIView):
             if not items:
                 return Response({'error': 'Захиалгад хоол сонгоогүй байна'}, status=status.HTTP_400_BAD_REQUEST)
 
-            for item in items:
-                food_id = item.get('foodID')
-                # Хоол баазад байгаа эсэхийг шалгах
-                food_exists = execute_query('SELECT 1 FROM tbl_food WHERE "foodID" = %s', (food_id,), fetch_one=True)
-                if not food_exists:
+            # Үнийг client-ээс биш, баазаас авна
+            try:
+                lines = [(int(item.get('foodID')), int(item.get('stock', 1))) for item in items]
+            except (TypeError, ValueError):
+                return Response({'error': 'foodID болон stock бүхэл тоо байх ёстой'}, status=status.HTTP_400_BAD_REQUEST)
+
+            if any(quantity < 1 for _, quantity in lines):
+                return Response({'error': 'stock 1-ээс их байх ёстой'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Шалгалт, захиалга, хоолнууд нэг transaction-д бичигдэнэ
+            with unit_of_work():
+                # Бүх хоолны үнийг нэг query-гээр авах
+                prices = resolve_prices(food_ids=[food_id for food_id, _ in lines])
+                if any(('food', food_id) not in prices for food_id, _ in lines):
                     return Response(
                         {'error': f'Таны сонгосон хоол дууссан байна.'},
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
-            # orderID-г автоматаар үүсгэх (timestamp ашиглан давхцахгүй бүхэл тоо үүсгэх)
-            order_id = int(datetime.now().timestamp())
+                # Нэг захиалга нэг ресторанд хамаарна
+                restaurant_ids = {prices[('food', food_id)]['resID'] for food_id, _ in lines}
+                if len(restaurant_ids) != 1:
+                    return Response(
+                        {'error': 'Нэг захиалгад зөвхөн нэг рестораны хоол сонгоно уу'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                res_id = restaurant_ids.pop()
 
-            order = execute_insert(
-                """
-                INSERT INTO tbl_order ("orderID", "userID", date, location, status)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING "orderID", "userID", date, location, status
-                """,
-                (
-                    order_id,
-                    str(user['id']),
-                    datetime.now().date(),
-                    location,
-                    status_value
-                )
-            )
+                priced_lines, total_price = price_order_lines(lines, prices)
 
-            if not order:
-                return Response(
-                    {'error': 'Захиалга үүсгэхэд алдаа гарлаа'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+                # orderID-г автоматаар үүсгэх (timestamp ашиглан давхцахгүй бүхэл тоо үүсгэх)
+                order_id = int(datetime.now().timestamp())
 
-            # Захиалгын хоолнуудыг бүртгэх
-            for item in items:
-                # ID-г гараар үүсгэх (random ашиглан)
-                item_id = random.randint(1, 2147483647)
-                execute_insert(
+                order = execute_insert(
                     """
-                    INSERT INTO tbl_orderfood ("ID", "orderID", "foodID", stock, price)
-                    VALUES (%s, %s, %s, %s, %s)
+                    INSERT INTO tbl_order ("orderID", "userID", "res_id", date, location, status, "total_price")
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    RETURNING "orderID", "userID", "res_id", date, location, status, "total_price"
                     """,
                     (
-                        item_id,
-                        order['orderID'],
-                        item.get('foodID'),
-                        item.get('stock'),
-                        item.get('price')
+                        order_id,
+                        str(user['id']),
+                        res_id,
+                        datetime.now().date(),
+                        location,
+                        status_value,
+                        total_price
                     )
                 )
 
+                if not order:
+                    return Response(
+                        {'error': 'Захиалга үүсгэхэд алдаа гарлаа'},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                    )
+
+                # Захиалгын хоолнуудыг нэг multi-row INSERT-ээр бүртгэх
+                # ID-г гараар үүсгэх (random ашиглан, багц дотор давхцахгүй)
+                item_ids = random.sample(range(1, 2147483647), len(priced_lines))
+                execute_batch_insert(
+                    """
+                    INSERT INTO tbl_orderfood ("ID", "orderID", "foodID", stock, price, "subtotal")
+                    VALUES %s
+                    """,
+                    [
+                        (
+                            item_id,
+                            order['orderID'],
+                            line['item_id'],
+                            line['quantity'],
+                            line['price'],
+                            line['subtotal']
+                        )
+                        for item_id, line in zip(item_ids, priced_lines)
+                    ]
+                )
+
+                # Ресторан, жолооч нарт commit хийгдэх үед мэдэгдэнэ
+                order_created(order)
+
             return Response({
                 'message': 'Захиалга амжилттай үүслээ',
                 'order': {
                     'orderID': order['orderID'],
                     'userID': order['userID'],
+                    'resID': order['res_id'],
                     'date': order['date'],
                     'location': order['location'],
-                    'status': order['status']
+                    'status': order['status'],
+                    'total_price': order['total_price']
                 }
             }, status=status.HTTP_201_CREATED)
         except Exception as e:
@@ -164,39 +199,41 @@ class CustomerSignUpView(APIView):
 
         validated_data = serializer.validated_data
 
+        # Hash-ийг transaction-аас гадуур (pool-ийн холболт барихгүй)
         password_hash = hash_password(validated_data['password'])
 
-        # Хэрэглэгч үүсгэх
-        user = execute_insert(
-            """
-            INSERT INTO users (email, phone_number, password_hash, full_name, user_type)
-            VALUES (%s, %s, %s, %s, 'customer')
-            RETURNING id, email, phone_number, full_name, user_type, is_active, is_verified, created_at
-            """,
-            (
-                validated_data['email'],
-                validated_data['phone_number'],
-                password_hash,
-                validated_data['full_name']
+        with unit_of_work():
+            # Хэрэглэгч үүсгэх
+            user = execute_insert(
+                """
+                INSERT INTO users (email, phone_number, password_hash, full_name, user_type)
+                VALUES (%s, %s, %s, %s, 'customer')
+                RETURNING id, email, phone_number, full_name, user_type, is_active, is_verified, created_at
+                """,
+                (
+                    validated_data['email'],
+                    validated_data['phone_number'],
+                    password_hash,
+                    validated_data['full_name']
+                )
             )
-        )
 
-        if not user:
-            return Response({'error': 'Бүртгэл үүсгэхэд алдаа гарлаа'}, status=500)
+            if not user:
+                return Response({'error': 'Бүртгэл үүсгэхэд алдаа гарлаа'}, status=500)
 
-        # Customer profile үүсгэх
-        execute_insert(
-            """
-            INSERT INTO customer_profiles (user_id, default_address, latitude, longitude)
-            VALUES (%s, %s, %s, %s)
-            """,
-            (
-                user['id'],
-                validated_data.get('default_address'),
-                validated_data.get('latitude'),
-                validated_data.get('longitude')
+            # Customer profile үүсгэх
+            execute_insert(
+                """
+                INSERT INTO customer_profiles (user_id, default_address, latitude, longitude)
+                VALUES (%s, %s, %s, %s)
+                """,
+                (
+                    user['id'],
+                    validated_data.get('default_address'),
+                    validated_data.get('latitude'),
+                    validated_data.get('longitude')
+                )
             )
-        )
 
         access_token = create_access_token(user['id'], user['email'])
 
@@ -229,6 +266,7 @@ class SignInView(APIView):
         email = data.get('email')
         phone_number = data.get('phone_number')
         password = data['password']
+        check_login_attempts(request, 'user', email or phone_number)
 
         # Имэйл эсвэл phone_number-оор хайх
         if email:
@@ -245,10 +283,16 @@ class SignInView(APIView):
             )
         
         if not user or not verify_password(password, user['password_hash']):
+            record_login_failure(request, 'user', email or phone_number)
             return Response(
                 {'error': 'Имэйл/утасны дугаар эсвэл нууц үг буруу байна'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
+        clear_login_failures(request, 'user', email or phone_number)
+        rehash_if_needed(password, user['password_hash'], 'bcrypt', lambda new_hash: execute_update(
+            "UPDATE users SET password_hash = %s WHERE id = %s",
+            (new_hash, user['id'])
+        ))
         
         if not user['is_active']:
             return Response(
@@ -410,6 +454,7 @@ class ProfileUpdateView(APIView):
                 f"UPDATE users SET {set_clause} WHERE id = %s",
                 tuple(values)
             )
+            invalidate_principal(user['id'], namespace='user')
 
         # Customer профайл засах
         if user['user_type'] == 'customer':
@@ -524,6 +569,7 @@ class AddToCartView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @transactional
     def post(self, request):
         user = request.user
         
@@ -570,8 +616,7 @@ class AddToCartView(APIView):
                 VALUES (%s, %s)
                 RETURNING "cartID"
                 """,
-                (new_cart_id, user.id),
-                fetch_one=True
+                (new_cart_id, user.id)
             )
             cart_id = inserted['cartID']
 
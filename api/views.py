@@ -3,8 +3,10 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from .serializers import SignUpSerializer, SignInSerializer
-from .database import execute_query, execute_insert
+from .database import execute_query, execute_insert, execute_update, unit_of_work
 from .auth import hash_password, verify_password, create_access_token, JWTAuthentication
+from .hashing import check_login_attempts, record_login_failure, clear_login_failures
+from .credentials import rehash_if_needed
 
 
 
@@ -32,43 +34,44 @@ class SignUpView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Hash password
+        # Hash password (transaction-аас гадуур, pool-ийн холболт барихгүй)
         password_hash = hash_password(data['password'])
         
-        # Insert user
-        user = execute_insert(
-            """
-            INSERT INTO users (email, phone_number, password_hash, full_name, user_type)
-            VALUES (%s, %s, %s, %s, %s)
-            RETURNING id, email, phone_number, full_name, user_type, is_active, is_verified, created_at
-            """,
-            (data['email'], data['phone_number'], password_hash, data['full_name'], data['user_type'])
-        )
-        
-        if not user:
-            return Response(
-                {'error': 'Бүртгэл үүсгэхэд алдаа гарлаа'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        
-        # Create profile based on user type
-        if data['user_type'] == 'driver':
-            execute_insert(
+        with unit_of_work():
+            # Insert user
+            user = execute_insert(
                 """
-                INSERT INTO driver_profiles (user_id, license_number, vehicle_type, vehicle_plate)
-                VALUES (%s, %s, %s, %s)
+                INSERT INTO users (email, phone_number, password_hash, full_name, user_type)
+                VALUES (%s, %s, %s, %s, %s)
+                RETURNING id, email, phone_number, full_name, user_type, is_active, is_verified, created_at
                 """,
-                (user['id'], data.get('license_number', ''), data.get('vehicle_type', ''), data.get('vehicle_plate', ''))
-            )
-        elif data['user_type'] == 'customer':
-            execute_insert(
-                """
-                INSERT INTO customer_profiles (user_id, default_address, latitude, longitude)
-                VALUES (%s, %s, %s, %s)
-                """,
-                (user['id'], data.get('default_address'), data.get('latitude'), data.get('longitude'))
+                (data['email'], data['phone_number'], password_hash, data['full_name'], data['user_type'])
             )
         
+            if not user:
+                return Response(
+                    {'error': 'Бүртгэл үүсгэхэд алдаа гарлаа'},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+        
+            # Create profile based on user type
+            if data['user_type'] == 'driver':
+                execute_insert(
+                    """
+                    INSERT INTO driver_profiles (user_id, license_number, vehicle_type, vehicle_plate)
+                    VALUES (%s, %s, %s, %s)
+                    """,
+                    (user['id'], data.get('license_number', ''), data.get('vehicle_type', ''), data.get('vehicle_plate', ''))
+                )
+            elif data['user_type'] == 'customer':
+                execute_insert(
+                    """
+                    INSERT INTO customer_profiles (user_id, default_address, latitude, longitude)
+                    VALUES (%s, %s, %s, %s)
+                    """,
+                    (user['id'], data.get('default_address'), data.get('latitude'), data.get('longitude'))
+                )
+        
         # Create access token
         access_token = create_access_token(user['id'], user['email'])
         
@@ -96,6 +99,7 @@ class SignInView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         data = serializer.validated_data
+        check_login_attempts(request, 'user', data['email'])
         
         # Get user
         user = execute_query(
@@ -105,6 +109,7 @@ class SignInView(APIView):
         )
         
         if not user:
+            record_login_failure(request, 'user', data['email'])
             return Response(
                 {'error': 'Имэйл эсвэл нууц үг буруу байна'},
                 status=status.HTTP_401_UNAUTHORIZED
@@ -112,10 +117,16 @@ class SignInView(APIView):
         
         # Verify password
         if not verify_password(data['password'], user['password_hash']):
+            record_login_failure(request, 'user', data['email'])
             return Response(
                 {'error': 'Имэйл эсвэл нууц үг буруу байна'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
+        clear_login_failures(request, 'user', data['email'])
+        rehash_if_needed(data['password'], user['password_hash'], 'bcrypt', lambda new_hash: execute_update(
+            "UPDATE users SET password_hash = %s WHERE id = %s",
+            (new_hash, user['id'])
+        ))
         
         # Check if active
         if not user['is_active']:
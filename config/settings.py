@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -74,12 +75,21 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database configuration
 DATABASES = {
-    'default': dj_database_url.config(default=os.getenv('DATABASE_URL'))
+    'default': dj_database_url.config(
+        default=os.getenv('DATABASE_URL'),
+        conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        conn_health_checks=True,
+    )
 }
 
-# Database configuration for raw SQL
+# Database configuration for raw SQL (api/database.py connection pool)
 DATABASE_CONFIG = {
-    'url': os.getenv('DATABASE_URL')
+    'url': os.getenv('DATABASE_URL'),
+    'pool_min_size': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+    'pool_max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+    'pool_max_lifetime': int(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),  # seconds
+    'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),  # checkout wait, seconds
+    'pool_health_check_interval': int(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30)),
 }
 
 REST_FRAMEWORK = {
@@ -110,4 +120,117 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # JWT Settings
-JWT_ACCESS_TOKEN_LIFETIME = 3600  # 1 hour in seconds
\ No newline at end of file
+JWT_ACCESS_TOKEN_LIFETIME = 3600  # 1 hour in seconds
+
+# Order list: cursor mode-ийн ойролцоо нийт тоог кэшлэх хугацаа (секунд)
+ORDER_COUNT_CACHE_TTL = int(os.getenv('ORDER_COUNT_CACHE_TTL', 60))
+
+# Order event stream (SSE) тохиргоо, секундээр
+ORDER_EVENTS_HEARTBEAT = int(os.getenv('ORDER_EVENTS_HEARTBEAT', 15))
+ORDER_EVENTS_MAX_DURATION = int(os.getenv('ORDER_EVENTS_MAX_DURATION', 300))
+
+# Процесс бүрийн SSE subscriber-ийн дээд тоо (хэтэрвэл 503) ба subscriber бүрийн queue.
+# Стрим бүр worker thread эзэлдэг тул gunicorn-ийг gthread (--threads) горимд ажиллуулна.
+ORDER_EVENTS_MAX_SUBSCRIBERS = int(os.getenv('ORDER_EVENTS_MAX_SUBSCRIBERS', 50))
+ORDER_EVENTS_QUEUE_SIZE = int(os.getenv('ORDER_EVENTS_QUEUE_SIZE', 100))
+
+# JWT principal кэш (процесс бүрт), TTL секундээр
+AUTH_PRINCIPAL_CACHE_SIZE = int(os.getenv('AUTH_PRINCIPAL_CACHE_SIZE', 2048))
+AUTH_PRINCIPAL_CACHE_TTL = int(os.getenv('AUTH_PRINCIPAL_CACHE_TTL', 60))
+
+# Нууц үг hash хийх executor ба нэвтрэх оролдлогын хязгаар
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', 8))
+LOGIN_ATTEMPT_LIMIT = int(os.getenv('LOGIN_ATTEMPT_LIMIT', 5))
+LOGIN_ATTEMPT_WINDOW = int(os.getenv('LOGIN_ATTEMPT_WINDOW', 300))  # секунд
+# Апп-ын өмнөх итгэмжлэгдсэн reverse proxy-ийн тоо (X-Forwarded-For-оос client IP авахад; 0 бол REMOTE_ADDR)
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+
+# Нууц үгийн hash-ийн зорилтот өртөг (нэвтрэх үед өөр өртөгтэй hash-ийг шинэчилнэ)
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+PBKDF2_ITERATIONS = int(os.getenv('PBKDF2_ITERATIONS', 600000))
+
+PASSWORD_HASHERS = [
+    'api.credentials.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Cache: REDIS_URL байвал worker-ууд хуваалцах Redis, үгүй бол процесс доторх LocMem.
+# Version counter, цэсний кэш, нэвтрэх оролдлогын тоолуур зэрэг нь бүх worker-т нэг
+# байх ёстой тул DEBUG биш үед REDIS_URL заавал (нэг процесстой бол ALLOW_LOCAL_CACHE=True)
+REDIS_URL = os.getenv('REDIS_URL')
+ALLOW_LOCAL_CACHE = os.getenv('ALLOW_LOCAL_CACHE', 'False') == 'True'
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    if not DEBUG and not ALLOW_LOCAL_CACHE:
+        raise ImproperlyConfigured(
+            'REDIS_URL is required when DEBUG is off: cache-backed versions and '
+            'login throttling must be shared by all workers (set ALLOW_LOCAL_CACHE=True '
+            'only for a single-process deployment)'
+        )
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Shared биш (LocMem) cache үед version counter-ийн TTL (секунд): өөр worker-ийн bump-ийг
+# алдсан процесс энэ хугацааны дотор шинэ version авч нийлнэ
+LOCAL_CACHE_VERSION_TTL = int(os.getenv('LOCAL_CACHE_VERSION_TTL', 30))
+
+# Рестораны catalogue snapshot-ийн shared cache TTL (секунд)
+CATALOGUE_CACHE_TTL = int(os.getenv('CATALOGUE_CACHE_TTL', 300))
+
+# openNow хариуг дараагийн нээх/хаах цаг хүртэл, гэхдээ энэ хугацаанаас ихгүй кэшлэнэ (секунд)
+SCHEDULE_CACHE_MAX_AGE = int(os.getenv('SCHEDULE_CACHE_MAX_AGE', 60))
+
+# Nearby хайлт: эхлэх радиус ба томруулах дээд хязгаар (км)
+NEARBY_INITIAL_RADIUS_KM = float(os.getenv('NEARBY_INITIAL_RADIUS_KM', 2))
+NEARBY_MAX_RADIUS_KM = float(os.getenv('NEARBY_MAX_RADIUS_KM', 50))
+NEARBY_IN_MEMORY = os.getenv('NEARBY_IN_MEMORY', 'True') == 'True'
+# Nearby хайлтын нэг хүсэлтийн үр дүнгийн дээд тоо (limit)
+NEARBY_MAX_LIMIT = int(os.getenv('NEARBY_MAX_LIMIT', 50))
+GEO_GRID_CELL_DEG = float(os.getenv('GEO_GRID_CELL_DEG', 0.01))  # ~1.1 км
+
+# Нэрээр хайлтын үр дүнгийн хязгаар
+SEARCH_DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', 20))
+SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', 50))
+
+# Autocomplete: санал болгох дээд тоо, урьдчилан тооцох prefix урт, популяр жинг шинэчлэх (секунд)
+AUTOCOMPLETE_MAX_LIMIT = int(os.getenv('AUTOCOMPLETE_MAX_LIMIT', 10))
+AUTOCOMPLETE_PREFIX_LEN = int(os.getenv('AUTOCOMPLETE_PREFIX_LEN', 3))
+AUTOCOMPLETE_REFRESH = int(os.getenv('AUTOCOMPLETE_REFRESH', 600))
+# Autocomplete: tbl_menu_change feed-ийг давхар унших version-ий тоо (commit-ийн дарааллын зөрүүг нөхнө)
+AUTOCOMPLETE_FEED_OVERLAP = int(os.getenv('AUTOCOMPLETE_FEED_OVERLAP', 100))
+
+# Захиалгын жагсаалтын хуудасны дээд хэмжээ (page_size)
+ORDER_LIST_MAX_PAGE_SIZE = int(os.getenv('ORDER_LIST_MAX_PAGE_SIZE', 100))
+
+# Рестораны цэсний кэш (invalidate_menu дуудагдах хүртэл, дээд хугацаа секундээр)
+MENU_CACHE_TTL = int(os.getenv('MENU_CACHE_TTL', 3600))
+
+# Цэсийг бөөнөөр import хийх хязгаар ба зураг зэрэг upload хийх thread-ийн тоо
+BULK_IMPORT_MAX_ROWS = int(os.getenv('BULK_IMPORT_MAX_ROWS', 2000))
+BULK_IMPORT_MAX_ARCHIVE_MB = int(os.getenv('BULK_IMPORT_MAX_ARCHIVE_MB', 100))
+BULK_IMAGE_UPLOAD_WORKERS = int(os.getenv('BULK_IMAGE_UPLOAD_WORKERS', 4))
+
+# Бие даасан унших query-үүдийг зэрэг ажиллуулах thread (процесс бүрт, DB_POOL_MAX_SIZE - 1 хүртэл)
+DB_PARALLEL_WORKERS = int(os.getenv('DB_PARALLEL_WORKERS', 4))
+# Нэг request-ийн нэмэлт thread-ийн дээд тоо (slot/холболт сул биш бол дараалан ажиллана)
+DB_PARALLEL_MAX_PER_REQUEST = int(os.getenv('DB_PARALLEL_MAX_PER_REQUEST', 3))
+
+# Админы статистикийн кэш (секунд)
+ADMIN_STATS_CACHE_TTL = int(os.getenv('ADMIN_STATS_CACHE_TTL', 30))
+
+# Орлогын тайлан: хаагдсан өдрийн кэш (секунд), нэг хүсэлтийн хамгийн урт муж (өдөр)
+REVENUE_CLOSED_DAY_CACHE_TTL = int(os.getenv('REVENUE_CLOSED_DAY_CACHE_TTL', 86400))
+REVENUE_REPORT_MAX_DAYS = int(os.getenv('REVENUE_REPORT_MAX_DAYS', 366))